@@ -182,7 +182,7 @@ DJMAIL_TEMPLATE_EXTENSION = "jinja"
 # Events backend
 EVENTS_PUSH_BACKEND = "taiga.events.backends.postgresql.EventsPushBackend"
 # EVENTS_PUSH_BACKEND = "taiga.events.backends.rabbitmq.EventsPushBackend"
-# EVENTS_PUSH_BACKEND_OPTIONS = {"url": "//guest:guest@127.0.0.1/"}
+# EVENTS_PUSH_BACKEND_OPTIONS = {"url": "//guest:guest@127.0.0.1/", "confirm_publish": False}
 
 # Message System
 MESSAGE_STORAGE = "django.contrib.messages.storage.session.SessionStorage"
@@ -223,6 +223,8 @@ TEMPLATE_LOADERS = [
 MIDDLEWARE_CLASSES = [
     "taiga.base.middleware.cors.CoorsMiddleware",
     "taiga.events.middleware.SessionIDMiddleware",
+    "taiga.projects.history.middleware.HistoryValuesMiddleware",
+    "taiga.permissions.middleware.MembershipsMiddleware",
 
     # Common middlewares
     "django.middleware.common.CommonMiddleware",
@@ -437,6 +439,10 @@ FEEDBACK_EMAIL = "support@taiga.io"
 # collapsed during that interval
 CHANGE_NOTIFICATIONS_MIN_INTERVAL = 0 #seconds
 
+# Number of pending change notifications locked and sent
+# by a notifications runner in each transaction
+CHANGE_NOTIFICATIONS_CHUNK_SIZE = 100
+
 
 # List of functions called for filling correctly the ProjectModulesConfig associated to a project
 # This functions should receive a Project parameter and return a dict with the desired configuration
@@ -451,9 +457,68 @@ GITLAB_VALID_ORIGIN_IPS = []
 
 EXPORTS_TTL = 60 * 60 * 24  # 24 hours
 
+# Project dumps format: indentation of the json (None for a compact
+# output) and gzip compression
+EXPORTS_INDENT = 4
+EXPORTS_GZIP = False
+
+# Number of objects loaded at once when exporting a project
+EXPORTS_CHUNK_SIZE = 100
+
+# Number of history and timeline entries inserted at once when
+# importing a project dump
+IMPORTS_BATCH_SIZE = 500
+
 CELERY_ENABLED = False
 WEBHOOKS_ENABLED = False
 
+# Webhooks delivery: timeout of every request (in seconds), retries of the
+# failed ones (waiting WEBHOOKS_RETRY_BACKOFF seconds, doubled on every
+# retry) and threads used to send them when celery is disabled (with 0
+# they are sent synchronously).
+WEBHOOKS_TIMEOUT = 10
+WEBHOOKS_MAX_RETRIES = 2
+WEBHOOKS_RETRY_BACKOFF = 1
+WEBHOOKS_DISPATCHER_THREADS = 4
+
+# Time that the webhooks of a project are cached
+PROJECT_WEBHOOKS_CACHE_TIMEOUT = 60 * 60  # 1 hour
+
+# If True the daily buckets of the issues stats are precomputed once a day
+# (by the celery beat task update_issues_daily_stats)
+ISSUES_STATS_DAILY_BUCKETS_ENABLED = False
+
+# Time that the visible projects of a user are cached to filter the timelines
+TIMELINE_VISIBLE_PROJECTS_CACHE_TIMEOUT = 60 * 60  # 1 hour
+
+# Time that the points rollup of a project (used on the project stats) is
+# cached, it is invalidated when role points, user stories or milestones change
+PROJECT_POINTS_ROLLUP_CACHE_TIMEOUT = 60 * 60  # 1 hour
+
+# Time that the issues filters data of a project is cached (by applied filters),
+# it is invalidated when issues, issue choices or memberships change
+ISSUES_FILTERS_DATA_CACHE_TIMEOUT = 60 * 60  # 1 hour
+
+# Time that the neighbors of an object in a filtered list are cached
+NEIGHBORS_CACHE_TIMEOUT = 30  # 30 seconds
+
+# If True the memberships of the users (used to resolve their permissions)
+# are cached between requests, they are invalidated when memberships or
+# roles change
+PERMISSIONS_CACHE_ENABLED = False
+PERMISSIONS_CACHE_TIMEOUT = 60 * 60  # 1 hour
+
+# Number of markdown renders cached in each process (in front of the
+# django cache), the time they are kept there, and number of markdown
+# instances reused by each thread
+MDRENDER_LOCAL_CACHE_SIZE = 1000
+MDRENDER_LOCAL_CACHE_TIMEOUT = 60  # 1 minute
+MDRENDER_POOL_SIZE = 10
+
+# Time that the data used to render the references to user stories, tasks
+# and issues (#ref) is cached, it is invalidated when they change
+REFERENCES_CACHE_TIMEOUT = 60 * 60  # 1 hour
+
 
 # If is True /front/sitemap.xml show a valid sitemap of taiga-front client
 FRONT_SITEMAP_ENABLED = False
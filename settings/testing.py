@@ -20,6 +20,7 @@ SKIP_SOUTH_TESTS = True
 SOUTH_TESTS_MIGRATE = False
 CELERY_ALWAYS_EAGER = True
 CELERY_ENABLED = False
+WEBHOOKS_DISPATCHER_THREADS = 0
 
 MEDIA_ROOT = "/tmp"
 
@@ -16,59 +16,80 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from collections import namedtuple
+from contextlib import closing
+from hashlib import sha1
 
+from django.conf import settings
+from django.core.cache import cache
 from django.db import connection
+from django.db.models.sql.datastructures import EmptyResultSet
 
 from taiga.base.api import serializers
 
 Neighbor = namedtuple("Neighbor", "left right")
 
 
-def get_neighbors(obj, results_set=None):
-    """Get the neighbors of a model instance.
-
-    The neighbors are the objects that are at the left/right of `obj` in the results set.
-
-    :param obj: The object you want to know its neighbors.
-    :param results_set: Find the neighbors applying the constraints of this set (a Django queryset
-        object).
+def _get_neighbors_ids(obj, results_set):
+    """Get the ids of the neighbors of `obj` in `results_set` with one query.
 
-    :return: Tuple `<left neighbor>, <right neighbor>`. Left and right neighbors can be `None`.
+    :return: Tuple `<left neighbor id>, <right neighbor id>` or `None` if `obj` isn't in
+        the results set.
     """
-    if results_set is None or results_set.count() == 0:
-        results_set = type(obj).objects.get_queryset()
-
     compiler = results_set.query.get_compiler('default')
     base_sql, base_params = compiler.as_sql(with_col_aliases=True)
 
     query = """
-        SELECT * FROM
-            (SELECT "id" as id, ROW_NUMBER() OVER()
+        SELECT prev_id, next_id FROM
+            (SELECT "id" as id, LAG("id") OVER() as prev_id, LEAD("id") OVER() as next_id
                 FROM (%s) as ID_AND_ROW)
-        AS SELECTED_ID_AND_ROW
+        AS SELECTED_ID_AND_NEIGHBORS
         """ % (base_sql)
     query += " WHERE id=%s;"
     params = list(base_params) + [obj.id]
 
-    cursor = connection.cursor()
-    cursor.execute(query, params)
-    row = cursor.fetchone()
-    if row is None:
-        return Neighbor(None, None)
+    key = "neighbors:{}".format(sha1(repr((query, params)).encode("utf-8")).hexdigest())
+    neighbors_ids = cache.get(key)
+    if neighbors_ids is None:
+        with closing(connection.cursor()) as cursor:
+            cursor.execute(query, params)
+            neighbors_ids = cursor.fetchone()
 
-    obj_position = row[1] - 1
+        # A detail view is usually followed by the detail view of its neighbors
+        cache.set(key, neighbors_ids or (), settings.NEIGHBORS_CACHE_TIMEOUT)
 
-    try:
-        left = obj_position > 0 and results_set[obj_position - 1] or None
-    except IndexError:
-        left = None
+    return neighbors_ids or None
+
+
+def get_neighbors(obj, results_set=None):
+    """Get the neighbors of a model instance.
+
+    The neighbors are the objects that are at the left/right of `obj` in the results set.
+
+    :param obj: The object you want to know its neighbors.
+    :param results_set: Find the neighbors applying the constraints of this set (a Django queryset
+        object).
+
+    :return: Tuple `<left neighbor>, <right neighbor>`. Left and right neighbors can be `None`.
+    """
+    default_results_set = type(obj).objects.get_queryset()
+    if results_set is None:
+        results_set = default_results_set
 
     try:
-        right = results_set[obj_position + 1]
-    except IndexError:
-        right = None
+        neighbors_ids = _get_neighbors_ids(obj, results_set)
+    except EmptyResultSet:
+        neighbors_ids = None
+
+    if neighbors_ids is None and results_set is not default_results_set and not results_set.exists():
+        results_set = default_results_set
+        neighbors_ids = _get_neighbors_ids(obj, results_set)
+
+    if neighbors_ids is None:
+        return Neighbor(None, None)
 
-    return Neighbor(left, right)
+    left_id, right_id = neighbors_ids
+    neighbors = results_set.model._default_manager.in_bulk([id for id in neighbors_ids if id is not None])
+    return Neighbor(neighbors.get(left_id), neighbors.get(right_id))
 
 
 class NeighborsSerializerMixin:
@@ -14,7 +14,13 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import collections
+
+from contextlib import closing
+
 from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.db import models
 from django.db import transaction
 
 from . import functions
@@ -96,14 +102,92 @@ def update_in_bulk(instances, list_of_new_values, callback=None, precall=None):
         callback(instance)
 
 
+_UPDATE_IN_BULK_SQL = """
+    UPDATE {table} AS t
+       SET {assignments}
+      FROM (VALUES {values}) AS v({columns})
+     WHERE t.{pk} = v.{pk}
+           {where}
+ RETURNING t.{pk}
+"""
+
+
+def _get_db_type(field) -> str:
+    if isinstance(field, models.AutoField):
+        return "integer"
+    return field.db_type(connection)
+
+
+def update_values_in_bulk(model, values:list, *, only_changed:bool=False, filters:dict=None) -> list:
+    """Update the fields of some rows of a table with one statement.
+
+    :params model: Model of the table.
+    :params values: List of (id, dict) pairs with the new values of each row. All the dicts
+    must have the same fields.
+    :params only_changed: Update only the rows with some value different from the new ones.
+    :params filters: Dict of field values that the updated rows must have too.
+
+    :return: List of the ids of the updated rows.
+    """
+    if not values:
+        return []
+
+    pk_field = model._meta.pk
+    fields = [model._meta.get_field(name) for name in values[0][1].keys()]
+    columns = [pk_field.column] + [field.column for field in fields]
+    casts = [_get_db_type(pk_field)] + [_get_db_type(field) for field in fields]
+
+    row = "({})".format(", ".join("%s::{}".format(cast) for cast in casts))
+    params = []
+    for id, new_values in values:
+        params.append(pk_field.get_db_prep_value(id, connection))
+        params.extend(field.get_db_prep_save(new_values[field.name], connection) for field in fields)
+
+    qn = connection.ops.quote_name
+    where = []
+    for name, value in (filters or {}).items():
+        field = model._meta.get_field(name)
+        where.append("AND t.{} = %s".format(qn(field.column)))
+        params.append(field.get_db_prep_value(value, connection))
+    if only_changed:
+        where.append("AND ({})".format(" OR ".join("t.{0} IS DISTINCT FROM v.{0}".format(qn(field.column))
+                                                   for field in fields)))
+
+    sql = _UPDATE_IN_BULK_SQL.format(
+        table=qn(model._meta.db_table),
+        assignments=", ".join("{0} = v.{0}".format(qn(field.column)) for field in fields),
+        values=", ".join([row] * len(values)),
+        columns=", ".join(qn(column) for column in columns),
+        pk=qn(pk_field.column),
+        where=" ".join(where))
+
+    with closing(connection.cursor()) as cursor:
+        cursor.execute(sql, params)
+        return [id for id, in cursor.fetchall()]
+
+
 @transaction.atomic
-def update_in_bulk_with_ids(ids, list_of_new_values, model):
+def update_in_bulk_with_ids(ids, list_of_new_values, model, *, only_changed=False, filters=None):
     """Update a table using a list of ids.
 
     :params ids: List of ids.
-    :params new_values: List of dicts or duples where each dict/duple is the new data corresponding
+    :params new_values: List of dicts where each dict is the new data corresponding
     to the instance in the same index position as the dict.
     :param model: Model of the ids.
+    :params only_changed: Update only the rows with some value different from the new ones.
+    :params filters: Dict of field values that the updated rows must have too.
+
+    :return: List of the ids of the updated rows.
+
+    The rows with the same fields to update are updated with one
+    statement (see `update_values_in_bulk`).
     """
+    values_by_fields = collections.OrderedDict()
     for id, new_values in zip(ids, list_of_new_values):
-        model.objects.filter(id=id).update(**new_values)
+        fields = tuple(sorted(new_values.keys()))
+        values_by_fields.setdefault(fields, []).append((id, new_values))
+
+    updated_ids = []
+    for values in values_by_fields.values():
+        updated_ids += update_values_in_bulk(model, values, only_changed=only_changed, filters=filters)
+    return updated_ids
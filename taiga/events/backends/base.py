@@ -24,6 +24,14 @@ class BaseEventsPushBackend(object, metaclass=abc.ABCMeta):
     def emit_event(self, message:str, *, routing_key:str, channel:str="events"):
         pass
 
+    def emit_events(self, events:list):
+        """
+        Emit a batch of events, a list of `(message, routing_key, channel)`
+        tuples. Backends can override it to send them together.
+        """
+        for message, routing_key, channel in events:
+            self.emit_event(message, routing_key=routing_key, channel=channel)
+
 
 def load_class(path):
     """
@@ -45,6 +53,9 @@ def load_class(path):
     return klass
 
 
+_backends = {}
+
+
 def get_events_backend(path:str=None, options:dict=None):
     if path is None:
         path = getattr(settings, "EVENTS_PUSH_BACKEND", None)
@@ -55,5 +66,9 @@ def get_events_backend(path:str=None, options:dict=None):
     if options is None:
         options = getattr(settings, "EVENTS_PUSH_BACKEND_OPTIONS", {})
 
-    cls = load_class(path)
-    return cls(**options)
+    # The backends are instantiated once per process and reused
+    key = (path, repr(sorted(options.items())))
+    if key not in _backends:
+        cls = load_class(path)
+        _backends[key] = cls(**options)
+    return _backends[key]
@@ -14,6 +14,8 @@
 
 import json
 import logging
+import os
+import threading
 
 from amqp import Connection as AmqpConnection
 from amqp.basic_message import Message as AmqpMessage
@@ -24,7 +26,7 @@ from . import base
 log = logging.getLogger("tagia.events")
 
 
-def _make_rabbitmq_connection(url):
+def _make_rabbitmq_connection(url, confirm_publish=False):
     parse_result = urlparse(url)
 
     # Parse host & user/password
@@ -39,27 +41,79 @@ def _make_rabbitmq_connection(url):
         (user, password) = ("guest", "guest")
 
     vhost = parse_result.path
-    return AmqpConnection(host=host, userid=user,
-                          password=password, virtual_host=vhost[1:])
+    # With confirm_publish every basic_publish waits for the broker ack
+    return AmqpConnection(host=host, userid=user, password=password,
+                          virtual_host=vhost[1:], confirm_publish=confirm_publish)
 
 
 class EventsPushBackend(base.BaseEventsPushBackend):
-    def __init__(self, url):
+    """
+    Publish the events through a persistent connection (and channel)
+    per process. It is opened again after a fork or a failure.
+    """
+
+    def __init__(self, url, confirm_publish=False):
         self.url = url
+        self.confirm_publish = confirm_publish
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._connection = None
+        self._channel = None
+        self._declared_exchanges = set()
+
+    def _close(self):
+        if self._pid == os.getpid() and self._connection is not None:
+            try:
+                self._connection.close()
+            except Exception:
+                log.warning("Error closing the amqp connection", exc_info=True)
+        self._reset()
+
+    def _get_channel(self):
+        # The connection of the parent process can't be shared after a fork
+        if self._pid != os.getpid():
+            self._reset()
+
+        if self._channel is None:
+            self._connection = _make_rabbitmq_connection(self.url, self.confirm_publish)
+            self._channel = self._connection.channel()
+
+        return self._channel
+
+    def _publish(self, pending:list):
+        """
+        Publish the pending events, removing each one from the list
+        once it's published (and confirmed if confirm_publish is set).
+        """
+        rchannel = self._get_channel()
+
+        while pending:
+            message, routing_key, channel = pending[0]
+            if channel not in self._declared_exchanges:
+                rchannel.exchange_declare(exchange=channel, type="topic", auto_delete=True)
+                self._declared_exchanges.add(channel)
+
+            rchannel.basic_publish(AmqpMessage(message), routing_key=routing_key, exchange=channel)
+            del pending[0]
+
+    def emit_events(self, events:list):
+        pending = list(events)
+        with self._lock:
+            try:
+                self._publish(pending)
+            except Exception:
+                # The connection could be closed by the broker (or an
+                # exchange removed), try once again with a new one but
+                # only with the events not published yet.
+                self._close()
+                try:
+                    self._publish(pending)
+                except Exception:
+                    log.error("Unhandled exception", exc_info=True)
+                    self._close()
 
     def emit_event(self, message:str, *, routing_key:str, channel:str="events"):
-        connection = _make_rabbitmq_connection(self.url)
-
-        try:
-            rchannel = connection.channel()
-            message = AmqpMessage(message)
-
-            rchannel.exchange_declare(exchange=channel, type="topic", auto_delete=True)
-            rchannel.basic_publish(message, routing_key=routing_key, exchange=channel)
-            rchannel.close()
-
-        except Exception:
-            log.error("Unhandled exception", exc_info=True)
-
-        finally:
-            connection.close()
+        self.emit_events([(message, routing_key, channel)])
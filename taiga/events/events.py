@@ -14,8 +14,10 @@
 
 import json
 import collections
+import threading
 
 from django.contrib.contenttypes.models import ContentType
+from django.db import connection
 
 from taiga.base.utils import json
 from taiga.base.utils.db import get_typename_for_model_instance
@@ -33,16 +35,95 @@ watched_types = set([
 ])
 
 
+def _get_routing_key(content_type:str, projectid:int) -> str:
+    app_name, model_name = content_type.split(".", 1)
+    return "changes.project.{0}.{1}".format(projectid, app_name)
+
+
+def _make_message(data:dict, sessionid:str) -> str:
+    return json.dumps({"session_id": sessionid,
+                       "data": data})
+
+
+class TransactionEvents(object):
+    """
+    Events emitted inside a transaction. The changes of the models
+    are deduplicated by (content type, pk, type) and merged in one
+    event per routing key, and everything is sent together when the
+    transaction is committed.
+    """
+
+    def __init__(self):
+        self.events = []
+        self.changes = collections.OrderedDict()
+
+    def add_event(self, message:str, routing_key:str, channel:str):
+        self.events.append((message, routing_key, channel))
+
+    def add_changes(self, ids, content_type:str, projectid:int, *,
+                    type:str, channel:str, sessionid:str):
+        key = (content_type, projectid, type, channel, sessionid)
+        pks = self.changes.setdefault(key, collections.OrderedDict())
+        for pk in ids:
+            pks[pk] = None
+
+    def flush(self):
+        events = []
+        for (content_type, projectid, type, channel, sessionid), pks in self.changes.items():
+            pks = list(pks)
+            data = {"type": type,
+                    "matches": content_type,
+                    "pk": pks[0] if len(pks) == 1 else pks}
+            events.append((_make_message(data, sessionid), _get_routing_key(content_type, projectid), channel))
+        events += self.events
+
+        self.events = []
+        self.changes = collections.OrderedDict()
+
+        if events:
+            backend = backends.get_events_backend()
+            backend.emit_events(events)
+
+
+# Events emitted inside the current transaction
+_local = threading.local()
+_local.transaction_events = None
+
+
+def get_transaction_events() -> TransactionEvents:
+    """
+    Get the events pending to be emitted when the current
+    transaction is committed, or None if there isn't a transaction.
+    """
+    if not connection.in_atomic_block:
+        return None
+
+    transaction_events = getattr(_local, "transaction_events", None)
+    registered = [func for sids, func in connection.run_on_commit]
+    if transaction_events is None or transaction_events.flush not in registered:
+        # New transaction (the previous one was committed or rolled back)
+        transaction_events = TransactionEvents()
+        connection.on_commit(transaction_events.flush)
+        _local.transaction_events = transaction_events
+
+    return transaction_events
+
+
 def emit_event(data:dict, routing_key:str, *,
                sessionid:str=None, channel:str="events"):
     if not sessionid:
         sessionid = mw.get_current_session_id()
 
-    data = {"session_id": sessionid,
-            "data": data}
+    message = _make_message(data, sessionid)
+
+    # The events emitted inside a transaction are sent together on commit
+    transaction_events = get_transaction_events()
+    if transaction_events is not None:
+        transaction_events.add_event(message, routing_key, channel)
+        return
 
     backend = backends.get_events_backend()
-    return backend.emit_event(message=json.dumps(data),
+    return backend.emit_event(message=message,
                               routing_key=routing_key,
                               channel=channel)
 
@@ -62,17 +143,8 @@ def emit_event_for_model(obj, *, type:str="change", channel:str="events",
     projectid = getattr(obj, "project_id")
     pk = getattr(obj, "pk", None)
 
-    app_name, model_name = content_type.split(".", 1)
-    routing_key = "changes.project.{0}.{1}".format(projectid, app_name)
-
-    data = {"type": type,
-            "matches": content_type,
-            "pk": pk}
-
-    return emit_event(routing_key=routing_key,
-                      channel=channel,
-                      sessionid=sessionid,
-                      data=data)
+    return _emit_changes([pk], pk, content_type, projectid, type=type,
+                         channel=channel, sessionid=sessionid)
 
 
 def emit_event_for_ids(ids, content_type:str, projectid:int, *,
@@ -81,14 +153,28 @@ def emit_event_for_ids(ids, content_type:str, projectid:int, *,
     assert isinstance(ids, collections.Iterable)
     assert content_type, "'content_type' parameter is mandatory"
 
-    app_name, model_name = content_type.split(".", 1)
-    routing_key = "changes.project.{0}.{1}".format(projectid, app_name)
+    ids = list(ids)
+    return _emit_changes(ids, ids, content_type, projectid, type=type,
+                         channel=channel, sessionid=sessionid)
+
+
+def _emit_changes(ids:list, pk, content_type:str, projectid:int, *,
+                  type:str, channel:str, sessionid:str):
+    if not sessionid:
+        sessionid = mw.get_current_session_id()
+
+    # The changes inside a transaction are merged and sent on commit
+    transaction_events = get_transaction_events()
+    if transaction_events is not None:
+        transaction_events.add_changes(ids, content_type, projectid, type=type,
+                                       channel=channel, sessionid=sessionid)
+        return
 
     data = {"type": type,
             "matches": content_type,
-            "pk": ids}
+            "pk": pk}
 
-    return emit_event(routing_key=routing_key,
+    return emit_event(routing_key=_get_routing_key(content_type, projectid),
                       channel=channel,
                       sessionid=sessionid,
                       data=data)
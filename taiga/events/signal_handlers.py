@@ -15,7 +15,6 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from django.db.models import signals
-from django.db import connection
 
 from django.dispatch import receiver
 
@@ -39,8 +38,9 @@ def on_save_any_model(sender, instance, created, **kwargs):
     if created:
         type = "create"
 
-    emit_event = lambda: events.emit_event_for_model(instance, sessionid=sesionid, type=type)
-    connection.on_commit(emit_event)
+    # Inside a transaction the event is merged with the rest of
+    # changes and emitted when it is committed.
+    events.emit_event_for_model(instance, sessionid=sesionid, type=type)
 
 
 def on_delete_any_model(sender, instance, **kwargs):
@@ -52,5 +52,4 @@ def on_delete_any_model(sender, instance, **kwargs):
         return
 
     sesionid = mw.get_current_session_id()
-    emit_event = lambda: events.emit_event_for_model(instance, sessionid=sesionid, type="delete")
-    connection.on_commit(emit_event)
+    events.emit_event_for_model(instance, sessionid=sesionid, type="delete")
@@ -14,8 +14,6 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-import json
-import codecs
 import uuid
 
 from django.utils.decorators import method_decorator
@@ -24,7 +22,6 @@ from django.db.transaction import atomic
 from django.db.models import signals
 from django.conf import settings
 from django.core.files.storage import default_storage
-from django.core.files.base import ContentFile
 
 from taiga.base.decorators import detail_route, list_route
 from taiga.base import exceptions as exc
@@ -42,7 +39,7 @@ from . import permissions
 from . import tasks
 from . import dump_service
 from . import throttling
-from .renderers import ExportRenderer
+from .dump_reader import StreamedDump, is_dump_file
 
 from taiga.base.api.utils import get_object_or_404
 
@@ -62,15 +59,11 @@ class ProjectExporterViewSet(mixins.ImportThrottlingPolicyMixin, GenericViewSet)
 
         if settings.CELERY_ENABLED:
             task = tasks.dump_project.delay(request.user, project)
-            tasks.delete_project_dump.apply_async((project.pk, project.slug),
-                                                  countdown=settings.EXPORTS_TTL)
+            path = service.get_project_dump_path(project, task.id)
+            tasks.delete_project_dump.apply_async((path,), countdown=settings.EXPORTS_TTL)
             return response.Accepted({"export_id": task.id})
 
-        path = "exports/{}/{}-{}.json".format(project.pk, project.slug, uuid.uuid4().hex)
-        content = ContentFile(ExportRenderer().render(service.project_to_dict(project),
-                                                      renderer_context={"indent": 4}).decode('utf-8'))
-
-        default_storage.save(path, content)
+        path = service.store_project_dump(project, uuid.uuid4().hex)
         response_data = {
             "url": default_storage.url(path)
         }
@@ -196,21 +189,24 @@ class ProjectImporterViewSet(mixins.ImportThrottlingPolicyMixin, CreateModelMixi
         if not dump:
             raise exc.WrongArguments(_("Needed dump file"))
 
-        reader = codecs.getreader("utf-8")
+        if settings.CELERY_ENABLED:
+            # Only the beginning of the dump is checked here, it's parsed
+            # by the worker that reports the format errors by email
+            if not is_dump_file(dump):
+                raise exc.WrongArguments(_("Invalid dump format"))
+
+            path = default_storage.save("imports/{}.json".format(uuid.uuid4().hex), dump)
+            task = tasks.load_project_dump.delay(request.user, path)
+            return response.Accepted({"import_id": task.id})
 
         try:
-            dump = json.load(reader(dump))
+            streamed_dump = StreamedDump(dump)
         except Exception:
             raise exc.WrongArguments(_("Invalid dump format"))
 
-        if Project.objects.filter(slug=dump['slug']).exists():
-            del dump['slug']
-
-        if settings.CELERY_ENABLED:
-            task = tasks.load_project_dump.delay(request.user, dump)
-            return response.Accepted({"import_id": task.id})
+        with streamed_dump:
+            project = dump_service.load_dump(streamed_dump, request.user.email)
 
-        project = dump_service.dict_to_project(dump, request.user.email)
         response_data = ProjectSerializer(project).data
         return response.Created(response_data)
 
@@ -0,0 +1,232 @@
+# Copyright (C) 2014 Andrey Antukh <niwi@niwi.be>
+# Copyright (C) 2014 Jesús Espino <jespinog@gmail.com>
+# Copyright (C) 2014 David Barragán <bameda@dbarragan.com>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import codecs
+import gzip
+import json
+import tempfile
+import zlib
+
+
+# Sections of a dump that can be arbitrarily big. Their items are
+# parsed one by one and kept out of memory until they are imported.
+STREAMED_SECTIONS = ("milestones", "wiki_pages", "wiki_links", "user_stories",
+                     "tasks", "issues", "timeline")
+
+_WHITESPACE = " \t\n\r"
+_DELIMITERS = ",:]}"
+
+# Beginning of the gzipped dumps (see EXPORTS_GZIP)
+_GZIP_MAGIC = b"\x1f\x8b"
+
+
+class DumpFormatError(Exception):
+    def __init__(self, message):
+        self.message = message
+
+
+class _DumpParser:
+    """
+    Incremental parser of the json object of a dump. It reads the
+    file in chunks and decodes one value at a time, so only the value
+    being decoded (a project field or one item of a section) needs to
+    fit in memory.
+    """
+    def __init__(self, fileobj, chunk_size:int):
+        self._reader = codecs.getreader("utf-8")(fileobj)
+        self._decoder = json.JSONDecoder()
+        self._chunk_size = chunk_size
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self, size:int):
+        data = self._reader.read(size)
+        if not data:
+            self._eof = True
+            return
+
+        self._buffer = self._buffer[self._pos:] + data
+        self._pos = 0
+
+    def _peek(self) -> str:
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+
+            if self._eof:
+                raise DumpFormatError("Unexpected end of the dump")
+            self._fill(self._chunk_size)
+
+    def _next(self) -> str:
+        char = self._peek()
+        self._pos += 1
+        return char
+
+    def _expect(self, expected:str):
+        char = self._next()
+        if char != expected:
+            raise DumpFormatError("Expected '{}' but found '{}'".format(expected, char))
+
+    def _is_delimited(self, pos:int) -> bool:
+        while pos < len(self._buffer) and self._buffer[pos] in _WHITESPACE:
+            pos += 1
+        return pos < len(self._buffer) and self._buffer[pos] in _DELIMITERS
+
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+                # A value not followed by a delimiter could continue in the next
+                # chunk (a number can be decoded partially, like "45." or "1e")
+                if self._eof or self._is_delimited(end):
+                    self._pos = end
+                    return value
+            except ValueError:
+                if self._eof:
+                    raise DumpFormatError("Invalid value in the dump")
+
+            self._fill(max(self._chunk_size, len(self._buffer) - self._pos))
+
+    def events(self):
+        """
+        Generate ("value", key, value) for every field of the dump
+        but the items of the streamed sections, that generate a
+        ("section", key, None) followed by one ("item", key, item)
+        for each item.
+        """
+        self._expect("{")
+        if self._peek() == "}":
+            return
+
+        while True:
+            key = self._value()
+            if not isinstance(key, str):
+                raise DumpFormatError("Invalid key in the dump")
+            self._expect(":")
+
+            if key in STREAMED_SECTIONS and self._peek() == "[":
+                self._next()
+                yield "section", key, None
+
+                if self._peek() == "]":
+                    self._next()
+                else:
+                    while True:
+                        yield "item", key, self._value()
+                        char = self._next()
+                        if char == "]":
+                            break
+                        if char != ",":
+                            raise DumpFormatError("Expected ',' or ']' but found '{}'".format(char))
+            else:
+                yield "value", key, self._value()
+
+            char = self._next()
+            if char == "}":
+                return
+            if char != ",":
+                raise DumpFormatError("Expected ',' or '}}' but found '{}'".format(char))
+
+
+def _open_dump_file(fileobj):
+    """
+    Get a file object with the (uncompressed) json of a dump file,
+    plain or gzipped. The file is rewound.
+    """
+    head = fileobj.read(len(_GZIP_MAGIC))
+    fileobj.seek(0)
+
+    if head == _GZIP_MAGIC:
+        return gzip.GzipFile(fileobj=fileobj, mode="rb")
+    return fileobj
+
+
+def is_dump_file(fileobj, size:int=1024) -> bool:
+    """
+    Cheap check of the beginning of a dump file, plain or gzipped (it
+    must be a json object), without parsing it. The file is rewound.
+    """
+    try:
+        head = _open_dump_file(fileobj).read(size)
+    except (OSError, EOFError, zlib.error):
+        return False
+    finally:
+        fileobj.seek(0)
+
+    if isinstance(head, bytes):
+        head = head.decode("utf-8", errors="ignore")
+    return head.lstrip(_WHITESPACE + "\ufeff").startswith("{")
+
+
+def _iter_spool(spool):
+    spool.seek(0)
+    for line in spool:
+        yield json.loads(line)
+
+
+class StreamedDump(dict):
+    """
+    Project dump read from a (binary, plain or gzipped) file object
+    without loading it into memory.
+
+    The dump is parsed once when created (so format errors are raised
+    here): the project fields and the small sections are stored in the
+    dict as usual, and the items of the big sections are spooled, one
+    json per line, to temporary files. Those sections are iterators
+    over the spooled items, and can be consumed only once.
+    """
+    def __init__(self, fileobj, chunk_size:int=64 * 1024):
+        super().__init__()
+        self._spools = {}
+
+        try:
+            for event, key, value in _DumpParser(_open_dump_file(fileobj), chunk_size).events():
+                if event == "value":
+                    self[key] = value
+                elif event == "section":
+                    self[key] = []
+                else:
+                    spool = self._spools.get(key)
+                    if spool is None:
+                        spool = self._spools[key] = tempfile.TemporaryFile(mode="w+", encoding="utf-8")
+                    spool.write(json.dumps(value))
+                    spool.write("\n")
+        except (OSError, EOFError, zlib.error) as e:
+            self.close()
+            raise DumpFormatError("Invalid gzipped dump") from e
+        except Exception:
+            self.close()
+            raise
+
+        for key, spool in self._spools.items():
+            self[key] = _iter_spool(spool)
+
+    def close(self):
+        for spool in self._spools.values():
+            spool.close()
+        self._spools = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
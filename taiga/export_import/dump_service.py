@@ -16,10 +16,11 @@
 
 from django.utils.translation import ugettext as _
 
-from taiga.projects.models import Membership
+from taiga.projects.models import Membership, Project
 
 from . import serializers
 from . import service
+from .dump_reader import StreamedDump
 
 
 class TaigaImportError(Exception):
@@ -86,6 +87,7 @@ def store_tags_colors(project, data):
     return None
 
 
+@service.bulk_import_scope()
 def dict_to_project(data, owner=None):
     if owner:
         data["owner"] = owner
@@ -183,3 +185,22 @@ def dict_to_project(data, owner=None):
         raise TaigaImportError(_("error importing timelines"))
 
     return proj
+
+
+def load_dump(dump, owner=None):
+    """
+    Import a project from a dump (dict or StreamedDump). If there is
+    already a project with its slug a new one is generated.
+    """
+    if Project.objects.filter(slug=dump.get("slug", None)).exists():
+        del dump["slug"]
+
+    return dict_to_project(dump, owner)
+
+
+def load_dump_file(fileobj, owner=None):
+    """
+    Import a project from a dump file, streaming its big sections.
+    """
+    with StreamedDump(fileobj) as dump:
+        return load_dump(dump, owner)
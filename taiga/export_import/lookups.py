@@ -0,0 +1,104 @@
+# Copyright (C) 2014 Andrey Antukh <niwi@niwi.be>
+# Copyright (C) 2014 Jesús Espino <jespinog@gmail.com>
+# Copyright (C) 2014 David Barragán <bameda@dbarragan.com>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from contextlib import contextmanager
+import threading
+
+from taiga.users import models as users_models
+
+
+####################################
+# Import lookups
+####################################
+
+# Objects resolved by name (or email, or ref...) in the current import
+_local = threading.local()
+_local.lookups = None
+
+
+@contextmanager
+def lookups_scope():
+    """
+    Resolve the users and the project related objects referenced
+    by the dump from in-memory maps inside the block, instead of
+    with one query per field and item. The current scope (if any)
+    is reused.
+    """
+    if getattr(_local, "lookups", None) is not None:
+        yield
+        return
+
+    _local.lookups = {}
+    try:
+        yield
+    finally:
+        _local.lookups = None
+
+
+def _get_lookups():
+    return getattr(_local, "lookups", None)
+
+
+def get_user_by_email(email:str):
+    """
+    Get the user with the given email or None.
+    """
+    lookups = _get_lookups()
+    if lookups is None:
+        return users_models.User.objects.filter(email=email).first()
+
+    users = lookups.setdefault("users", {})
+    if email not in users:
+        users[email] = users_models.User.objects.filter(email=email).first()
+    return users[email]
+
+
+def get_project_object(queryset, project, slug_field:str, value):
+    """
+    Get the object of the queryset of the project with `slug_field`
+    equal to `value`. The objects of the project are loaded once by
+    slug; the ones created later are loaded on demand.
+
+    Raise ObjectDoesNotExist if it doesn't exist.
+    """
+    lookups = _get_lookups()
+    if lookups is None:
+        return queryset.get(**{slug_field: value, "project": project})
+
+    key = (queryset.model, project.id, slug_field)
+    if key not in lookups:
+        lookups[key] = {getattr(obj, slug_field): obj for obj in queryset.filter(project=project)}
+
+    objects = lookups[key]
+    if value not in objects:
+        objects[value] = queryset.get(**{slug_field: value, "project": project})
+    return objects[value]
+
+
+def get_custom_attributes(project, field:str) -> list:
+    """
+    Get the ids and names of the custom attributes of the project in
+    the `field` related manager (userstorycustomattributes...).
+    """
+    lookups = _get_lookups()
+    if lookups is None:
+        return list(getattr(project, field).all().values("id", "name"))
+
+    key = ("custom_attributes", project.id, field)
+    if key not in lookups:
+        lookups[key] = list(getattr(project, field).all().values("id", "name"))
+    return lookups[key]
@@ -14,18 +14,17 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import sys
+
 from django.core.management.base import BaseCommand, CommandError
 
 from taiga.projects.models import Project
-from taiga.export_import.renderers import ExportRenderer
-from taiga.export_import.service import project_to_dict
+from taiga.export_import.service import write_project_dump
 
 
 class Command(BaseCommand):
     args = '<project_slug project_slug ...>'
     help = 'Export a project to json'
-    renderer_context = {"indent": 4}
-    renderer = ExportRenderer()
 
     def handle(self, *args, **options):
         for project_slug in args:
@@ -34,5 +33,5 @@ class Command(BaseCommand):
             except Project.DoesNotExist:
                 raise CommandError('Project "%s" does not exist' % project_slug)
 
-            data = project_to_dict(project)
-            print(self.renderer.render(data, renderer_context=self.renderer_context).decode('utf-8'))
+            write_project_dump(project, sys.stdout.buffer, indent=4)
+            sys.stdout.buffer.write(b"\n")
@@ -19,10 +19,9 @@ from django.db import transaction
 from django.db.models import signals
 from optparse import make_option
 
-import json
-
 from taiga.projects.models import Project
 from taiga.export_import.renderers import ExportRenderer
+from taiga.export_import.dump_reader import StreamedDump
 from taiga.export_import.dump_service import dict_to_project, TaigaImportError
 from taiga.export_import.service import get_errors
 
@@ -41,9 +40,11 @@ class Command(BaseCommand):
         )
 
     def handle(self, *args, **options):
-        data = json.loads(open(args[0], 'r').read())
+        with open(args[0], 'rb') as dump_file:
+            data = StreamedDump(dump_file)
+
         try:
-            with transaction.atomic():
+            with data, transaction.atomic():
                 if options["overwrite"]:
                     receivers_back = signals.post_delete.receivers
                     signals.post_delete.receivers = []
@@ -46,6 +46,8 @@ from taiga.users import models as users_models
 from taiga.projects.votes import services as votes_service
 from taiga.projects.history import services as history_service
 
+from . import lookups
+
 
 class AttachedFileField(serializers.WritableField):
     read_only = False
@@ -109,10 +111,7 @@ class UserRelatedField(RelatedNoneSafeField):
         return None
 
     def from_native(self, data):
-        try:
-            return users_models.User.objects.get(email=data)
-        except users_models.User.DoesNotExist:
-            return None
+        return lookups.get_user_by_email(data)
 
 
 class UserPkField(serializers.RelatedField):
@@ -126,11 +125,10 @@ class UserPkField(serializers.RelatedField):
             return None
 
     def from_native(self, data):
-        try:
-            user = users_models.User.objects.get(email=data)
-            return user.pk
-        except users_models.User.DoesNotExist:
+        user = lookups.get_user_by_email(data)
+        if user is None:
             return None
+        return user.pk
 
 
 class CommentField(serializers.WritableField):
@@ -155,8 +153,7 @@ class ProjectRelatedField(serializers.RelatedField):
 
     def from_native(self, data):
         try:
-            kwargs = {self.slug_field: data, "project": self.context['project']}
-            return self.queryset.get(**kwargs)
+            return lookups.get_project_object(self.queryset, self.context['project'], self.slug_field, data)
         except ObjectDoesNotExist:
             raise ValidationError(_("{}=\"{}\" not found in this project".format(self.slug_field, data)))
 
@@ -567,12 +564,10 @@ class TimelineDataField(serializers.WritableField):
 
     def from_native(self, data):
         new_data = copy.deepcopy(data)
-        try:
-            user = users_models.User.objects.get(email=new_data["user"]["email"])
+        user = lookups.get_user_by_email(new_data["user"]["email"])
+        if user is not None:
             new_data["user"]["id"] = user.id
             del new_data["user"]["email"]
-        except users_models.User.DoesNotExist:
-            pass
 
         return new_data
 
@@ -14,6 +14,11 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from contextlib import contextmanager
+import gzip
+import json
+import tempfile
+import threading
 import uuid
 import os.path as path
 from unidecode import unidecode
@@ -21,14 +26,22 @@ from unidecode import unidecode
 from django.template.defaultfilters import slugify
 from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ObjectDoesNotExist
+from django.core.files.base import File
+from django.core.files.storage import default_storage
+from django.conf import settings
+
+from taiga.base.api.serializers import BaseSerializer
+from taiga.base.api.utils import encoders
 
 from taiga.projects.history.services import make_key_from_model_object
 from taiga.timeline.service import build_project_namespace
+from taiga.timeline import service as timeline_service
 from taiga.projects.references import sequences as seq
 from taiga.projects.references import models as refs
 from taiga.projects.services import find_invited_user
 
 from . import serializers
+from . import lookups
 
 _errors_log = {}
 
@@ -51,6 +64,224 @@ def project_to_dict(project):
     return serializers.ProjectExportSerializer(project).data
 
 
+def _iter_queryset_by_pk(queryset, chunk_size:int):
+    """
+    Iterate over a queryset loading `chunk_size` objects at once,
+    paginating by primary key so the cost doesn't grow with the offset.
+    """
+    last_pk = None
+    while True:
+        chunk = queryset.order_by("pk")
+        if last_pk is not None:
+            chunk = chunk.filter(pk__gt=last_pk)
+
+        chunk = list(chunk[:chunk_size])
+        if not chunk:
+            return
+
+        yield from chunk
+        last_pk = chunk[-1].pk
+
+
+def _iter_project_timeline(project, chunk_size:int):
+    timeline = timeline_service.get_project_timeline(project)
+    cursor = None
+    while True:
+        entries, cursor = timeline_service.get_timeline_page(timeline, chunk_size, cursor)
+        yield from entries
+        if cursor is None:
+            return
+
+
+def _iter_section(project, field_name:str, field, chunk_size:int):
+    """
+    Return the serialized items of a project dump section one by one,
+    or None if the section is not a list of objects.
+    """
+    if field_name == "timeline":
+        objs = _iter_project_timeline(project, chunk_size)
+        serializer_class = serializers.TimelineExportSerializer
+    elif isinstance(field, BaseSerializer) and field.many:
+        objs = _iter_queryset_by_pk(getattr(project, field.source or field_name).all(), chunk_size)
+        serializer_class = type(field)
+    else:
+        return None
+
+    return (serializer_class(obj).data for obj in objs)
+
+
+def write_project_dump(project, fileobj, *, indent:int=None, chunk_size:int=None):
+    """
+    Write the project dump json to a binary file object.
+
+    The big sections (user stories, tasks, issues, wiki pages, timeline...)
+    are serialized in chunks and written object by object, so the memory
+    used doesn't depend on the size of the project.
+    """
+    if chunk_size is None:
+        chunk_size = settings.EXPORTS_CHUNK_SIZE
+
+    def dumps(value, level):
+        content = json.dumps(value, cls=encoders.JSONEncoder, ensure_ascii=False, indent=indent)
+        if indent:
+            content = content.replace("\n", "\n" + " " * indent * level)
+        return content
+
+    def write(content):
+        fileobj.write(content.encode("utf-8"))
+
+    newline = "\n" if indent else ""
+    prefix = " " * (indent or 0)
+    separator = "," if indent else ", "
+
+    serializer = serializers.ProjectExportSerializer(project)
+
+    write("{")
+    for i, (field_name, field) in enumerate(serializer.fields.items()):
+        field.initialize(parent=serializer, field_name=field_name)
+        key = serializer.get_field_key(field_name)
+
+        write("{}{}{}{}: ".format(separator if i else "", newline, prefix, dumps(key, 1)))
+
+        items = _iter_section(project, field_name, field, chunk_size)
+        if items is None:
+            write(dumps(field.field_to_native(project, field_name), 1))
+            continue
+
+        write("[")
+        empty = True
+        for j, item in enumerate(items):
+            write("{}{}{}{}".format(separator if j else "", newline, prefix * 2, dumps(item, 2)))
+            empty = False
+        write("]" if empty else "{}{}]".format(newline, prefix))
+    write("{}}}".format(newline))
+
+
+def get_project_dump_path(project, dump_id:str) -> str:
+    extension = "json.gz" if settings.EXPORTS_GZIP else "json"
+    return "exports/{}/{}-{}.{}".format(project.pk, project.slug, dump_id, extension)
+
+
+def store_project_dump(project, dump_id:str) -> str:
+    """
+    Write the project dump to a temporary file (compressed if
+    EXPORTS_GZIP is enabled) and save it in the default storage.
+    Return the path of the stored dump.
+    """
+    dump_path = get_project_dump_path(project, dump_id)
+
+    with tempfile.TemporaryFile() as tmpfile:
+        if settings.EXPORTS_GZIP:
+            with gzip.GzipFile(fileobj=tmpfile, mode="wb") as gzfile:
+                write_project_dump(project, gzfile, indent=settings.EXPORTS_INDENT)
+        else:
+            write_project_dump(project, tmpfile, indent=settings.EXPORTS_INDENT)
+
+        tmpfile.seek(0)
+        return default_storage.save(dump_path, File(tmpfile))
+
+
+####################################
+# Bulk import
+####################################
+
+# Rows pending to be inserted and max references of the current import
+_bulk_import = threading.local()
+_bulk_import.state = None
+
+
+def _get_bulk_import_state():
+    return getattr(_bulk_import, "state", None)
+
+
+@contextmanager
+def bulk_import_scope(batch_size:int=None):
+    """
+    Inside the block the history and timeline entries are inserted in
+    batches of `batch_size` rows with bulk_create (they have no save
+    logic and their signals are skipped when importing), the related
+    objects are resolved from in-memory maps and the reference sequences
+    are updated once per project instead of once per item.
+
+    The pending rows are written when the block ends without errors.
+    """
+    if _get_bulk_import_state() is not None:
+        yield
+        return
+
+    if batch_size is None:
+        batch_size = settings.IMPORTS_BATCH_SIZE
+
+    _bulk_import.state = {"batch_size": batch_size, "pending": {}, "refs": {}}
+    try:
+        with lookups.lookups_scope():
+            yield
+            flush_bulk_import()
+    finally:
+        _bulk_import.state = None
+
+
+def _save_in_bulk(obj):
+    state = _get_bulk_import_state()
+    if state is None:
+        obj.save()
+        return
+
+    model = obj.__class__
+    pending = state["pending"].setdefault(model, [])
+    pending.append(obj)
+    if len(pending) >= state["batch_size"]:
+        model.objects.bulk_create(pending)
+        state["pending"][model] = []
+
+
+def _flush_refs(state):
+    for sequence_name, max_ref in state["refs"].items():
+        _set_sequence_max(sequence_name, max_ref)
+    state["refs"] = {}
+
+
+def flush_bulk_import():
+    """
+    Write the pending rows and references of the current bulk import.
+    """
+    state = _get_bulk_import_state()
+    if state is None:
+        return
+
+    for model, pending in state["pending"].items():
+        if pending:
+            model.objects.bulk_create(pending)
+    state["pending"] = {}
+
+    _flush_refs(state)
+
+
+def _set_sequence_max(sequence_name:str, value:int):
+    if not seq.exists(sequence_name):
+        seq.create(sequence_name)
+    seq.set_max(sequence_name, value)
+
+
+def _store_ref(project, obj):
+    state = _get_bulk_import_state()
+    sequence_name = refs.make_sequence_name(project)
+
+    if obj.ref:
+        if state is None:
+            _set_sequence_max(sequence_name, obj.ref)
+        else:
+            state["refs"][sequence_name] = max(obj.ref, state["refs"].get(sequence_name, 0))
+        return
+
+    # The new reference must be greater than the ones already imported
+    if state is not None:
+        _flush_refs(state)
+
+    obj.ref, _ = refs.make_reference(obj, project)
+    obj.save()
+
+
 def store_project(data):
     project_data = {}
     for key, value in data.items():
@@ -62,6 +293,7 @@ def store_project(data):
             "issue_types", "userstorycustomattributes", "taskcustomattributes",
             "issuecustomattributes", "roles", "milestones", "wiki_pages",
             "wiki_links", "notify_policies", "user_stories", "issues", "tasks",
+            "timeline",
         ]
         if key not in excluded_fields:
             project_data[key] = value
@@ -217,14 +449,7 @@ def store_task(project, data):
 
         serialized.save()
 
-        if serialized.object.ref:
-            sequence_name = refs.make_sequence_name(project)
-            if not seq.exists(sequence_name):
-                seq.create(sequence_name)
-            seq.set_max(sequence_name, serialized.object.ref)
-        else:
-            serialized.object.ref, _ = refs.make_reference(serialized.object, project)
-            serialized.object.save()
+        _store_ref(project, serialized.object)
 
         for task_attachment in data.get("attachments", []):
             store_attachment(project, serialized.object, task_attachment)
@@ -234,7 +459,7 @@ def store_task(project, data):
 
         custom_attributes_values = data.get("custom_attributes_values", None)
         if custom_attributes_values:
-            custom_attributes = serialized.object.project.taskcustomattributes.all().values('id', 'name')
+            custom_attributes = lookups.get_custom_attributes(project, "taskcustomattributes")
             custom_attributes_values = _use_id_instead_name_as_key_in_custom_attributes_values(custom_attributes,
                                                                                                custom_attributes_values)
             store_custom_attributes_values(serialized.object, custom_attributes_values,
@@ -286,7 +511,7 @@ def store_timeline_entry(project, timeline):
         serialized.object.namespace = build_project_namespace(project)
         serialized.object.object_id = project.id
         serialized.object._importing = True
-        serialized.save()
+        _save_in_bulk(serialized.object)
         return serialized
     add_errors("timeline", serialized.errors)
     return serialized
@@ -299,7 +524,7 @@ def store_history(project, obj, history):
         if serialized.object.diff is None:
             serialized.object.diff = []
         serialized.object._importing = True
-        serialized.save()
+        _save_in_bulk(serialized.object)
         return serialized
     add_errors("history", serialized.errors)
     return serialized
@@ -366,14 +591,7 @@ def store_user_story(project, data):
 
         serialized.save()
 
-        if serialized.object.ref:
-            sequence_name = refs.make_sequence_name(project)
-            if not seq.exists(sequence_name):
-                seq.create(sequence_name)
-            seq.set_max(sequence_name, serialized.object.ref)
-        else:
-            serialized.object.ref, _ = refs.make_reference(serialized.object, project)
-            serialized.object.save()
+        _store_ref(project, serialized.object)
 
         for us_attachment in data.get("attachments", []):
             store_attachment(project, serialized.object, us_attachment)
@@ -386,7 +604,7 @@ def store_user_story(project, data):
 
         custom_attributes_values = data.get("custom_attributes_values", None)
         if custom_attributes_values:
-            custom_attributes = serialized.object.project.userstorycustomattributes.all().values('id', 'name')
+            custom_attributes = lookups.get_custom_attributes(project, "userstorycustomattributes")
             custom_attributes_values = _use_id_instead_name_as_key_in_custom_attributes_values(custom_attributes,
                                                                                                custom_attributes_values)
             store_custom_attributes_values(serialized.object, custom_attributes_values,
@@ -422,14 +640,7 @@ def store_issue(project, data):
 
         serialized.save()
 
-        if serialized.object.ref:
-            sequence_name = refs.make_sequence_name(project)
-            if not seq.exists(sequence_name):
-                seq.create(sequence_name)
-            seq.set_max(sequence_name, serialized.object.ref)
-        else:
-            serialized.object.ref, _ = refs.make_reference(serialized.object, project)
-            serialized.object.save()
+        _store_ref(project, serialized.object)
 
         for attachment in data.get("attachments", []):
             store_attachment(project, serialized.object, attachment)
@@ -439,7 +650,7 @@ def store_issue(project, data):
 
         custom_attributes_values = data.get("custom_attributes_values", None)
         if custom_attributes_values:
-            custom_attributes = serialized.object.project.issuecustomattributes.all().values('id', 'name')
+            custom_attributes = lookups.get_custom_attributes(project, "issuecustomattributes")
             custom_attributes_values = _use_id_instead_name_as_key_in_custom_attributes_values(custom_attributes,
                                                                                                custom_attributes_values)
             store_custom_attributes_values(serialized.object, custom_attributes_values,
@@ -17,7 +17,6 @@
 import datetime
 
 from django.core.files.storage import default_storage
-from django.core.files.base import ContentFile
 from django.utils import timezone
 from django.conf import settings
 from django.utils.translation import ugettext as _
@@ -26,22 +25,16 @@ from djmail.template_mail import MagicMailBuilder, InlineCSSTemplateMail
 
 from taiga.celery import app
 
-from .service import project_to_dict
-from .dump_service import dict_to_project
-from .renderers import ExportRenderer
+from .service import store_project_dump
+from .dump_service import load_dump_file
 
 
 @app.task(bind=True)
 def dump_project(self, user, project):
     mbuilder = MagicMailBuilder(template_mail_cls=InlineCSSTemplateMail)
-    path = "exports/{}/{}-{}.json".format(project.pk, project.slug, self.request.id)
 
     try:
-        content = ExportRenderer().render(project_to_dict(project), renderer_context={"indent": 4})
-        content = content.decode('utf-8')
-        content = ContentFile(content)
-
-        default_storage.save(path, content)
+        path = store_project_dump(project, self.request.id)
         url = default_storage.url(path)
     except Exception:
         ctx = {
@@ -66,16 +59,17 @@ def dump_project(self, user, project):
 
 
 @app.task
-def delete_project_dump(project_id, project_slug, task_id):
-    default_storage.delete("exports/{}/{}-{}.json".format(project_id, project_slug, task_id))
+def delete_project_dump(path):
+    default_storage.delete(path)
 
 
 @app.task
-def load_project_dump(user, dump):
+def load_project_dump(user, path):
     mbuilder = MagicMailBuilder(template_mail_cls=InlineCSSTemplateMail)
 
     try:
-        project = dict_to_project(dump, user.email)
+        with default_storage.open(path) as dump_file:
+            project = load_dump_file(dump_file, user.email)
     except Exception:
         ctx = {
             "user": user,
@@ -85,6 +79,8 @@ def load_project_dump(user, dump):
         email = mbuilder.import_error(user, ctx)
         email.send()
         return
+    finally:
+        default_storage.delete(path)
 
     ctx = {"user": user, "project": project}
     email = mbuilder.load_dump(user, ctx)
@@ -23,28 +23,51 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
+import re
+
 from markdown.extensions import Extension
 from markdown.inlinepatterns import Pattern
+from markdown.preprocessors import Preprocessor
 from markdown.util import etree, AtomicString
 
 from taiga.users.models import User
 
 
+MENTION_RE = r'(@)([a-z0-9.-\.]+)'
+
+
 class MentionsExtension(Extension):
     def extendMarkdown(self, md, md_globals):
-        MENTION_RE = r'(@)([a-z0-9.-\.]+)'
+        md.preprocessors.add('mentions', MentionsPreprocessor(md), '_begin')
+
         mentionsPattern = MentionsPattern(MENTION_RE)
         mentionsPattern.md = md
         md.inlinePatterns.add('mentions', mentionsPattern, '_end')
 
 
+class MentionsPreprocessor(Preprocessor):
+    """
+    Load all the mentioned users of the text at once before
+    rendering it.
+    """
+    mention_re = re.compile(MENTION_RE)
+
+    def run(self, lines):
+        usernames = {username for _, username in self.mention_re.findall("\n".join(lines))}
+        users = User.objects.filter(username__in=usernames) if usernames else []
+        self.markdown.mentions = {user.username: user for user in users}
+        return lines
+
+
 class MentionsPattern(Pattern):
     def handleMatch(self, m):
         username = m.group(3)
 
-        try:
-            user = User.objects.get(username=username)
-        except User.DoesNotExist:
+        # The users that don't exist yet are extracted too (see `mdrender.service._render`)
+        self.md.extracted_data['mentions'].append(username)
+
+        user = self.md.mentions.get(username)
+        if user is None:
             return "@{}".format(username)
 
         url = "/profile/{}".format(username)
@@ -58,6 +81,4 @@ class MentionsPattern(Pattern):
         a.set('title', user.get_full_name())
         a.set('class', "mention")
 
-        self.md.extracted_data['mentions'].append(user)
-
         return a
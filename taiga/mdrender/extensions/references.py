@@ -23,26 +23,59 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
+import re
+
 from markdown.extensions import Extension
 from markdown.inlinepatterns import Pattern
+from markdown.preprocessors import Preprocessor
 from markdown.util import etree
 
-from taiga.projects.references.services import get_instance_by_ref
+from taiga.projects.references.services import get_references_data
 from taiga.front.templatetags.functions import resolve
 
 
+TAIGA_REFERENCE_RE = r'(?<=^|(?<=[^a-zA-Z0-9-\[]))#(\d+)'
+
+
+_reference_re = re.compile(TAIGA_REFERENCE_RE)
+
+
+def get_text_references_data(project, text:str) -> dict:
+    """
+    Get the data needed to render the references of a text (see
+    get_references_data), without any lookup if it has none.
+    """
+    refs = {int(ref) for ref in _reference_re.findall(text)} if "#" in text else set()
+    return get_references_data(project.id, refs) if refs else {}
+
+
 class TaigaReferencesExtension(Extension):
     def __init__(self, project, *args, **kwargs):
         self.project = project
         return super().__init__(*args, **kwargs)
 
     def extendMarkdown(self, md, md_globals):
-        TAIGA_REFERENCE_RE = r'(?<=^|(?<=[^a-zA-Z0-9-\[]))#(\d+)'
+        md.preprocessors.add('taiga-references', TaigaReferencesPreprocessor(md, self.project), '_begin')
+
         referencesPattern = TaigaReferencesPattern(TAIGA_REFERENCE_RE, self.project)
         referencesPattern.md = md
         md.inlinePatterns.add('taiga-references', referencesPattern, '_begin')
 
 
+class TaigaReferencesPreprocessor(Preprocessor):
+    """
+    Resolve all the references of the text at once before
+    rendering it.
+    """
+    def __init__(self, md, project):
+        self.project = project
+        super().__init__(md)
+
+    def run(self, lines):
+        self.markdown.taiga_references = get_text_references_data(self.project, "\n".join(lines))
+        return lines
+
+
 class TaigaReferencesPattern(Pattern):
     def __init__(self, pattern, project):
         self.project = project
@@ -51,22 +84,22 @@ class TaigaReferencesPattern(Pattern):
     def handleMatch(self, m):
         obj_ref = m.group(2)
 
-        instance = get_instance_by_ref(self.project.id, obj_ref)
-        if instance is None or instance.content_object is None:
+        reference = self.md.taiga_references.get(int(obj_ref))
+        if not reference:
             return "#{}".format(obj_ref)
 
-        subject = instance.content_object.subject
+        model_name, subject = reference
 
-        if instance.content_type.model == "userstory":
+        if model_name == "userstory":
             html_classes = "reference user-story"
-        elif instance.content_type.model == "task":
+        elif model_name == "task":
             html_classes = "reference task"
-        elif instance.content_type.model == "issue":
+        elif model_name == "issue":
             html_classes = "reference issue"
         else:
             return "#{}".format(obj_ref)
 
-        url = resolve(instance.content_type.model, self.project.slug, obj_ref)
+        url = resolve(model_name, self.project.slug, obj_ref)
 
         link_text = "&num;{}".format(obj_ref)
 
@@ -76,6 +109,6 @@ class TaigaReferencesPattern(Pattern):
         a.set('title', "#{} {}".format(obj_ref, subject))
         a.set('class', html_classes)
 
-        self.md.extracted_data['references'].append(instance.content_object)
+        self.md.extracted_data['references'].append(int(obj_ref))
 
         return a
@@ -14,8 +14,11 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from collections import OrderedDict
 import hashlib
 import functools
+import threading
+import time
 import bleach
 
 # BEGIN PATCH
@@ -35,11 +38,15 @@ def _serialize(domtree):
 bleach._serialize = _serialize
 # END PATCH
 
+from django.conf import settings
 from django.core.cache import cache
 from django.utils.encoding import force_bytes
 
 from markdown import Markdown
 
+from taiga.projects.references.services import get_referenced_objects
+from taiga.users.models import User
+
 from .extensions.autolink import AutolinkExtension
 from .extensions.automail import AutomailExtension
 from .extensions.semi_sane_lists import SemiSaneListExtension
@@ -48,7 +55,7 @@ from .extensions.strikethrough import StrikethroughExtension
 from .extensions.wikilinks import WikiLinkExtension
 from .extensions.emojify import EmojifyExtension
 from .extensions.mentions import MentionsExtension
-from .extensions.references import TaigaReferencesExtension
+from .extensions.references import TaigaReferencesExtension, get_text_references_data
 from .extensions.target_link import TargetBlankLinkExtension
 
 # Bleach configuration
@@ -85,41 +92,138 @@ def _make_extensions_list(project=None):
 import diff_match_patch
 
 
+class LRUCache:
+    """
+    Minimal thread safe in-process LRU cache, whose entries
+    expire after `timeout` seconds (if it isn't None).
+    """
+    def __init__(self, maxsize:int, timeout:int=None):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                expires, value = self._data.pop(key)
+            except KeyError:
+                return default
+            if expires is not None and expires <= time.monotonic():
+                return default
+            self._data[key] = (expires, value)
+            return value
+
+    def set(self, key, value):
+        expires = time.monotonic() + self.timeout if self.timeout is not None else None
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (expires, value)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# First level of the render cache, in front of the django cache. It can't
+# be invalidated from other processes, so its entries live a short time.
+_local_cache = LRUCache(settings.MDRENDER_LOCAL_CACHE_SIZE, settings.MDRENDER_LOCAL_CACHE_TIMEOUT)
+
+
 def cache_by_sha(func):
+    """
+    Cache the result of func(project, text) by the hash of the text,
+    the project and the data of the objects referenced in the text (so
+    it changes with them), in a process LRU and in the django cache.
+    """
     @functools.wraps(func)
     def _decorator(project, text):
         sha1_hash = hashlib.sha1(force_bytes(text)).hexdigest()
-        key = "{}-{}".format(sha1_hash, project.id)
+        key = "{}:{}-{}".format(func.__name__, sha1_hash, project.id)
+
+        references_data = get_text_references_data(project, text)
+        if references_data:
+            references_hash = hashlib.sha1(force_bytes(repr(sorted(references_data.items())))).hexdigest()
+            key = "{}-{}".format(key, references_hash)
+
+        cached = _local_cache.get(key)
+        if cached is not None:
+            return cached
 
         # Try to get it from the cache
         cached = cache.get(key)
         if cached is not None:
+            _local_cache.set(key, cached)
             return cached
 
         returned_value = func(project, text)
         cache.set(key, returned_value, timeout=None)
+        _local_cache.set(key, returned_value)
         return returned_value
 
     return _decorator
 
 
+# Markdown instances of the current thread by project. Building one
+# (with all the extensions) is expensive, so they are reset and reused.
+_pool = threading.local()
+
+
 def _get_markdown(project):
-    extensions = _make_extensions_list(project=project)
-    md = Markdown(extensions=extensions)
+    if not hasattr(_pool, "instances"):
+        _pool.instances = OrderedDict()
+
+    key = (project.id, project.slug)
+    md = _pool.instances.pop(key, None)
+    if md is None:
+        md = Markdown(extensions=_make_extensions_list(project=project))
+    else:
+        md.reset()
+        # The abbreviations ("extra") are added as inline patterns and reset() keeps them
+        for name in [name for name in md.inlinePatterns.keys() if name.startswith("abbr-")]:
+            del md.inlinePatterns[name]
+
+    _pool.instances[key] = md
+    while len(_pool.instances) > settings.MDRENDER_POOL_SIZE:
+        _pool.instances.popitem(last=False)
+
     md.extracted_data = {"mentions": [], "references": []}
     return md
 
 
 @cache_by_sha
-def render(project, text):
+def _render(project, text):
+    """
+    Render the text and extract the mentioned usernames (existing or
+    not, the users are loaded when they are needed because they could
+    register later) and the refs of the referenced objects. They are
+    cached with the html, so only plain data is kept.
+    """
     md = _get_markdown(project)
-    return bleach.clean(md.convert(text))
+    html = bleach.clean(md.convert(text))
+    return (html, md.extracted_data)
+
+
+def render(project, text):
+    html, _ = _render(project, text)
+    return html
 
 
 def render_and_extract(project, text):
-    md = _get_markdown(project)
-    result = bleach.clean(md.convert(text))
-    return (result, md.extracted_data)
+    html, extracted_data = _render(project, text)
+
+    usernames = extracted_data["mentions"]
+    users = {}
+    if usernames:
+        users = {user.username: user for user in User.objects.filter(username__in=set(usernames))}
+
+    refs = extracted_data["references"]
+    objects = get_referenced_objects(project.id, set(refs)) if refs else {}
+
+    return (html, {"mentions": [users[username] for username in usernames if username in users],
+                   "references": [objects[ref] for ref in refs if ref in objects]})
 
 
 class DiffMatchPatch(diff_match_patch.diff_match_patch):
@@ -15,19 +15,114 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from contextlib import contextmanager
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+
 from taiga.projects.models import Membership, Project
 from .permissions import OWNERS_PERMISSIONS, MEMBERS_PERMISSIONS, ANON_PERMISSIONS, USER_PERMISSIONS
 
 
-def _get_user_project_membership(user, project):
-    if user.is_anonymous():
-        return None
+_OWNERS_PERMISSIONS = frozenset(map(lambda perm: perm[0], OWNERS_PERMISSIONS))
+_MEMBERS_PERMISSIONS = frozenset(map(lambda perm: perm[0], MEMBERS_PERMISSIONS))
+_USER_PERMISSIONS = frozenset(map(lambda perm: perm[0], USER_PERMISSIONS))
+_ANON_PERMISSIONS = frozenset(map(lambda perm: perm[0], ANON_PERMISSIONS))
+_SUPERUSER_PERMISSIONS = _OWNERS_PERMISSIONS | _MEMBERS_PERMISSIONS | _USER_PERMISSIONS | _ANON_PERMISSIONS
+
+
+####################################
+# Memberships resolver
+####################################
+
+# Memberships of the users loaded in the current request
+_local = threading.local()
+_local.memberships = None
+
+
+def set_memberships_memo(memo:dict):
+    _local.memberships = memo
+
+
+@contextmanager
+def memberships_scope():
+    """
+    Load the memberships of every user once inside the block
+    (for example, a request). The current scope (if any) is reused.
+    """
+    if getattr(_local, "memberships", None) is not None:
+        yield
+        return
 
+    set_memberships_memo({})
     try:
-        return Membership.objects.get(user=user, project=project)
-    except Membership.DoesNotExist:
+        yield
+    finally:
+        set_memberships_memo(None)
+
+
+def _get_memberships_cache_key(user_id:int) -> str:
+    return "user-memberships:{}".format(user_id)
+
+
+def _load_user_memberships(user_id:int) -> dict:
+    memberships = Membership.objects.filter(user_id=user_id).select_related("role")
+    return {membership.project_id: membership for membership in memberships}
+
+
+def get_user_memberships(user) -> dict:
+    """
+    Get the memberships (with their roles) of a user by project id.
+
+    They are loaded once per memberships scope and, if
+    PERMISSIONS_CACHE_ENABLED is set, shared between requests.
+    """
+    if user.is_anonymous():
+        return {}
+
+    memo = getattr(_local, "memberships", None)
+    if memo is not None and user.id in memo:
+        return memo[user.id]
+
+    memberships = None
+    if settings.PERMISSIONS_CACHE_ENABLED:
+        memberships = cache.get(_get_memberships_cache_key(user.id))
+
+    if memberships is None:
+        memberships = _load_user_memberships(user.id)
+        if settings.PERMISSIONS_CACHE_ENABLED:
+            cache.set(_get_memberships_cache_key(user.id), memberships,
+                      settings.PERMISSIONS_CACHE_TIMEOUT)
+
+    if memo is not None:
+        memo[user.id] = memberships
+    return memberships
+
+
+def invalidate_user_memberships(user_ids:list):
+    memo = getattr(_local, "memberships", None)
+    for user_id in user_ids:
+        if memo is not None:
+            memo.pop(user_id, None)
+
+    if settings.PERMISSIONS_CACHE_ENABLED:
+        cache.delete_many([_get_memberships_cache_key(user_id) for user_id in user_ids])
+
+
+def _get_user_project_membership(user, project):
+    if user.is_anonymous() or project is None:
         return None
 
+    # Outside a memberships scope and without the cache loading every
+    # membership of the user is wasted, only this one is needed
+    if getattr(_local, "memberships", None) is None and not settings.PERMISSIONS_CACHE_ENABLED:
+        return (Membership.objects.filter(user_id=user.id, project_id=project.id)
+                                  .select_related("role")
+                                  .first())
+
+    return get_user_memberships(user).get(project.id, None)
+
 def _get_object_project(obj):
     project = None
 
@@ -75,34 +170,43 @@ def _get_membership_permissions(membership):
 
 
 def get_user_project_permissions(user, project):
-    membership = _get_user_project_membership(user, project)
+    if user.is_superuser or user.is_anonymous():
+        return _get_permissions(user, project, None)
+
+    return _get_permissions(user, project, _get_user_project_membership(user, project))
+
+
+def get_users_project_permissions(users, project) -> dict:
+    """
+    Get the permissions of several users over a project (loading
+    their memberships with one query) by user id.
+    """
+    users = list(users)
+    user_ids = [user.id for user in users if not user.is_anonymous()]
+    memberships = Membership.objects.filter(project_id=project.id, user_id__in=user_ids).select_related("role")
+    memberships = {membership.user_id: membership for membership in memberships}
+
+    return {user.id: _get_permissions(user, project, memberships.get(user.id, None)) for user in users}
+
+
+def _get_permissions(user, project, membership):
     if user.is_superuser:
-        owner_permissions = list(map(lambda perm: perm[0], OWNERS_PERMISSIONS))
-        members_permissions = list(map(lambda perm: perm[0], MEMBERS_PERMISSIONS))
-        public_permissions = list(map(lambda perm: perm[0], USER_PERMISSIONS))
-        anon_permissions = list(map(lambda perm: perm[0], ANON_PERMISSIONS))
-    elif membership:
+        return set(_SUPERUSER_PERMISSIONS)
+
+    anon_permissions = project.anon_permissions or []
+    if user.is_anonymous():
+        return set(anon_permissions)
+
+    permissions = set(anon_permissions)
+    permissions.update(project.public_permissions or [])
+
+    if membership:
         if membership.is_owner:
-            owner_permissions = list(map(lambda perm: perm[0], OWNERS_PERMISSIONS))
-            members_permissions = list(map(lambda perm: perm[0], MEMBERS_PERMISSIONS))
-        else:
-            owner_permissions = []
-            members_permissions = []
-        members_permissions = members_permissions + _get_membership_permissions(membership)
-        public_permissions = project.public_permissions if project.public_permissions is not None else []
-        anon_permissions = project.anon_permissions if project.anon_permissions is not None else []
-    elif user.is_authenticated():
-        owner_permissions = []
-        members_permissions = []
-        public_permissions = project.public_permissions if project.public_permissions is not None else []
-        anon_permissions = project.anon_permissions if project.anon_permissions is not None else []
-    else:
-        owner_permissions = []
-        members_permissions = []
-        public_permissions = []
-        anon_permissions = project.anon_permissions if project.anon_permissions is not None else []
+            permissions.update(_OWNERS_PERMISSIONS)
+            permissions.update(_MEMBERS_PERMISSIONS)
+        permissions.update(_get_membership_permissions(membership))
 
-    return set(owner_permissions + members_permissions + public_permissions + anon_permissions)
+    return permissions
 
 
 def set_base_permissions_for_project(project):
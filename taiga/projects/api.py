@@ -37,6 +37,7 @@ from taiga.projects.mixins.on_destroy import MoveOnDestroyMixin
 from taiga.projects.userstories.models import UserStory, RolePoints
 from taiga.projects.tasks.models import Task
 from taiga.projects.issues.models import Issue
+from taiga.projects.issues.api import IssuesFilter
 from taiga.permissions import service as permissions_service
 
 from . import serializers
@@ -164,7 +165,8 @@ class ProjectViewSet(HistoryResourceMixin, ModelCrudViewSet):
     def issue_filters_data(self, request, pk=None):
         project = self.get_object()
         self.check_permissions(request, "issues_filters_data", project)
-        return response.Ok(services.get_issues_filters_data(project))
+        filters = IssuesFilter()._prepare_filters_data(request)
+        return response.Ok(services.get_issues_filters_data(project, filters))
 
     @detail_route(methods=["GET"])
     def tags_colors(self, request, pk=None):
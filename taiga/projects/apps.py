@@ -51,3 +51,42 @@ class ProjectsAppConfig(AppConfig):
                                  sender=apps.get_model("projects", "Project"))
         signals.pre_save.connect(handlers.update_project_tags_when_create_or_edit_taggable_item,
                                   sender=apps.get_model("projects", "Project"))
+
+        # Points rollup
+        for model in [apps.get_model("userstories", "UserStory"),
+                      apps.get_model("milestones", "Milestone"),
+                      apps.get_model("projects", "Points")]:
+            signals.post_save.connect(handlers.invalidate_points_rollup, sender=model,
+                                      dispatch_uid="invalidate_points_rollup_on_save_{}".format(model._meta.model_name))
+            signals.post_delete.connect(handlers.invalidate_points_rollup, sender=model,
+                                        dispatch_uid="invalidate_points_rollup_on_delete_{}".format(model._meta.model_name))
+
+        signals.post_save.connect(handlers.invalidate_points_rollup_for_role_points,
+                                  sender=apps.get_model("userstories", "RolePoints"),
+                                  dispatch_uid="invalidate_points_rollup_on_save_rolepoints")
+        signals.post_delete.connect(handlers.invalidate_points_rollup_for_role_points,
+                                    sender=apps.get_model("userstories", "RolePoints"),
+                                    dispatch_uid="invalidate_points_rollup_on_delete_rolepoints")
+
+        # Issues filters data
+        for model in [apps.get_model("issues", "Issue"),
+                      apps.get_model("projects", "IssueStatus"),
+                      apps.get_model("projects", "IssueType"),
+                      apps.get_model("projects", "Priority"),
+                      apps.get_model("projects", "Severity"),
+                      apps.get_model("projects", "Membership")]:
+            signals.post_save.connect(handlers.invalidate_issues_filters_data_handler, sender=model,
+                                      dispatch_uid="invalidate_issues_filters_data_on_save_{}".format(model._meta.model_name))
+            signals.post_delete.connect(handlers.invalidate_issues_filters_data_handler, sender=model,
+                                        dispatch_uid="invalidate_issues_filters_data_on_delete_{}".format(model._meta.model_name))
+
+        # Permissions
+        signals.post_save.connect(handlers.invalidate_memberships_for_membership,
+                                  sender=apps.get_model("projects", "Membership"),
+                                  dispatch_uid="invalidate_memberships_on_save_membership")
+        signals.post_delete.connect(handlers.invalidate_memberships_for_membership,
+                                    sender=apps.get_model("projects", "Membership"),
+                                    dispatch_uid="invalidate_memberships_on_delete_membership")
+        signals.post_save.connect(handlers.invalidate_memberships_for_role,
+                                  sender=apps.get_model("users", "Role"),
+                                  dispatch_uid="invalidate_memberships_on_save_role")
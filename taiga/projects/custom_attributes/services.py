@@ -15,55 +15,22 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from django.db import transaction
-from django.db import connection
+
+from taiga.projects.services.bulk_update_order import update_order_in_bulk
+
+from . import models
 
 
 @transaction.atomic
 def bulk_update_userstory_custom_attribute_order(project, user, data):
-    cursor = connection.cursor()
-
-    sql = """
-    prepare bulk_update_order as update custom_attributes_userstorycustomattribute set "order" = $1
-        where custom_attributes_userstorycustomattribute.id = $2 and
-              custom_attributes_userstorycustomattribute.project_id = $3;
-    """
-    cursor.execute(sql)
-    for id, order in data:
-        cursor.execute("EXECUTE bulk_update_order (%s, %s, %s);",
-                       (order, id, project.id))
-    cursor.execute("DEALLOCATE bulk_update_order")
-    cursor.close()
+    update_order_in_bulk(models.UserStoryCustomAttribute, project, data)
 
 
 @transaction.atomic
 def bulk_update_task_custom_attribute_order(project, user, data):
-    cursor = connection.cursor()
-
-    sql = """
-    prepare bulk_update_order as update custom_attributes_taskcustomattribute set "order" = $1
-        where custom_attributes_taskcustomattribute.id = $2 and
-              custom_attributes_taskcustomattribute.project_id = $3;
-    """
-    cursor.execute(sql)
-    for id, order in data:
-        cursor.execute("EXECUTE bulk_update_order (%s, %s, %s);",
-                       (order, id, project.id))
-    cursor.execute("DEALLOCATE bulk_update_order")
-    cursor.close()
+    update_order_in_bulk(models.TaskCustomAttribute, project, data)
 
 
 @transaction.atomic
 def bulk_update_issue_custom_attribute_order(project, user, data):
-    cursor = connection.cursor()
-
-    sql = """
-    prepare bulk_update_order as update custom_attributes_issuecustomattribute set "order" = $1
-        where custom_attributes_issuecustomattribute.id = $2 and
-              custom_attributes_issuecustomattribute.project_id = $3;
-    """
-    cursor.execute(sql)
-    for id, order in data:
-        cursor.execute("EXECUTE bulk_update_order (%s, %s, %s);",
-                       (order, id, project.id))
-    cursor.execute("DEALLOCATE bulk_update_order")
-    cursor.close()
+    update_order_in_bulk(models.IssueCustomAttribute, project, data)
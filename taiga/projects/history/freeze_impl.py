@@ -14,11 +14,12 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from collections import defaultdict
+from contextlib import contextmanager
 from contextlib import suppress
 
 from functools import partial
 from django.apps import apps
-from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ObjectDoesNotExist
 
 from taiga.base.utils.iterators import as_tuple
@@ -26,43 +27,131 @@ from taiga.base.utils.iterators import as_dict
 from taiga.mdrender.service import render as mdrender
 
 import os
+import threading
 
 ####################
 # Values
 ####################
 
-@as_dict
-def _get_generic_values(ids:tuple, *, typename=None, attr:str="name") -> tuple:
-    app_label, model_name = typename.split(".", 1)
-    content_type = ContentType.objects.get(app_label=app_label, model=model_name)
-    model_cls = content_type.model_class()
+class ValuesResolver(object):
+    """
+    Resolves the ids referenced by the history diffs to
+    their values with only one query for every kind of
+    value, memoizing the results.
+
+    While it is collecting, the requested ids are only
+    recorded (and empty dicts are returned), so the ids of
+    a whole batch of diffs can be resolved at once later.
+    """
+
+    def __init__(self):
+        self.is_collecting = False
+        self._values = defaultdict(dict)
+        self._resolved = defaultdict(set)
+        self._pending = defaultdict(set)
+
+    @contextmanager
+    def collecting(self):
+        self.is_collecting = True
+        try:
+            yield self
+        finally:
+            self.is_collecting = False
+
+    def resolve(self, name, loader, ids) -> dict:
+        keys = {str(x) for x in ids if x is not None}
+        missing = keys - self._resolved[name]
+
+        if self.is_collecting:
+            self._pending[name].update(missing)
+            return {}
+
+        missing.update(self._pending.pop(name, set()))
+        if missing:
+            self._values[name].update(loader(tuple(missing)))
+            self._resolved[name].update(missing)
+
+        values = self._values[name]
+        return {key: values[key] for key in keys if key in values}
+
+
+_local = threading.local()
+_local.values_resolver = None
+
+
+def get_values_resolver() -> ValuesResolver:
+    """
+    Get the current values resolver (for example, the one of
+    the current request) or a new one if there isn't any.
+    """
+    resolver = getattr(_local, "values_resolver", None)
+    if resolver is None:
+        return ValuesResolver()
+    return resolver
+
+
+def set_values_resolver(resolver:ValuesResolver):
+    _local.values_resolver = resolver
 
-    ids = filter(lambda x: x is not None, ids)
+
+@contextmanager
+def values_resolver_scope():
+    """
+    Share the same values resolver inside the block. The current
+    one (if any) is reused, so the memo lives the whole request.
+    """
+    resolver = getattr(_local, "values_resolver", None)
+    if resolver is not None:
+        yield resolver
+        return
+
+    resolver = ValuesResolver()
+    set_values_resolver(resolver)
+    try:
+        yield resolver
+    finally:
+        set_values_resolver(None)
+
+
+@as_dict
+def _load_generic_values(ids:tuple, *, typename=None, attr:str="name") -> dict:
+    model_cls = apps.get_model(typename)
     qs = model_cls.objects.filter(pk__in=ids)
     for instance in qs:
         yield str(instance.pk), getattr(instance, attr)
 
 
 @as_dict
-def _get_users_values(ids:set) -> dict:
+def _load_users_values(ids:tuple) -> dict:
     user_model = apps.get_model("users", "User")
-    ids = filter(lambda x: x is not None, ids)
-    qs = user_model.objects.filter(pk__in=tuple(ids))
+    qs = user_model.objects.filter(pk__in=ids)
 
     for user in qs:
         yield str(user.pk), user.get_full_name()
 
 
 @as_dict
-def _get_user_story_values(ids:set) -> dict:
+def _load_user_story_values(ids:tuple) -> dict:
     userstory_model = apps.get_model("userstories", "UserStory")
-    ids = filter(lambda x: x is not None, ids)
-    qs = userstory_model.objects.filter(pk__in=tuple(ids))
+    qs = userstory_model.objects.filter(pk__in=ids)
 
     for userstory in qs:
         yield str(userstory.pk), "#{} {}".format(userstory.ref, userstory.subject)
 
 
+def _get_generic_values(ids:tuple, *, typename=None, attr:str="name") -> dict:
+    loader = partial(_load_generic_values, typename=typename, attr=attr)
+    return get_values_resolver().resolve("{}.{}".format(typename, attr), loader, ids)
+
+
+def _get_users_values(ids:set) -> dict:
+    return get_values_resolver().resolve("users.user", _load_users_values, ids)
+
+
+def _get_user_story_values(ids:set) -> dict:
+    return get_values_resolver().resolve("userstories.userstory", _load_user_story_values, ids)
+
+
 _get_us_status_values = partial(_get_generic_values, typename="projects.userstorystatus")
 _get_task_status_values = partial(_get_generic_values, typename="projects.taskstatus")
 _get_issue_status_values = partial(_get_generic_values, typename="projects.issuestatus")
@@ -255,11 +344,8 @@ def milestone_freezer(milestone) -> dict:
 
 
 def userstory_freezer(us) -> dict:
-    rp_cls = apps.get_model("userstories", "RolePoints")
-    rpqsd = rp_cls.objects.filter(user_story=us)
-
     points = {}
-    for rp in rpqsd:
+    for rp in us.role_points.all():
         points[str(rp.role_id)] = rp.points_id
 
     snapshot = {
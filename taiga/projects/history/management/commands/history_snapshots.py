@@ -0,0 +1,63 @@
+# Copyright (C) 2014 Andrey Antukh <niwi@niwi.be>
+# Copyright (C) 2014 Jesús Espino <jespinog@gmail.com>
+# Copyright (C) 2014 David Barragán <bameda@dbarragan.com>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+# Examples:
+# python manage.py history_snapshots
+# python manage.py history_snapshots --verify
+
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+from django_pglocks import advisory_lock
+
+from taiga.projects.history.models import HistoryEntry, HistorySnapshot
+from taiga.projects.history import services
+
+
+class Command(BaseCommand):
+    help = 'Backfill (or verify) the materialized history snapshots'
+    option_list = BaseCommand.option_list + (
+        make_option('--verify',
+                    action='store_true',
+                    dest='verify',
+                    default=False,
+                    help='Only verify the stored snapshots against the diffs replay'),
+        )
+
+    def handle(self, *args, **options):
+        keys = HistoryEntry.objects.order_by("key").values_list("key", flat=True).distinct()
+
+        mismatches = 0
+        for key in keys.iterator():
+            with advisory_lock(key):
+                fobj, need_real_snapshot = services.get_last_snapshot_for_key_from_diffs(key)
+                if fobj is None:
+                    continue
+
+                partial_diffs = services.count_partial_diffs_for_key(key)
+                if not options["verify"]:
+                    services.store_current_snapshot(key, fobj.snapshot, partial_diffs)
+                    continue
+
+                current = HistorySnapshot.objects.filter(key=key).first()
+                if (current is None or current.snapshot != fobj.snapshot or
+                        current.partial_diffs != partial_diffs):
+                    mismatches += 1
+                    self.stdout.write("Mismatch: {}".format(key))
+
+        if options["verify"]:
+            self.stdout.write("{} mismatches found".format(mismatches))
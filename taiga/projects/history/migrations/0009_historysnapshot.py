@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+import django.utils.timezone
+import django_pgjson.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('history', '0008_auto_20150508_1028'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistorySnapshot',
+            fields=[
+                ('key', models.CharField(serialize=False, max_length=255, primary_key=True)),
+                ('snapshot', django_pgjson.fields.JsonField(null=True, default=None, blank=True)),
+                ('partial_diffs', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+            },
+            bases=(models.Model,),
+        ),
+    ]
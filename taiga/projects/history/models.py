@@ -242,3 +242,22 @@ class HistoryEntry(models.Model):
 
     class Meta:
         ordering = ["created_at"]
+
+
+class HistorySnapshot(models.Model):
+    """
+    Materialized current state of every history key.
+
+    It is kept up to date by `take_snapshot` so the previous
+    state of an object can be obtained with a single row
+    lookup instead of replaying the partial diffs.
+    """
+    key = models.CharField(primary_key=True, max_length=255)
+
+    # Stores the current frozen object snapshot
+    snapshot = JsonField(null=True, blank=True, default=None)
+
+    # Number of partial entries since the last complete snapshot
+    partial_diffs = models.IntegerField(default=0)
+
+    updated_at = models.DateTimeField(default=timezone.now)
@@ -27,6 +27,8 @@ This is possible example:
 """
 import logging
 from collections import namedtuple
+from collections import OrderedDict
+from contextlib import ExitStack
 from copy import deepcopy
 from functools import partial
 from functools import wraps
@@ -37,13 +39,18 @@ from django.contrib.contenttypes.models import ContentType
 from django.core.paginator import Paginator, InvalidPage
 from django.apps import apps
 from django.db import transaction as tx
+from django.db.models import F
+from django.db.models.query import prefetch_related_objects
+from django.utils import timezone
 from django_pglocks import advisory_lock
 
 from taiga.mdrender.service import render as mdrender
 from taiga.base.utils.db import get_typename_for_model_class
 from taiga.base.utils.diff import make_diff as make_diff_from_dicts
+from taiga.base.utils.iterators import split_by_n
 
 from .models import HistoryType
+from .freeze_impl import values_resolver_scope
 
 
 # Type that represents a freezed object
@@ -53,6 +60,10 @@ FrozenDiff = namedtuple("FrozenDiff", ["key", "diff", "snapshot"])
 # Dict containing registred contentypes with their freeze implementation.
 _freeze_impl_map = {}
 
+# Dict containing registred contentypes with the related lookups
+# used by their freeze implementation.
+_freeze_prefetch_map = {}
+
 # Dict containing registred containing with their values implementation.
 _values_impl_map = {}
 
@@ -63,6 +74,10 @@ _not_important_fields = {
     "tasks.task": frozenset(["us_order", "taskboard_order"]),
 }
 
+# Max number of objects (and advisory locks) processed
+# together when taking snapshots in bulk.
+SNAPSHOTS_IN_BULK_CHUNK_SIZE = 100
+
 log = logging.getLogger("taiga.history")
 
 
@@ -109,27 +124,45 @@ def register_values_implementation(typename:str, fn=None):
     return _wrapper
 
 
-def register_freeze_implementation(typename:str, fn=None):
+def register_freeze_implementation(typename:str, fn=None, *, prefetch_related:tuple=()):
     """
     Register freeze implementation for specified typename.
     This function can be used as decorator.
+
+    `prefetch_related` are the related lookups used by the
+    implementation, prefetched when freezing in bulk.
     """
 
     assert isinstance(typename, str), "typename must be specied"
 
     if fn is None:
-        return partial(register_freeze_implementation, typename)
+        return partial(register_freeze_implementation, typename,
+                       prefetch_related=prefetch_related)
 
     @wraps(fn)
     def _wrapper(*args, **kwargs):
         return fn(*args, **kwargs)
 
     _freeze_impl_map[typename] = _wrapper
+    _freeze_prefetch_map[typename] = tuple(prefetch_related)
     return _wrapper
 
 
 # Low level api
 
+def _freeze_model_instance(obj:object) -> FrozenObj:
+    typename = get_typename_for_model_class(obj.__class__)
+    if typename not in _freeze_impl_map:
+        raise RuntimeError("No implementation found for {}".format(typename))
+
+    key = make_key_from_model_object(obj)
+    impl_fn = _freeze_impl_map[typename]
+    snapshot = impl_fn(obj)
+    assert isinstance(snapshot, dict), "freeze handlers should return always a dict"
+
+    return FrozenObj(key, snapshot)
+
+
 def freeze_model_instance(obj:object) -> FrozenObj:
     """
     Creates a new frozen object from model instance.
@@ -142,22 +175,41 @@ def freeze_model_instance(obj:object) -> FrozenObj:
     model_cls = obj.__class__
 
     # Additional query for test if object is really exists
-    # on the database or it is removed.
+    # on the database or it is removed (and to not use the
+    # related objects prefetched before the last changes).
     try:
         obj = model_cls.objects.get(pk=obj.pk)
     except model_cls.DoesNotExist:
         return None
 
-    typename = get_typename_for_model_class(model_cls)
+    return _freeze_model_instance(obj)
+
+
+def freeze_model_instances(objs:list) -> list:
+    """
+    Creates new frozen objects from a list of model
+    instances of the same type.
+
+    All the related objects used by the freeze implementation
+    are prefetched at once, so the number of queries does not
+    depend on the number of instances. The result has the same
+    order than `objs` (with None for the not saved instances).
+    """
+    objs = list(objs)
+    if not objs:
+        return []
+
+    typename = get_typename_for_model_class(objs[0].__class__)
     if typename not in _freeze_impl_map:
         raise RuntimeError("No implementation found for {}".format(typename))
 
-    key = make_key_from_model_object(obj)
-    impl_fn = _freeze_impl_map[typename]
-    snapshot = impl_fn(obj)
-    assert isinstance(snapshot, dict), "freeze handlers should return always a dict"
+    saved_objs = [obj for obj in objs if obj.pk is not None]
+    for obj in saved_objs:
+        # The related objects prefetched before could be outdated
+        obj._prefetched_objects_cache = {}
+    prefetch_related_objects(saved_objs, list(_freeze_prefetch_map.get(typename, ())))
 
-    return FrozenObj(key, snapshot)
+    return [_freeze_model_instance(obj) if obj.pk is not None else None for obj in objs]
 
 
 def is_hidden_snapshot(obj:FrozenDiff) -> bool:
@@ -213,6 +265,25 @@ def make_diff_values(typename:str, fdiff:FrozenDiff) -> dict:
     return impl_fn(fdiff.diff)
 
 
+def make_diff_values_in_bulk(typename:str, fdiffs:list) -> list:
+    """
+    Same as `make_diff_values` for a list of diffs. The ids
+    referenced by all the diffs are resolved together, with
+    only one query for every kind of value.
+    """
+    if typename not in _values_impl_map:
+        log.warning("No implementation found of '{}' for values.".format(typename))
+        return [{} for fdiff in fdiffs]
+
+    impl_fn = _values_impl_map[typename]
+    with values_resolver_scope() as resolver:
+        with resolver.collecting():
+            for fdiff in fdiffs:
+                impl_fn(fdiff.diff)
+
+        return [impl_fn(fdiff.diff) for fdiff in fdiffs]
+
+
 def _rebuild_snapshot_from_diffs(keysnapshot, partials):
     result = deepcopy(keysnapshot)
 
@@ -223,7 +294,11 @@ def _rebuild_snapshot_from_diffs(keysnapshot, partials):
     return result
 
 
-def get_last_snapshot_for_key(key:str) -> FrozenObj:
+def get_last_snapshot_for_key_from_diffs(key:str) -> FrozenObj:
+    """
+    Rebuild the last snapshot of a key replaying the partial
+    diffs stored after the last complete snapshot.
+    """
     entry_model = apps.get_model("history", "HistoryEntry")
 
     # Search last snapshot
@@ -250,6 +325,66 @@ def get_last_snapshot_for_key(key:str) -> FrozenObj:
     return FrozenObj(keysnapshot.key, snapshot), False
 
 
+def count_partial_diffs_for_key(key:str) -> int:
+    entry_model = apps.get_model("history", "HistoryEntry")
+    keysnapshot = (entry_model.objects
+                   .filter(key=key, is_snapshot=True)
+                   .order_by("-created_at")
+                   .first())
+
+    if keysnapshot is None:
+        return 0
+
+    return (entry_model.objects
+            .filter(key=key, is_snapshot=False)
+            .filter(created_at__gte=keysnapshot.created_at)
+            .count())
+
+
+def get_last_snapshot_for_key(key:str) -> FrozenObj:
+    """
+    Get the last snapshot of a key from the materialized
+    snapshots table, falling back to replay the diffs for
+    keys that are not stored there yet.
+    """
+    snapshot_model = apps.get_model("history", "HistorySnapshot")
+    current = snapshot_model.objects.filter(key=key).first()
+    if current is None:
+        return get_last_snapshot_for_key_from_diffs(key)
+
+    max_partial_diffs = getattr(settings, "MAX_PARTIAL_DIFFS", 60)
+    return FrozenObj(current.key, current.snapshot), current.partial_diffs >= max_partial_diffs
+
+
+def store_current_snapshot(key:str, snapshot:dict, partial_diffs:int):
+    snapshot_model = apps.get_model("history", "HistorySnapshot")
+    snapshot_model.objects.update_or_create(key=key, defaults={
+        "snapshot": snapshot,
+        "partial_diffs": partial_diffs,
+        "updated_at": timezone.now(),
+    })
+
+
+def _update_current_snapshot(key:str, old_fobj:FrozenObj, fdiff:FrozenDiff, is_snapshot:bool):
+    if is_snapshot:
+        store_current_snapshot(key, fdiff.snapshot, 0)
+        return
+
+    # Same result that replaying the diffs
+    snapshot = _rebuild_snapshot_from_diffs(old_fobj.snapshot, [fdiff])
+    snapshot_model = apps.get_model("history", "HistorySnapshot")
+    updated = (snapshot_model.objects
+               .filter(key=key)
+               .update(snapshot=snapshot,
+                       partial_diffs=F("partial_diffs") + 1,
+                       updated_at=timezone.now()))
+
+    # The key was not materialized yet (history previous to the
+    # snapshots table or imported from a dump)
+    if not updated:
+        store_current_snapshot(key, snapshot, count_partial_diffs_for_key(key))
+
+
 # Public api
 
 def get_modified_fields(obj:object, last_modifications):
@@ -271,6 +406,86 @@ def get_modified_fields(obj:object, last_modifications):
     return modified_fields
 
 
+def _make_history_entry_data(obj:object, new_fobj:FrozenObj, *, comment:str="", user=None,
+                             delete:bool=False):
+    """
+    Compute the diff of the object against its last snapshot and
+    return the data of the new history entry (without values) with
+    the old frozen object and the diff, or None if the entry should
+    not be created.
+
+    It should be called holding the advisory lock of the object key.
+    """
+    key = make_key_from_model_object(obj)
+    old_fobj, need_real_snapshot = get_last_snapshot_for_key(key)
+
+    user_id = None if user is None else user.id
+    user_name = "" if user is None else user.get_full_name()
+
+    # Determine history type
+    if delete:
+        entry_type = HistoryType.delete
+    elif new_fobj and not old_fobj:
+        entry_type = HistoryType.create
+    elif new_fobj and old_fobj:
+        entry_type = HistoryType.change
+    else:
+        raise RuntimeError("Unexpected condition")
+
+    fdiff = make_diff(old_fobj, new_fobj)
+
+    # If diff and comment are empty, do
+    # not create empty history entry
+    if (not fdiff.diff and not comment
+        and old_fobj is not None
+        and entry_type != HistoryType.delete):
+
+        return None
+
+    if len(comment) > 0:
+        is_hidden = False
+    else:
+        is_hidden = is_hidden_snapshot(fdiff)
+
+    kwargs = {
+        "user": {"pk": user_id, "name": user_name},
+        "key": key,
+        "type": entry_type,
+        "snapshot": fdiff.snapshot if need_real_snapshot else None,
+        "diff": fdiff.diff,
+        "comment": comment,
+        "comment_html": mdrender(obj.project, comment),
+        "is_hidden": is_hidden,
+        "is_snapshot": need_real_snapshot,
+    }
+
+    return kwargs, old_fobj, fdiff
+
+
+def _create_history_entry(kwargs:dict, old_fobj:FrozenObj, fdiff:FrozenDiff):
+    entry_model = apps.get_model("history", "HistoryEntry")
+    entry = entry_model.objects.create(**kwargs)
+
+    # Keep the materialized snapshot up to date under the key lock
+    _update_current_snapshot(kwargs["key"], old_fobj, fdiff, kwargs["is_snapshot"])
+    return entry
+
+
+def _take_snapshot(obj:object, *, comment:str="", user=None, delete:bool=False):
+    key = make_key_from_model_object(obj)
+    with advisory_lock(key) as acquired_key_lock:
+        typename = get_typename_for_model_class(obj.__class__)
+
+        new_fobj = freeze_model_instance(obj)
+        entry_data = _make_history_entry_data(obj, new_fobj, comment=comment, user=user, delete=delete)
+        if entry_data is None:
+            return None
+
+        kwargs, old_fobj, fdiff = entry_data
+        kwargs["values"] = make_diff_values(typename, fdiff)
+        return _create_history_entry(kwargs, old_fobj, fdiff)
+
+
 @tx.atomic
 def take_snapshot(obj:object, *, comment:str="", user=None, delete:bool=False):
     """
@@ -280,59 +495,51 @@ def take_snapshot(obj:object, *, comment:str="", user=None, delete:bool=False):
     This raises exception in case of object wasn't
     previously freezed.
     """
+    return _take_snapshot(obj, comment=comment, user=user, delete=delete)
 
-    key = make_key_from_model_object(obj)
-    with advisory_lock(key) as acquired_key_lock:
-        typename = get_typename_for_model_class(obj.__class__)
 
-        new_fobj = freeze_model_instance(obj)
-        old_fobj, need_real_snapshot = get_last_snapshot_for_key(key)
-
-        entry_model = apps.get_model("history", "HistoryEntry")
-        user_id = None if user is None else user.id
-        user_name = "" if user is None else user.get_full_name()
-
-        # Determine history type
-        if delete:
-            entry_type = HistoryType.delete
-        elif new_fobj and not old_fobj:
-            entry_type = HistoryType.create
-        elif new_fobj and old_fobj:
-            entry_type = HistoryType.change
-        else:
-            raise RuntimeError("Unexpected condition")
-
-        fdiff = make_diff(old_fobj, new_fobj)
-
-        # If diff and comment are empty, do
-        # not create empty history entry
-        if (not fdiff.diff and not comment
-            and old_fobj is not None
-            and entry_type != HistoryType.delete):
+@tx.atomic
+def take_snapshots_in_bulk(objs:list, *, user=None) -> list:
+    """
+    Same as `take_snapshot` for a list of model instances
+    of the same type, freezing all of them at once and
+    resolving the values of all the diffs together.
+    """
+    created_entries = []
+    for chunk in split_by_n(list(objs), SNAPSHOTS_IN_BULK_CHUNK_SIZE):
+        created_entries += _take_snapshots_in_bulk(chunk, user=user)
+    return created_entries
 
-            return None
 
-        fvals = make_diff_values(typename, fdiff)
+def _take_snapshots_in_bulk(objs:list, *, user=None) -> list:
+    fobjs = OrderedDict()
+    for obj, fobj in zip(objs, freeze_model_instances(objs)):
+        if fobj is not None:
+            fobjs.setdefault(fobj.key, (obj, fobj))
+
+    if not fobjs:
+        return []
+
+    with ExitStack() as stack:
+        # Sorted to avoid deadlocks with other bulk snapshots
+        for key in sorted(fobjs.keys()):
+            stack.enter_context(advisory_lock(key))
+
+        entries_data = []
+        for obj, fobj in fobjs.values():
+            entry_data = _make_history_entry_data(obj, fobj, user=user)
+            if entry_data is not None:
+                entries_data.append(entry_data)
 
-        if len(comment) > 0:
-            is_hidden = False
-        else:
-            is_hidden = is_hidden_snapshot(fdiff)
+        typename = get_typename_for_model_class(objs[0].__class__)
+        values = make_diff_values_in_bulk(typename, [fdiff for _, _, fdiff in entries_data])
 
-        kwargs = {
-            "user": {"pk": user_id, "name": user_name},
-            "key": key,
-            "type": entry_type,
-            "snapshot": fdiff.snapshot if need_real_snapshot else None,
-            "diff": fdiff.diff,
-            "values": fvals,
-            "comment": comment,
-            "comment_html": mdrender(obj.project, comment),
-            "is_hidden": is_hidden,
-            "is_snapshot": need_real_snapshot,
-        }
+        created_entries = []
+        for (kwargs, old_fobj, fdiff), fvals in zip(entries_data, values):
+            kwargs["values"] = fvals
+            created_entries.append(_create_history_entry(kwargs, old_fobj, fdiff))
 
-        return entry_model.objects.create(**kwargs)
+        return created_entries
 
 
 # High level query api
@@ -362,10 +569,26 @@ from .freeze_impl import wikipage_freezer
 
 register_freeze_implementation("projects.project", project_freezer)
 register_freeze_implementation("milestones.milestone", milestone_freezer,)
-register_freeze_implementation("userstories.userstory", userstory_freezer)
-register_freeze_implementation("issues.issue", issue_freezer)
-register_freeze_implementation("tasks.task", task_freezer)
-register_freeze_implementation("wiki.wikipage", wikipage_freezer)
+register_freeze_implementation("userstories.userstory", userstory_freezer,
+                               prefetch_related=("project__userstorycustomattributes",
+                                                 "custom_attributes_values",
+                                                 "role_points",
+                                                 "watchers",
+                                                 "attachments"))
+register_freeze_implementation("issues.issue", issue_freezer,
+                               prefetch_related=("project__issuecustomattributes",
+                                                 "custom_attributes_values",
+                                                 "watchers",
+                                                 "attachments"))
+register_freeze_implementation("tasks.task", task_freezer,
+                               prefetch_related=("project__taskcustomattributes",
+                                                 "custom_attributes_values",
+                                                 "watchers",
+                                                 "attachments"))
+register_freeze_implementation("wiki.wikipage", wikipage_freezer,
+                               prefetch_related=("project",
+                                                 "watchers",
+                                                 "attachments"))
 
 from .freeze_impl import project_values
 from .freeze_impl import milestone_values
@@ -36,6 +36,8 @@ class IssuesAppConfig(AppConfig):
         # Tags
         signals.pre_save.connect(generic_handlers.tags_normalization,
                                  sender=apps.get_model("issues", "Issue"))
+        signals.pre_save.connect(generic_handlers.cached_prev_tags,
+                                 sender=apps.get_model("issues", "Issue"))
         signals.post_save.connect(generic_handlers.update_project_tags_when_create_or_edit_taggable_item,
                                   sender=apps.get_model("issues", "Issue"))
         signals.post_delete.connect(generic_handlers.update_project_tags_when_delete_taggable_item,
@@ -54,13 +54,16 @@ def update_issues_order_in_bulk(bulk_data):
     `bulk_data` should be a list of tuples with the following format:
 
     [(<issue id>, <new issue order value>), ...]
+
+    Return the ids of the issues whose order has changed.
     """
     issue_ids = []
     new_order_values = []
     for issue_id, new_order_value in bulk_data:
         issue_ids.append(issue_id)
         new_order_values.append({"order": new_order_value})
-    db.update_in_bulk_with_ids(issue_ids, new_order_values, model=models.Issue)
+    return db.update_in_bulk_with_ids(issue_ids, new_order_values, model=models.Issue,
+                                      only_changed=True)
 
 
 def issues_to_csv(project, queryset):
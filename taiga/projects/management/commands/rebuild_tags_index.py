@@ -0,0 +1,43 @@
+# Copyright (C) 2014 Andrey Antukh <niwi@niwi.be>
+# Copyright (C) 2014 Jesús Espino <jespinog@gmail.com>
+# Copyright (C) 2014 David Barragán <bameda@dbarragan.com>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from taiga.projects.models import Project
+from taiga.projects.services import tags_index
+
+
+class Command(BaseCommand):
+    args = '<project_slug project_slug ...>'
+    help = 'Rebuild the tags index of the user stories, tasks and issues of the projects (all by default)'
+
+    def handle(self, *args, **options):
+        if not args:
+            with transaction.atomic():
+                count = tags_index.rebuild_tags_index()
+            self.stdout.write("{} tags indexed".format(count))
+            return
+
+        for slug in args:
+            try:
+                project = Project.objects.get(slug=slug)
+            except Project.DoesNotExist:
+                raise CommandError('Project "{}" does not exist'.format(slug))
+
+            with transaction.atomic():
+                count = tags_index.rebuild_tags_index(project)
+            self.stdout.write("{}: {} tags indexed".format(slug, count))
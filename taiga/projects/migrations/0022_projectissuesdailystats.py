@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+import django_pgjson.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0021_auto_20150504_1524'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectIssuesDailyStats',
+            fields=[
+                ('id', models.AutoField(serialize=False, primary_key=True, verbose_name='ID', auto_created=True)),
+                ('last_day', models.DateField(verbose_name='last day')),
+                ('buckets', django_pgjson.fields.JsonField(null=True, blank=True, verbose_name='buckets')),
+                ('project', models.OneToOneField(related_name='issues_daily_stats', verbose_name='project', to='projects.Project')),
+            ],
+            options={
+                'verbose_name': 'project issues daily stats',
+                'verbose_name_plural': 'projects issues daily stats',
+            },
+            bases=(models.Model,),
+        ),
+    ]
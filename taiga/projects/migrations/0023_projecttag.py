@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+INDEX_TAGS_SQL = """
+INSERT INTO projects_projecttag (project_id, tag, content_type, count)
+     SELECT project_id, tag, '{content_type}', COUNT(DISTINCT id)
+       FROM {table}, unnest(tags) AS tag
+      WHERE project_id IS NOT NULL
+   GROUP BY project_id, tag;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0022_projectissuesdailystats'),
+        ('userstories', '0009_remove_userstory_is_archived'),
+        ('tasks', '0005_auto_20150114_0954'),
+        ('issues', '0004_auto_20150114_0954'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectTag',
+            fields=[
+                ('id', models.AutoField(serialize=False, primary_key=True, verbose_name='ID', auto_created=True)),
+                ('tag', models.TextField(verbose_name='tag')),
+                ('content_type', models.CharField(max_length=255, verbose_name='content type')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='count')),
+                ('project', models.ForeignKey(related_name='tags_index', verbose_name='project', to='projects.Project')),
+            ],
+            options={
+                'verbose_name': 'project tag',
+                'verbose_name_plural': 'project tags',
+            },
+            bases=(models.Model,),
+        ),
+        migrations.AlterUniqueTogether(
+            name='projecttag',
+            unique_together=set([('project', 'tag', 'content_type')]),
+        ),
+        migrations.RunSQL(
+            INDEX_TAGS_SQL.format(content_type="userstories.userstory", table="userstories_userstory") +
+            INDEX_TAGS_SQL.format(content_type="tasks.task", table="tasks_task") +
+            INDEX_TAGS_SQL.format(content_type="issues.issue", table="issues_issue"),
+            reverse_sql="DELETE FROM projects_projecttag;"
+        ),
+    ]
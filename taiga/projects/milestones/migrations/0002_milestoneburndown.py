@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+import django_pgjson.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('milestones', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MilestoneBurndown',
+            fields=[
+                ('id', models.AutoField(serialize=False, primary_key=True, verbose_name='ID', auto_created=True)),
+                ('total_points', models.FloatField(default=0, verbose_name='total points')),
+                ('closed_points', django_pgjson.fields.JsonField(null=True, blank=True, verbose_name='closed points per day')),
+                ('frozen', models.BooleanField(default=False, verbose_name='is frozen')),
+                ('milestone', models.OneToOneField(related_name='burndown', verbose_name='milestone', to='milestones.Milestone')),
+            ],
+            options={
+                'verbose_name': 'milestone burndown',
+                'verbose_name_plural': 'milestones burndowns',
+            },
+            bases=(models.Model,),
+        ),
+    ]
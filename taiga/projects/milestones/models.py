@@ -20,6 +20,8 @@ from django.utils.translation import ugettext_lazy as _
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 
+from django_pgjson.fields import JsonField
+
 from taiga.base.utils.slug import slugify_uniquely
 from taiga.base.utils.dicts import dict_sum
 from taiga.projects.notifications.mixins import WatchedModelMixin
@@ -154,3 +156,35 @@ class Milestone(WatchedModelMixin, models.Model):
                 finish_date__lt=date + datetime.timedelta(days=1)
             ).prefetch_related('role_points', 'role_points__points') if us.is_closed
         ])
+
+
+class MilestoneBurndown(models.Model):
+    """
+    Precomputed burndown of a milestone: the total points of its user
+    stories and the points closed every day. It is immutable (`frozen`)
+    once the milestone is closed.
+    """
+    milestone = models.OneToOneField("Milestone", null=False, blank=False,
+                                     related_name="burndown",
+                                     verbose_name=_("milestone"))
+    total_points = models.FloatField(default=0, null=False, blank=False,
+                                     verbose_name=_("total points"))
+    closed_points = JsonField(null=True, blank=True, verbose_name=_("closed points per day"))
+    frozen = models.BooleanField(default=False, null=False, blank=True,
+                                 verbose_name=_("is frozen"))
+
+    class Meta:
+        verbose_name = "milestone burndown"
+        verbose_name_plural = "milestones burndowns"
+
+    def __str__(self):
+        return "Burndown of {}".format(self.milestone_id)
+
+    def get_closed_points(self) -> dict:
+        return {datetime.datetime.strptime(day, "%Y-%m-%d").date(): points
+                for day, points in (self.closed_points or {}).items()}
+
+    def add_closed_points(self, day:datetime.date, points:float):
+        closed_points = self.closed_points or {}
+        closed_points[day.isoformat()] = closed_points.get(day.isoformat(), 0) + points
+        self.closed_points = closed_points
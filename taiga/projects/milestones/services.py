@@ -15,9 +15,15 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from django.utils import timezone
+from django.apps import apps
+from django.db import connection
+from django.db import transaction
+from django.db.models import Sum
+from contextlib import closing
 
 from . import models
 
+import datetime
 
 
 def calculate_milestone_is_closed(milestone):
@@ -36,3 +42,117 @@ def open_milestone(milestone):
     if milestone.closed:
         milestone.closed = False
         milestone.save(update_fields=["closed",])
+
+
+####################################
+# Burndown
+####################################
+
+_BURNDOWN_SQL = """
+    SELECT CASE WHEN us.is_closed THEN (us.finish_date AT TIME ZONE 'UTC')::date END,
+           SUM(COALESCE(p.value, 0))
+      FROM {user_story_table} us
+INNER JOIN {role_points_table} rp ON rp.user_story_id = us.id
+INNER JOIN {points_table} p ON p.id = rp.points_id
+     WHERE us.milestone_id = %s
+  GROUP BY 1
+"""
+
+
+def calculate_milestone_burndown(milestone) -> tuple:
+    """
+    Calculate with one aggregate query the total points of the user
+    stories of a milestone and the points closed every day:
+
+        (<total points>, {<day>: <closed points>, ...})
+    """
+    sql = _BURNDOWN_SQL.format(
+        user_story_table=apps.get_model("userstories", "UserStory")._meta.db_table,
+        role_points_table=apps.get_model("userstories", "RolePoints")._meta.db_table,
+        points_table=apps.get_model("projects", "Points")._meta.db_table)
+
+    total_points = 0
+    closed_points = {}
+    with closing(connection.cursor()) as cursor:
+        cursor.execute(sql, [milestone.id])
+        for day, points in cursor.fetchall():
+            total_points += points
+            if day is not None:
+                closed_points[day] = points
+
+    return total_points, closed_points
+
+
+def get_milestone_burndown(milestone) -> models.MilestoneBurndown:
+    """
+    Get the precomputed burndown of a milestone, calculating it if it
+    doesn't exist or if the milestone was closed after it was stored.
+    """
+    try:
+        burndown = milestone.burndown
+    except models.MilestoneBurndown.DoesNotExist:
+        burndown = models.MilestoneBurndown(milestone=milestone)
+    else:
+        if burndown.frozen or not milestone.closed:
+            return burndown
+
+    total_points, closed_points = calculate_milestone_burndown(milestone)
+    burndown.total_points = total_points
+    burndown.closed_points = {day.isoformat(): points for day, points in closed_points.items()}
+    burndown.frozen = milestone.closed
+    burndown.save()
+    return burndown
+
+
+def get_milestone_burndown_days(milestone) -> list:
+    """
+    Get the open and the optimal points of every day of a milestone.
+    """
+    burndown = get_milestone_burndown(milestone)
+    closed_points = sorted(burndown.get_closed_points().items())
+
+    total_points = burndown.total_points
+    optimal_points = total_points
+    milestone_days = (milestone.estimated_finish - milestone.estimated_start).days
+    optimal_points_per_day = total_points / milestone_days if milestone_days else 0
+
+    days = []
+    accumulated_closed_points = 0
+    current_date = milestone.estimated_start
+    while current_date <= milestone.estimated_finish:
+        while closed_points and closed_points[0][0] <= current_date:
+            accumulated_closed_points += closed_points.pop(0)[1]
+
+        days.append({
+            'day': current_date,
+            'name': current_date.day,
+            'open_points': total_points - accumulated_closed_points,
+            'optimal_points': optimal_points,
+        })
+        current_date = current_date + datetime.timedelta(days=1)
+        optimal_points -= optimal_points_per_day
+
+    return days
+
+
+def update_milestone_burndown_closed_points(user_story, day:datetime.date, closed:bool=True):
+    """
+    Add (or subtract when it is reopened) the points of a closed user
+    story to the stored burndown of its milestone, if it is not frozen.
+    """
+    if user_story.milestone_id is None or day is None:
+        return
+
+    with transaction.atomic():
+        burndowns = models.MilestoneBurndown.objects.select_for_update()
+        burndown = burndowns.filter(milestone_id=user_story.milestone_id, frozen=False).first()
+        if burndown is None:
+            return
+
+        points = user_story.role_points.aggregate(points=Sum("points__value"))["points"] or 0
+        burndown.add_closed_points(day, points if closed else -points)
+        burndown.save(update_fields=["closed_points"])
+
+
+def invalidate_milestone_burndown(milestone_id:int):
+    models.MilestoneBurndown.objects.filter(milestone_id=milestone_id, frozen=False).delete()
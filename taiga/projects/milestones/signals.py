@@ -0,0 +1,62 @@
+# Copyright (C) 2014 Andrey Antukh <niwi@niwi.be>
+# Copyright (C) 2014 Jesús Espino <jespinog@gmail.com>
+# Copyright (C) 2014 David Barragán <bameda@dbarragan.com>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from django.apps import apps
+
+from . import services
+
+
+####################################
+# Signals for the burndown
+####################################
+
+def reset_burndown_when_reopen_milestone(sender, instance, **kwargs):
+    # The burndown of a closed milestone is frozen until it is reopened
+    if not instance.closed:
+        MilestoneBurndown = apps.get_model("milestones", "MilestoneBurndown")
+        MilestoneBurndown.objects.filter(milestone_id=instance.id, frozen=True).delete()
+
+
+def invalidate_burndown_when_create_or_edit_us(sender, instance, created, **kwargs):
+    prev = getattr(instance, "prev", None)
+    prev_milestone_id = prev.milestone_id if prev else None
+
+    if prev_milestone_id == instance.milestone_id:
+        return
+
+    for milestone_id in (prev_milestone_id, instance.milestone_id):
+        if milestone_id:
+            services.invalidate_milestone_burndown(milestone_id)
+
+
+def invalidate_burndown_when_delete_us(sender, instance, **kwargs):
+    if instance.milestone_id:
+        services.invalidate_milestone_burndown(instance.milestone_id)
+
+
+def invalidate_burndown_when_change_role_points(sender, instance, **kwargs):
+    UserStory = apps.get_model("userstories", "UserStory")
+    # The user story could be deleted yet (in cascade)
+    milestone_ids = UserStory.objects.filter(id=instance.user_story_id).values_list("milestone_id", flat=True)
+    for milestone_id in milestone_ids:
+        if milestone_id:
+            services.invalidate_milestone_burndown(milestone_id)
+
+
+def invalidate_burndowns_when_edit_points(sender, instance, **kwargs):
+    MilestoneBurndown = apps.get_model("milestones", "MilestoneBurndown")
+    MilestoneBurndown.objects.filter(milestone__project_id=instance.project_id, frozen=False).delete()
@@ -14,7 +14,7 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-import itertools
+import datetime
 import uuid
 
 
@@ -34,7 +34,6 @@ from taiga.permissions.permissions import ANON_PERMISSIONS, MEMBERS_PERMISSIONS
 
 from taiga.base.tags import TaggedMixin
 from taiga.base.utils.slug import slugify_uniquely
-from taiga.base.utils.dicts import dict_sum
 from taiga.base.utils.sequence import arithmetic_progression
 from taiga.base.utils.slug import slugify_uniquely_for_queryset
 
@@ -260,34 +259,9 @@ class Project(ProjectDefaults, TaggedMixin, models.Model):
         rp_query = rp_query.exclude(role__id__in=roles.values_list("id", flat=True))
         rp_query.delete()
 
-    def _get_user_stories_points(self, user_stories):
-        role_points = [us.role_points.all() for us in user_stories]
-        flat_role_points = itertools.chain(*role_points)
-        flat_role_dicts = map(lambda x: {x.role_id: x.points.value if x.points.value else 0},
-                              flat_role_points)
-        return dict_sum(*flat_role_dicts)
-
-    def _get_points_increment(self, client_requirement, team_requirement):
-        last_milestones = self.milestones.order_by('-estimated_finish')
-        last_milestone = last_milestones[0] if last_milestones else None
-        if last_milestone:
-            user_stories = self.user_stories.filter(
-                created_date__gte=last_milestone.estimated_finish,
-                client_requirement=client_requirement,
-                team_requirement=team_requirement
-            )
-        else:
-            user_stories = self.user_stories.filter(
-                client_requirement=client_requirement,
-                team_requirement=team_requirement
-            )
-        user_stories = user_stories.prefetch_related('role_points', 'role_points__points')
-        return self._get_user_stories_points(user_stories)
-
-
-    @property
-    def project(self):
-        return self
+    def _get_points_rollup(self):
+        from taiga.projects.services.points import calculate_project_points_rollup
+        return calculate_project_points_rollup(self.id)
 
     @property
     def project(self):
@@ -295,19 +269,15 @@ class Project(ProjectDefaults, TaggedMixin, models.Model):
 
     @property
     def future_team_increment(self):
-        team_increment = self._get_points_increment(False, True)
-        shared_increment = {key: value / 2 for key, value in self.future_shared_increment.items()}
-        return dict_sum(team_increment, shared_increment)
+        return self._get_points_rollup()["future_increments"]["team"]
 
     @property
     def future_client_increment(self):
-        client_increment = self._get_points_increment(True, False)
-        shared_increment = {key: value / 2 for key, value in self.future_shared_increment.items()}
-        return dict_sum(client_increment, shared_increment)
+        return self._get_points_rollup()["future_increments"]["client"]
 
     @property
     def future_shared_increment(self):
-        return self._get_points_increment(True, True)
+        return self._get_points_rollup()["future_increments"]["shared"]
 
     @property
     def closed_points(self):
@@ -323,13 +293,11 @@ class Project(ProjectDefaults, TaggedMixin, models.Model):
 
     @property
     def calculated_points(self):
-        user_stories = self.user_stories.all().prefetch_related('role_points', 'role_points__points')
-        closed_user_stories = user_stories.filter(is_closed=True)
-        assigned_user_stories = user_stories.filter(milestone__isnull=False)
+        rollup = self._get_points_rollup()
         return {
-            "defined": self._get_user_stories_points(user_stories),
-            "closed": self._get_user_stories_points(closed_user_stories),
-            "assigned": self._get_user_stories_points(assigned_user_stories),
+            "defined": rollup["defined"],
+            "closed": rollup["closed"],
+            "assigned": rollup["assigned"],
         }
 
 
@@ -550,6 +518,61 @@ class IssueType(models.Model):
         return self.name
 
 
+class ProjectTag(models.Model):
+    """
+    Index of the tags used by the user stories, tasks and
+    issues of a project, with the number of objects of each
+    type (`content_type` as "<app label>.<model name>") that
+    use them.
+    """
+    project = models.ForeignKey("Project", null=False, blank=False,
+                                related_name="tags_index", verbose_name=_("project"))
+    tag = models.TextField(null=False, blank=False, verbose_name=_("tag"))
+    content_type = models.CharField(max_length=255, null=False, blank=False,
+                                    verbose_name=_("content type"))
+    count = models.PositiveIntegerField(null=False, blank=False, default=0,
+                                        verbose_name=_("count"))
+
+    class Meta:
+        verbose_name = "project tag"
+        verbose_name_plural = "project tags"
+        unique_together = ("project", "tag", "content_type")
+
+    def __str__(self):
+        return "{} ({})".format(self.tag, self.content_type)
+
+
+class ProjectIssuesDailyStats(models.Model):
+    """
+    Precomputed daily buckets of the issues stats of a
+    project for the four weeks until `last_day`.
+    """
+    project = models.OneToOneField("Project", null=False, blank=False,
+                                   related_name="issues_daily_stats",
+                                   verbose_name=_("project"))
+    last_day = models.DateField(null=False, blank=False, verbose_name=_("last day"))
+    buckets = JsonField(null=True, blank=True, verbose_name=_("buckets"))
+
+    class Meta:
+        verbose_name = "project issues daily stats"
+        verbose_name_plural = "projects issues daily stats"
+
+    def __str__(self):
+        return "Issues daily stats of {}".format(self.project_id)
+
+    @staticmethod
+    def dump_counts(counts:list) -> list:
+        return [[day.isoformat()] + list(values) for day, *values in counts]
+
+    def get_counts(self) -> list:
+        return [tuple([datetime.datetime.strptime(day, "%Y-%m-%dT%H:%M:%S")] + values)
+                for day, *values in self.buckets or []]
+
+    def set_counts(self, last_day, counts:list):
+        self.last_day = last_day
+        self.buckets = self.dump_counts(counts)
+
+
 class ProjectTemplate(models.Model):
     name = models.CharField(max_length=250, null=False, blank=False,
                             verbose_name=_("name"))
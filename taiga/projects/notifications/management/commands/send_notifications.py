@@ -14,16 +14,46 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from multiprocessing import Process
+from optparse import make_option
 
 from django.core.management.base import BaseCommand
+from django.db import connection
+
+from taiga.projects.notifications.services import process_sync_notifications
 
-from taiga.base.utils.iterators import iter_queryset
-from taiga.projects.notifications.models import HistoryChangeNotification
-from taiga.projects.notifications.services import send_sync_notifications
 
 class Command(BaseCommand):
+    help = 'Send the pending change notifications'
+    option_list = BaseCommand.option_list + (
+        make_option('--workers',
+                    action='store',
+                    type='int',
+                    dest='workers',
+                    default=1,
+                    help='Number of parallel processes sending notifications'),
+        make_option('--chunk-size',
+                    action='store',
+                    type='int',
+                    dest='chunk_size',
+                    default=None,
+                    help='Number of notifications locked and sent per transaction'),
+        )
 
     def handle(self, *args, **options):
-        qs = HistoryChangeNotification.objects.all()
-        for change_notification in iter_queryset(qs, itersize=100):
-            send_sync_notifications(change_notification.pk)
+        workers = max(options["workers"], 1)
+        chunk_size = options["chunk_size"]
+
+        if workers == 1:
+            process_sync_notifications(chunk_size=chunk_size)
+            return
+
+        # The database connection can't be shared with the forked workers
+        connection.close()
+
+        processes = [Process(target=process_sync_notifications, kwargs={"chunk_size": chunk_size})
+                     for _ in range(workers)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
@@ -14,9 +14,14 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-from functools import partial
+import logging
+
+from contextlib import closing
+from datetime import timedelta
 
 from django.apps import apps
+from django.core import mail
+from django.db import connection
 from django.db import IntegrityError
 from django.contrib.contenttypes.models import ContentType
 from django.utils import timezone
@@ -33,12 +38,15 @@ from taiga.projects.history.choices import HistoryType
 from taiga.projects.history.services import (make_key_from_model_object,
                                              get_last_snapshot_for_key,
                                              get_model_from_key)
-from taiga.permissions.service import user_has_perm
+from taiga.permissions.service import get_users_project_permissions
 from taiga.users.models import User
 
 from .models import HistoryChangeNotification
 
 
+log = logging.getLogger("taiga.notifications")
+
+
 def notify_policy_exists(project, user) -> bool:
     """
     Check if policy exists for specified project
@@ -87,6 +95,40 @@ def get_notify_policy(project, user):
     return instance
 
 
+def get_notify_levels(project, users) -> dict:
+    """
+    Get the notification levels of several users for a project by
+    user id, creating in bulk the default policies of the users
+    without one.
+    """
+    model_cls = apps.get_model("notifications", "NotifyPolicy")
+    user_ids = set(user.id for user in users)
+
+    policies = model_cls.objects.filter(project=project, user_id__in=user_ids)
+    levels = dict(policies.values_list("user_id", "notify_level"))
+
+    missing_user_ids = user_ids - set(levels)
+    if missing_user_ids:
+        now = timezone.now()
+        try:
+            with transaction.atomic():
+                model_cls.objects.bulk_create([
+                    model_cls(project=project, user_id=user_id, notify_level=NotifyLevel.notwatch,
+                              created_at=now, modified_at=now)
+                    for user_id in missing_user_ids
+                ])
+        except IntegrityError:
+            # Some of them were created at the same time
+            for user_id in missing_user_ids:
+                model_cls.objects.get_or_create(project=project, user_id=user_id,
+                                                defaults={"notify_level": NotifyLevel.notwatch})
+            levels = dict(policies.values_list("user_id", "notify_level"))
+        else:
+            levels.update({user_id: NotifyLevel.notwatch for user_id in missing_user_ids})
+
+    return levels
+
+
 def attach_notify_policy_to_project_queryset(current_user, queryset):
     """
     Function that attach "notify_level" attribute on each queryset
@@ -124,21 +166,21 @@ def analize_object_for_watchers(obj:object, history:object):
             obj.watchers.add(user)
 
 
-def _filter_by_permissions(obj, user):
+def _get_view_permission(obj):
     UserStory = apps.get_model("userstories", "UserStory")
     Issue = apps.get_model("issues", "Issue")
     Task = apps.get_model("tasks", "Task")
     WikiPage = apps.get_model("wiki", "WikiPage")
 
     if isinstance(obj, UserStory):
-        return user_has_perm(user, "view_us", obj)
+        return "view_us"
     elif isinstance(obj, Issue):
-        return user_has_perm(user, "view_issues", obj)
+        return "view_issues"
     elif isinstance(obj, Task):
-        return user_has_perm(user, "view_tasks", obj)
+        return "view_tasks"
     elif isinstance(obj, WikiPage):
-        return user_has_perm(user, "view_wiki_pages", obj)
-    return False
+        return "view_wiki_pages"
+    return None
 
 
 def _filter_notificable(user):
@@ -150,32 +192,35 @@ def get_users_to_notify(obj, *, discard_users=None) -> list:
     Get filtered set of users to notify for specified
     model instance and changer.
 
+    The notification policies and the permissions of all
+    the candidates are resolved with a few queries.
+
     NOTE: changer at this momment is not used.
     NOTE: analogouts to obj.get_watchers_to_notify(changer)
     """
     project = obj.get_project()
 
-    def _check_level(project:object, user:object, levels:tuple) -> bool:
-        policy = get_notify_policy(project, user)
-        return policy.notify_level in [int(x) for x in levels]
+    members = set(project.members.all())
+    watchers = set(obj.get_watchers()) | set(obj.get_participants())
+    levels = get_notify_levels(project, members | watchers)
 
-    _can_notify_hard = partial(_check_level, project,
-                               levels=[NotifyLevel.watch])
-    _can_notify_light = partial(_check_level, project,
-                                levels=[NotifyLevel.watch, NotifyLevel.notwatch])
+    hard_levels = [int(NotifyLevel.watch)]
+    light_levels = [int(NotifyLevel.watch), int(NotifyLevel.notwatch)]
 
     candidates = set()
-    candidates.update(filter(_can_notify_hard, project.members.all()))
-    candidates.update(filter(_can_notify_light, obj.get_watchers()))
-    candidates.update(filter(_can_notify_light, obj.get_participants()))
+    candidates.update(user for user in members if levels[user.id] in hard_levels)
+    candidates.update(user for user in watchers if levels[user.id] in light_levels)
 
     # Remove the changer from candidates
     if discard_users:
         candidates = candidates - set(discard_users)
 
-    candidates = filter(partial(_filter_by_permissions, obj), candidates)
     # Filter disabled and system users
-    candidates = filter(partial(_filter_notificable), candidates)
+    candidates = set(filter(_filter_notificable, candidates))
+
+    permission = _get_view_permission(obj)
+    permissions = get_users_project_permissions(candidates, project)
+    candidates = filter(lambda user: permission in permissions[user.id], candidates)
     return frozenset(candidates)
 
 
@@ -199,17 +244,27 @@ def _resolve_template_name(model:object, *, change_type:int) -> str:
                        change=change_type)
 
 
+_template_mails = {}
+
+
 def _make_template_mail(name:str):
     """
     Helper that creates a adhoc djmail template email
     instance for specified name, and return an instance
     of it.
+
+    Instances are cached by name: the language is resolved
+    per message from the context and the compiled templates
+    are cached by the template loader, so there is no need
+    to build a new class for every notification.
     """
-    cls = type("InlineCSSTemplateMail",
-               (template_mail.InlineCSSTemplateMail,),
-               {"name": name})
+    if name not in _template_mails:
+        cls = type("InlineCSSTemplateMail",
+                   (template_mail.InlineCSSTemplateMail,),
+                   {"name": name})
+        _template_mails[name] = cls()
 
-    return cls()
+    return _template_mails[name]
 
 
 @transaction.atomic
@@ -232,29 +287,19 @@ def send_notifications(obj, *, history):
     # Get a complete list of notifiable users for current
     # object and send the change notification to them.
     notify_users = get_users_to_notify(obj, discard_users=[notification.owner])
-    for notify_user in notify_users:
-        notification.notify_users.add(notify_user)
+    notification.notify_users.add(*notify_users)
 
     # If we are the min interval is 0 it just work in a synchronous and spamming way
     if settings.CHANGE_NOTIFICATIONS_MIN_INTERVAL == 0:
         send_sync_notifications(notification.id)
 
-@transaction.atomic
-def send_sync_notifications(notification_id):
+def _send_notification(notification, mail_connection=None):
     """
-    Given changed instance, calculate the history entry and
-    a complete list for users to notify, send
-    email to all users.
+    Render and send the digest of a locked change notification
+    to all its users, reusing the given mail connection, and
+    delete it.
     """
-
-    notification = HistoryChangeNotification.objects.select_for_update().get(pk=notification_id)
-    # If the las modification is too recent we ignore it
-    now = timezone.now()
-    time_diff = now - notification.updated_datetime
-    if time_diff.seconds < settings.CHANGE_NOTIFICATIONS_MIN_INTERVAL:
-        return
-
-    history_entries = tuple(notification.history_entries.all().order_by("created_at"))
+    history_entries = sorted(notification.history_entries.all(), key=lambda x: x.created_at)
     obj, _ = get_last_snapshot_for_key(notification.key)
     obj_class = get_model_from_key(obj.key)
 
@@ -262,20 +307,125 @@ def send_sync_notifications(notification_id):
                "snapshot": obj.snapshot,
                "project": notification.project,
                "changer": notification.owner,
-               "history_entries": history_entries}
+               "history_entries": tuple(history_entries)}
 
     model = get_model_from_key(notification.key)
     template_name = _resolve_template_name(model, change_type=notification.history_type)
     email = _make_template_mail(template_name)
 
-    for user in notification.notify_users.distinct():
+    for user in set(notification.notify_users.all()):
         context["user"] = user
         context["lang"] = user.lang or settings.LANGUAGE_CODE
-        email.send(user.email, context)
+        message = email.make_email_object(user.email, context)
+        if mail_connection is not None:
+            message.connection = mail_connection
+        message.send()
 
     notification.delete()
 
 
-def process_sync_notifications():
-    for notification in HistoryChangeNotification.objects.all():
-        send_sync_notifications(notification.pk)
+@transaction.atomic
+def send_sync_notifications(notification_id, mail_connection=None):
+    """
+    Given changed instance, calculate the history entry and
+    a complete list for users to notify, send
+    email to all users.
+    """
+
+    notification = HistoryChangeNotification.objects.select_for_update().get(pk=notification_id)
+    # If the las modification is too recent we ignore it
+    now = timezone.now()
+    time_diff = now - notification.updated_datetime
+    if time_diff.seconds < settings.CHANGE_NOTIFICATIONS_MIN_INTERVAL:
+        return
+
+    _send_notification(notification, mail_connection=mail_connection)
+
+
+_PENDING_NOTIFICATIONS_SQL = """
+    SELECT id
+      FROM {table}
+     WHERE updated_datetime <= %s
+       AND NOT (id = ANY(%s))
+  ORDER BY id
+     LIMIT %s
+       FOR UPDATE SKIP LOCKED
+"""
+
+_LOCK_NOTIFICATION_SQL = """
+    SELECT id
+      FROM {table}
+     WHERE id = %s
+       FOR UPDATE SKIP LOCKED
+"""
+
+
+@transaction.atomic
+def _get_pending_notifications(chunk_size:int, exclude_ids:list) -> list:
+    """
+    Get a chunk of the ids of the change notifications old enough
+    to be sent (the rows locked by another runner are skipped).
+    """
+    limit = timezone.now() - timedelta(seconds=settings.CHANGE_NOTIFICATIONS_MIN_INTERVAL)
+    sql = _PENDING_NOTIFICATIONS_SQL.format(table=HistoryChangeNotification._meta.db_table)
+
+    with closing(connection.cursor()) as cursor:
+        cursor.execute(sql, [limit, list(exclude_ids), chunk_size])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _lock_notification(notification_id:int) -> bool:
+    """
+    Lock (inside the current transaction) a change notification.
+    Return False if it has been sent yet or another runner is
+    sending it.
+    """
+    sql = _LOCK_NOTIFICATION_SQL.format(table=HistoryChangeNotification._meta.db_table)
+
+    with closing(connection.cursor()) as cursor:
+        cursor.execute(sql, [notification_id])
+        return cursor.fetchone() is not None
+
+
+def _process_notification(notification_id:int, mail_connection=None):
+    with transaction.atomic():
+        if not _lock_notification(notification_id):
+            return
+
+        notification = (HistoryChangeNotification.objects
+                        .select_related("owner", "project")
+                        .prefetch_related("history_entries", "notify_users")
+                        .get(id=notification_id))
+        _send_notification(notification, mail_connection=mail_connection)
+
+
+def process_sync_notifications(chunk_size:int=None):
+    """
+    Send all the pending change notifications.
+
+    Notifications are fetched in chunks, and each one is sent
+    and deleted in its own transaction (locking only its row),
+    so several runners can work in parallel. A notification that
+    can't be sent is logged and skipped until the next run.
+    All the emails are sent through one mail connection.
+    """
+    if chunk_size is None:
+        chunk_size = settings.CHANGE_NOTIFICATIONS_CHUNK_SIZE
+
+    failed_ids = set()
+    mail_connection = mail.get_connection()
+    mail_connection.open()
+    try:
+        while True:
+            notification_ids = _get_pending_notifications(chunk_size, failed_ids)
+            if not notification_ids:
+                break
+
+            for notification_id in notification_ids:
+                try:
+                    _process_notification(notification_id, mail_connection=mail_connection)
+                except Exception:
+                    log.exception("Error sending the change notification %s", notification_id)
+                    failed_ids.add(notification_id)
+    finally:
+        mail_connection.close()
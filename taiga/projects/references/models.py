@@ -25,6 +25,7 @@ from taiga.projects.issues.models import Issue
 from taiga.projects.models import Project
 
 from . import sequences as seq
+from . import services
 
 
 class Reference(models.Model):
@@ -92,11 +93,29 @@ def attach_sequence(sender, instance, created, **kwargs):
         instance.save(update_fields=['ref'])
 
 
+def invalidate_references_data_for_reference(sender, instance, **kwargs):
+    services.invalidate_references_data(instance.project_id, [instance.ref])
+
+
+def invalidate_references_data_for_object(sender, instance, **kwargs):
+    # The rendered references show the subject of the object
+    if instance.ref:
+        services.invalidate_references_data(instance.project_id, [instance.ref])
+
+
 models.signals.post_save.connect(create_sequence, sender=Project, dispatch_uid="refproj")
 models.signals.post_save.connect(attach_sequence, sender=UserStory, dispatch_uid="refus")
 models.signals.post_save.connect(attach_sequence, sender=Issue, dispatch_uid="refissue")
 models.signals.post_save.connect(attach_sequence, sender=Task, dispatch_uid="reftask")
 models.signals.post_delete.connect(delete_sequence, sender=Project, dispatch_uid="refprojdel")
 
-
-
+models.signals.post_save.connect(invalidate_references_data_for_reference, sender=Reference,
+                                 dispatch_uid="refcachereference")
+models.signals.post_delete.connect(invalidate_references_data_for_reference, sender=Reference,
+                                   dispatch_uid="refcachereferencedel")
+models.signals.post_save.connect(invalidate_references_data_for_object, sender=UserStory, dispatch_uid="refcacheus")
+models.signals.post_delete.connect(invalidate_references_data_for_object, sender=UserStory, dispatch_uid="refcacheusdel")
+models.signals.post_save.connect(invalidate_references_data_for_object, sender=Issue, dispatch_uid="refcacheissue")
+models.signals.post_delete.connect(invalidate_references_data_for_object, sender=Issue, dispatch_uid="refcacheissuedel")
+models.signals.post_save.connect(invalidate_references_data_for_object, sender=Task, dispatch_uid="refcachetask")
+models.signals.post_delete.connect(invalidate_references_data_for_object, sender=Task, dispatch_uid="refcachetaskdel")
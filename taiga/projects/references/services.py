@@ -15,6 +15,8 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
 
 
 def get_instance_by_ref(project_id, obj_ref):
@@ -25,3 +27,53 @@ def get_instance_by_ref(project_id, obj_ref):
         instance = None
 
     return instance
+
+
+def get_referenced_objects(project_id, refs) -> dict:
+    """
+    Get the objects (user stories, tasks and issues) of a project with
+    the given refs by ref, with one query for the references and one
+    for every type of object.
+    """
+    model_cls = apps.get_model("references", "Reference")
+    references = model_cls.objects.filter(project_id=project_id, ref__in=refs).select_related("content_type")
+
+    ids_by_content_type = {}
+    for reference in references:
+        ids_by_content_type.setdefault(reference.content_type, {})[reference.object_id] = reference.ref
+
+    result = {}
+    for content_type, refs_by_id in ids_by_content_type.items():
+        for obj in content_type.model_class().objects.filter(id__in=refs_by_id.keys()):
+            result[refs_by_id[obj.id]] = obj
+    return result
+
+
+def _get_reference_cache_key(project_id, ref) -> str:
+    return "reference:{}:{}".format(project_id, ref)
+
+
+def get_references_data(project_id, refs) -> dict:
+    """
+    Get the data needed to render the references to the given refs of
+    a project: {ref: (model name, subject)}, or an empty tuple if the
+    ref doesn't exist. It is cached by project and ref, and invalidated
+    when the referenced objects change.
+    """
+    keys = {_get_reference_cache_key(project_id, ref): ref for ref in refs}
+    result = {keys[key]: value for key, value in cache.get_many(keys.keys()).items()}
+
+    missing_refs = [ref for ref in refs if ref not in result]
+    if missing_refs:
+        objects = get_referenced_objects(project_id, missing_refs)
+        missing = {ref: (objects[ref]._meta.model_name, objects[ref].subject) if ref in objects else ()
+                   for ref in missing_refs}
+        cache.set_many({_get_reference_cache_key(project_id, ref): value for ref, value in missing.items()},
+                       timeout=settings.REFERENCES_CACHE_TIMEOUT)
+        result.update(missing)
+
+    return result
+
+
+def invalidate_references_data(project_id, refs):
+    cache.delete_many([_get_reference_cache_key(project_id, ref) for ref in refs])
@@ -18,6 +18,7 @@
 # is not the baddest practice ;)
 
 from .bulk_update_order import update_projects_order_in_bulk
+from .bulk_update_order import update_order_in_bulk
 from .bulk_update_order import bulk_update_severity_order
 from .bulk_update_order import bulk_update_priority_order
 from .bulk_update_order import bulk_update_issue_type_order
@@ -29,6 +30,8 @@ from .bulk_update_order import bulk_update_userstory_status_order
 from .filters import get_all_tags
 from .filters import get_issues_filters_data
 
+from .tags_index import rebuild_tags_index
+
 from .stats import get_stats_for_project_issues
 from .stats import get_stats_for_project
 from .stats import get_member_stats_for_project
@@ -14,9 +14,20 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import hashlib
+
 from contextlib import closing
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
 from django.db import connection
 
+from taiga.base.utils import json
+from taiga.base.utils.cache import get_cache_version, bump_cache_version
+
+from .tags_index import get_indexed_tags
+
 
 def _get_project_tags(project):
     result = set()
@@ -26,135 +37,137 @@ def _get_project_tags(project):
     return result
 
 
-def _get_stories_tags(project):
-    result = set()
-    for tags in project.user_stories.values_list("tags", flat=True):
-        if tags:
-            result.update(tags)
-    return result
-
-
-def _get_tasks_tags(project):
-    result = set()
-    for tags in project.tasks.values_list("tags", flat=True):
-        if tags:
-            result.update(tags)
-    return result
-
-
-def _get_issues_tags(project):
-    result = set()
-    for tags in project.issues.values_list("tags", flat=True):
-        if tags:
-            result.update(tags)
-    return result
-
-
-def _get_issues_tags_with_count(project):
-    extra_sql = ("select unnest(tags) as tagname, count(unnest(tags)) "
-                 "from issues_issue where project_id = %s "
-                 "group by unnest(tags) "
-                 "order by tagname asc")
-
-    with closing(connection.cursor()) as cursor:
-        cursor.execute(extra_sql, [project.id])
-        rows = cursor.fetchall()
-
-    return rows
-
-
-def _get_issues_statuses(project):
-    extra_sql = ("select status_id, count(status_id) from issues_issue "
-                 "where project_id = %s group by status_id;")
-
-    extra_sql = """
-    select id, (select count(*) from issues_issue
-                    where project_id = m.project_id and status_id = m.id)
-        from projects_issuestatus as m
-        where project_id = %s order by m.order;
+_ISSUES_FILTERS_FIELDS = {
+    # filter name: (column, data key)
+    "type": ("type_id", "types"),
+    "status": ("status_id", "statuses"),
+    "priority": ("priority_id", "priorities"),
+    "severity": ("severity_id", "severities"),
+    "assigned_to": ("assigned_to_id", "assigned_to"),
+    "owner": ("owner_id", "owners"),
+}
+
+_ISSUES_FILTERS_DATA_SQL = """
+     WITH issues AS (
+            SELECT {columns},
+                   tags,
+                   {flags}
+              FROM {issue_table}
+             WHERE project_id = %s
+          )
+{facets}
+"""
+
+_ISSUES_TAGS_FACET_SQL = """
+   SELECT 'tags', NULL, tag, COUNT(*) FILTER (WHERE {where})
+     FROM issues, unnest(issues.tags) AS tag
+ GROUP BY tag
+"""
+
+_ISSUES_FACET_SQL = """
+   SELECT '{name}', {column}, NULL, COUNT(*) FILTER (WHERE {where})
+     FROM issues
+ GROUP BY {column}
+"""
+
+
+def _get_issues_filter_condition(name:str, values:list) -> tuple:
+    if name == "tags":
+        return "tags @> %s::text[]", [list(values)]
+
+    column = _ISSUES_FILTERS_FIELDS[name][0]
+    ids = [int(value) for value in values if value is not None]
+    if None in values:
+        return "({0} = ANY(%s) OR {0} IS NULL)".format(column), [ids]
+    return "{0} = ANY(%s)".format(column), [ids]
+
+
+def _count_issues_by_filters(project, filters:dict) -> dict:
     """
+    Count the issues of a project by every filter field with one scan
+    of the issues table. The active filters are evaluated once per issue
+    and each facet is counted applying all of them except its own one, so
+    the counts are the number of issues that the user would get selecting
+    that value too.
 
-    with closing(connection.cursor()) as cursor:
-        cursor.execute(extra_sql, [project.id])
-        rows = cursor.fetchall()
-
-    return rows
+    As with the choices of the other fields, every tag used in the
+    project is counted, even if no issue matches it.
 
+    Without filters the tags are not counted, they are read
+    from the tags index of the project.
 
-def _get_issues_priorities(project):
-    extra_sql = """
-    select id, (select count(*) from issues_issue
-                where project_id = m.project_id and priority_id = m.id)
-        from projects_priority as m
-        where project_id = %s order by m.order;
+        {"status": {<status id>: <count>, ...}, ..., "tags": {<tag>: <count>, ...}}
     """
-
+    names = list(_ISSUES_FILTERS_FIELDS.keys()) + ["tags"]
+    flags, params = [], []
+    active = []
+    for name in names:
+        if name not in filters:
+            continue
+        condition, condition_params = _get_issues_filter_condition(name, filters[name])
+        flags.append("{} AS is_{}".format(condition, name))
+        params.extend(condition_params)
+        active.append(name)
+
+    def _where(excluded):
+        return " AND ".join("is_{}".format(name) for name in active if name != excluded) or "TRUE"
+
+    facets = [_ISSUES_FACET_SQL.format(name=name, column=column, where=_where(name))
+              for name, (column, key) in _ISSUES_FILTERS_FIELDS.items()]
+    if filters:
+        facets.append(_ISSUES_TAGS_FACET_SQL.format(where=_where("tags")))
+
+    sql = _ISSUES_FILTERS_DATA_SQL.format(
+        columns=", ".join(column for column, key in _ISSUES_FILTERS_FIELDS.values()),
+        flags=", ".join(flags) or "TRUE AS is_all",
+        issue_table=apps.get_model("issues", "Issue")._meta.db_table,
+        facets="UNION ALL".join(facets))
+
+    counts = {name: {} for name in names}
     with closing(connection.cursor()) as cursor:
-        cursor.execute(extra_sql, [project.id])
-        rows = cursor.fetchall()
+        cursor.execute(sql, params + [project.id])
+        for name, value_id, tag, count in cursor.fetchall():
+            counts[name][tag if name == "tags" else value_id] = count
+    return counts
 
-    return rows
 
-def _get_issues_types(project):
-    extra_sql = """
-    select id, (select count(*) from issues_issue
-                where project_id = m.project_id and type_id = m.id)
-        from projects_issuetype as m
-        where project_id = %s order by m.order;
-    """
+def _get_issues_filters_signature(filters:dict) -> str:
+    signature = sorted((name, sorted(values, key=str)) for name, values in filters.items())
+    return hashlib.sha1(json.dumps(signature).encode("utf-8")).hexdigest()
 
-    with closing(connection.cursor()) as cursor:
-        cursor.execute(extra_sql, [project.id])
-        rows = cursor.fetchall()
 
-    return rows
+def _get_issues_filters_version_key(project_id:int) -> str:
+    return "issues-filters-data-version:{}".format(project_id)
 
 
-def _get_issues_severities(project):
-    extra_sql = """
-    select id, (select count(*) from issues_issue
-                where project_id = m.project_id and severity_id = m.id)
-        from projects_severity as m
-        where project_id = %s order by m.order;
-    """
+def calculate_issues_filters_data(project, filters:dict=None) -> dict:
+    filters = filters or {}
+    counts = _count_issues_by_filters(project, filters)
 
-    with closing(connection.cursor()) as cursor:
-        cursor.execute(extra_sql, [project.id])
-        rows = cursor.fetchall()
+    def _with_counts(name, ids):
+        return [(id, counts[name].get(id, 0)) for id in ids]
 
-    return rows
+    members = list(project.memberships.filter(user__isnull=False).values_list("user_id", flat=True))
+    owners = _with_counts("owner", members)
+    return {
+        "types": _with_counts("type", project.issue_types.values_list("id", flat=True)),
+        "statuses": _with_counts("status", project.issue_statuses.values_list("id", flat=True)),
+        "priorities": _with_counts("priority", project.priorities.values_list("id", flat=True)),
+        "severities": _with_counts("severity", project.severities.values_list("id", flat=True)),
+        "assigned_to": _with_counts("assigned_to", [None] + members),
+        "created_by": owners,
+        "owners": owners,
+        "tags": (sorted(counts["tags"].items()) if filters
+                 else get_indexed_tags(project, "issues.issue")),
+    }
 
 
-def _get_issues_assigned_to(project):
-    extra_sql = """
-    select null, (select count(*) from issues_issue
-                        where project_id = %s and assigned_to_id is null)
-    UNION select user_id, (select count(*) from issues_issue
-                        where project_id = pm.project_id and assigned_to_id = pm.user_id)
-        from projects_membership as pm
-        where project_id = %s and pm.user_id is not null;
+def invalidate_issues_filters_data(project_id:int):
     """
-
-    with closing(connection.cursor()) as cursor:
-        cursor.execute(extra_sql, [project.id, project.id])
-        rows = cursor.fetchall()
-
-    return rows
-
-
-def _get_issues_owners(project):
-    extra_sql = """
-    select user_id, (select count(*) from issues_issue
-                        where project_id = pm.project_id and owner_id = pm.user_id)
-        from projects_membership as pm
-        where project_id = %s and pm.user_id is not null;
+    Change the issues version of the project so all the filters
+    data cached for it is ignored (and expires with the time).
     """
-
-    with closing(connection.cursor()) as cursor:
-        cursor.execute(extra_sql, [project.id])
-        rows = cursor.fetchall()
-
-    return rows
+    bump_cache_version(_get_issues_filters_version_key(project_id))
 
 
 # Public api
@@ -166,27 +179,27 @@ def get_all_tags(project):
     """
     result = set()
     result.update(_get_project_tags(project))
-    result.update(_get_issues_tags(project))
-    result.update(_get_stories_tags(project))
-    result.update(_get_tasks_tags(project))
+    result.update(tag for tag, count in get_indexed_tags(project))
     return sorted(result)
 
 
-def get_issues_filters_data(project):
+def get_issues_filters_data(project, filters:dict=None) -> dict:
     """
     Given a project, return a simple data structure
-    of all possible filters for issues.
-    """
-
-    data = {
-        "types": _get_issues_types(project),
-        "statuses": _get_issues_statuses(project),
-        "priorities": _get_issues_priorities(project),
-        "severities": _get_issues_severities(project),
-        "assigned_to": _get_issues_assigned_to(project),
-        "created_by": _get_issues_owners(project),
-        "owners": _get_issues_owners(project),
-        "tags": _get_issues_tags_with_count(project),
-    }
+    of all possible filters for issues, with the number
+    of issues matching each one (and the rest of the
+    applied `filters`, see `IssuesFilter`).
 
+    The data is cached by project and filters, and it is
+    invalidated every time an issue, an issue choice or a
+    membership of the project changes.
+    """
+    filters = filters or {}
+    key = "issues-filters-data:{}:{}:{}".format(project.id,
+                                                get_cache_version(_get_issues_filters_version_key(project.id)),
+                                                _get_issues_filters_signature(filters))
+    data = cache.get(key)
+    if data is None:
+        data = calculate_issues_filters_data(project, filters)
+        cache.set(key, data, settings.ISSUES_FILTERS_DATA_CACHE_TIMEOUT)
     return data
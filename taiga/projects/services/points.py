@@ -0,0 +1,183 @@
+# Copyright (C) 2014 Andrey Antukh <niwi@niwi.be>
+# Copyright (C) 2014 Jesús Espino <jespinog@gmail.com>
+# Copyright (C) 2014 David Barragán <bameda@dbarragan.com>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from contextlib import closing
+from collections import defaultdict
+
+from taiga.base.utils.dicts import dict_sum
+
+
+_PROJECT_POINTS_SQL = """
+    SELECT rp.role_id,
+           us.milestone_id,
+           us.is_closed,
+           us.client_requirement,
+           us.team_requirement,
+           COALESCE(us.created_date >= (SELECT MAX(m.estimated_finish)
+                                          FROM {milestone_table} m
+                                         WHERE m.project_id = us.project_id), TRUE) AS is_future,
+           SUM(COALESCE(p.value, 0))
+      FROM {role_points_table} rp
+INNER JOIN {user_story_table} us ON us.id = rp.user_story_id
+INNER JOIN {points_table} p ON p.id = rp.points_id
+     WHERE us.project_id = %s
+  GROUP BY 1, 2, 3, 4, 5, 6
+"""
+
+_MILESTONES_INCREMENTS_SQL = """
+    SELECT m.id,
+           rp.role_id,
+           us.client_requirement,
+           us.team_requirement,
+           SUM(COALESCE(p.value, 0))
+      FROM {milestone_table} m
+INNER JOIN {user_story_table} us ON us.project_id = m.project_id
+                                AND (us.created_date AT TIME ZONE 'UTC')::date >= m.estimated_start
+                                AND (us.created_date AT TIME ZONE 'UTC')::date < m.estimated_finish
+INNER JOIN {role_points_table} rp ON rp.user_story_id = us.id
+INNER JOIN {points_table} p ON p.id = rp.points_id
+     WHERE m.project_id = %s
+       AND (us.client_requirement OR us.team_requirement)
+  GROUP BY 1, 2, 3, 4
+"""
+
+
+def _get_tables():
+    return {
+        "milestone_table": apps.get_model("milestones", "Milestone")._meta.db_table,
+        "user_story_table": apps.get_model("userstories", "UserStory")._meta.db_table,
+        "role_points_table": apps.get_model("userstories", "RolePoints")._meta.db_table,
+        "points_table": apps.get_model("projects", "Points")._meta.db_table,
+    }
+
+
+def _add_points(counter:dict, role_id:int, points:float):
+    counter[role_id] = counter.get(role_id, 0) + points
+
+
+def _get_increments(raw_increments:dict) -> dict:
+    """
+    Split the shared increment between the team and the client ones
+    (as the `*_increment_points` properties of the models do).
+    """
+    shared_increment = {key: value / 2 for key, value in raw_increments["shared"].items()}
+    return {
+        "team": dict_sum(raw_increments["team"], shared_increment),
+        "client": dict_sum(raw_increments["client"], shared_increment),
+        "shared": raw_increments["shared"],
+    }
+
+
+def _get_increment_kind(client_requirement:bool, team_requirement:bool) -> str:
+    if client_requirement and team_requirement:
+        return "shared"
+    if client_requirement:
+        return "client"
+    if team_requirement:
+        return "team"
+    return None
+
+
+def calculate_project_points_rollup(project_id:int) -> dict:
+    """
+    Calculate the points, by role, of a project and its milestones
+    with two aggregate queries:
+
+        {
+            "defined": {<role id>: <points>, ...},
+            "closed": {...},
+            "assigned": {...},
+            "future_increments": {"team": {...}, "client": {...}, "shared": {...}},
+            "milestones": {
+                <milestone id>: {
+                    "total": {...},
+                    "closed": {...},
+                    "increments": {"team": {...}, "client": {...}, "shared": {...}},
+                },
+                ...
+            },
+        }
+    """
+    rollup = {"defined": {}, "closed": {}, "assigned": {}}
+    future_increments = {"team": {}, "client": {}, "shared": {}}
+    milestones = defaultdict(lambda: {"total": {}, "closed": {},
+                                      "increments": {"team": {}, "client": {}, "shared": {}}})
+    tables = _get_tables()
+
+    with closing(connection.cursor()) as cursor:
+        cursor.execute(_PROJECT_POINTS_SQL.format(**tables), [project_id])
+        for (role_id, milestone_id, is_closed, client_requirement,
+             team_requirement, is_future, points) in cursor.fetchall():
+            _add_points(rollup["defined"], role_id, points)
+            if is_closed:
+                _add_points(rollup["closed"], role_id, points)
+
+            if milestone_id is not None:
+                _add_points(rollup["assigned"], role_id, points)
+                _add_points(milestones[milestone_id]["total"], role_id, points)
+                if is_closed:
+                    _add_points(milestones[milestone_id]["closed"], role_id, points)
+
+            kind = _get_increment_kind(client_requirement, team_requirement)
+            if is_future and kind is not None:
+                _add_points(future_increments[kind], role_id, points)
+
+        cursor.execute(_MILESTONES_INCREMENTS_SQL.format(**tables), [project_id])
+        for milestone_id, role_id, client_requirement, team_requirement, points in cursor.fetchall():
+            kind = _get_increment_kind(client_requirement, team_requirement)
+            _add_points(milestones[milestone_id]["increments"][kind], role_id, points)
+
+    rollup["future_increments"] = _get_increments(future_increments)
+    rollup["milestones"] = {}
+    for milestone_id, milestone_points in milestones.items():
+        milestone_points["increments"] = _get_increments(milestone_points["increments"])
+        rollup["milestones"][milestone_id] = milestone_points
+    return rollup
+
+
+def _get_points_rollup_cache_key(project_id:int) -> str:
+    return "project-points-rollup:{}".format(project_id)
+
+
+def get_project_points_rollup(project) -> dict:
+    """
+    Get the points rollup of a project (see `calculate_project_points_rollup`)
+    from the cache. It is invalidated every time a role points, user story,
+    points or milestone of the project is saved or deleted.
+    """
+    key = _get_points_rollup_cache_key(project.id)
+    rollup = cache.get(key)
+    if rollup is None:
+        rollup = calculate_project_points_rollup(project.id)
+        cache.set(key, rollup, settings.PROJECT_POINTS_ROLLUP_CACHE_TIMEOUT)
+    return rollup
+
+
+def get_milestone_points(rollup:dict, milestone_id:int) -> dict:
+    return rollup["milestones"].get(milestone_id, {
+        "total": {},
+        "closed": {},
+        "increments": {"team": {}, "client": {}, "shared": {}},
+    })
+
+
+def invalidate_project_points_rollup(project_id:int):
+    cache.delete(_get_points_rollup_cache_key(project_id))
@@ -16,14 +16,24 @@
 
 from django.utils.translation import ugettext as _
 from django.db.models import Q, Count
+from django.db import connection
+from django.db import transaction
 from django.apps import apps
+from django.conf import settings
+from collections import defaultdict
+from contextlib import closing
 import datetime
 import copy
 
+from taiga.celery import app
+
 from taiga.projects.history.models import HistoryEntry
 
+from .points import get_project_points_rollup
+from .points import get_milestone_points
+
 
-def _get_milestones_stats_for_backlog(project):
+def _get_milestones_stats_for_backlog(project, points_rollup):
     """
     Get collection of stats for each millestone of project.
     Data returned by this function are used on backlog.
@@ -36,15 +46,10 @@ def _get_milestones_stats_for_backlog(project):
     if project.total_story_points and project.total_milestones:
         optimal_points_per_sprint = project.total_story_points / project.total_milestones
 
-    future_team_increment = sum(project.future_team_increment.values())
-    future_client_increment = sum(project.future_client_increment.values())
-
-    milestones = project.milestones.order_by('estimated_start').\
-            prefetch_related("user_stories",
-                             "user_stories__role_points",
-                             "user_stories__role_points__points")
+    future_team_increment = sum(points_rollup["future_increments"]["team"].values())
+    future_client_increment = sum(points_rollup["future_increments"]["client"].values())
 
-    milestones = list(milestones)
+    milestones = list(project.milestones.order_by('estimated_start').only("id", "name"))
     milestones_count = len(milestones)
     optimal_points = 0
     team_increment = 0
@@ -59,14 +64,15 @@ def _get_milestones_stats_for_backlog(project):
 
         if current_milestone < milestones_count:
             ml = milestones[current_milestone]
+            ml_points = get_milestone_points(points_rollup, ml.id)
 
             milestone_name = ml.name
             team_increment = current_team_increment
             client_increment = current_client_increment
 
-            current_evolution += sum(ml.closed_points.values())
-            current_team_increment += sum(ml.team_increment_points.values())
-            current_client_increment += sum(ml.client_increment_points.values())
+            current_evolution += sum(ml_points["closed"].values())
+            current_team_increment += sum(ml_points["increments"]["team"].values())
+            current_client_increment += sum(ml_points["increments"]["client"].values())
 
         else:
             milestone_name = _("Future sprint")
@@ -94,49 +100,143 @@ def _get_milestones_stats_for_backlog(project):
     }
 
 
-def _count_status_object(status_obj, counting_storage):
-    if status_obj.id in counting_storage:
-        counting_storage[status_obj.id]['count'] += 1
-    else:
-        counting_storage[status_obj.id] = {}
-        counting_storage[status_obj.id]['count'] = 1
-        counting_storage[status_obj.id]['name'] = status_obj.name
-        counting_storage[status_obj.id]['id'] = status_obj.id
-        counting_storage[status_obj.id]['color'] = status_obj.color
-
-def _count_owned_object(user_obj, counting_storage):
-    if user_obj:
-        if user_obj.id in counting_storage:
-            counting_storage[user_obj.id]['count'] += 1
-        else:
-            counting_storage[user_obj.id] = {}
-            counting_storage[user_obj.id]['count'] = 1
-            counting_storage[user_obj.id]['username'] = user_obj.username
-            counting_storage[user_obj.id]['name'] = user_obj.get_full_name()
-            counting_storage[user_obj.id]['id'] = user_obj.id
-            counting_storage[user_obj.id]['color'] = user_obj.color
-    else:
-        if 0 in counting_storage:
-            counting_storage[0]['count'] += 1
+def _get_issues_counts_by_attribute(project, attr):
+    """
+    Count the issues of a project grouped by a status-like
+    attribute (type, status, priority or severity).
+    """
+    rows = (project.issues.values(attr, "{}__name".format(attr), "{}__color".format(attr))
+                          .annotate(count=Count("id"))
+                          .order_by())
+
+    counts = {}
+    for row in rows:
+        counts[row[attr]] = {
+            "count": row["count"],
+            "name": row["{}__name".format(attr)],
+            "id": row[attr],
+            "color": row["{}__color".format(attr)],
+        }
+    return counts
+
+
+def _get_issues_counts_by_user(project, attr):
+    """
+    Count the issues of a project grouped by an user
+    attribute (owner or assigned_to).
+    """
+    rows = project.issues.values(attr).annotate(count=Count("id")).order_by()
+    rows = {row[attr]: row["count"] for row in rows}
+
+    user_model = apps.get_model("users", "User")
+    users = user_model.objects.in_bulk([id for id in rows if id is not None])
+
+    counts = {}
+    for user_id, count in rows.items():
+        user = users.get(user_id, None)
+        if user is None:
+            counts[0] = {
+                "count": counts.get(0, {}).get("count", 0) + count,
+                "username": _("Unassigned"),
+                "name": _("Unassigned"),
+                "id": 0,
+                "color": "black",
+            }
         else:
-            counting_storage[0] = {}
-            counting_storage[0]['count'] = 1
-            counting_storage[0]['username'] = _('Unassigned')
-            counting_storage[0]['name'] = _('Unassigned')
-            counting_storage[0]['id'] = 0
-            counting_storage[0]['color'] = 'black'
+            counts[user.id] = {
+                "count": count,
+                "username": user.username,
+                "name": user.get_full_name(),
+                "id": user.id,
+                "color": user.color,
+            }
+    return counts
+
+
+# Issues created, closed and opened of some projects per day (and per severity and
+# priority). Dates are compared as naive UTC values.
+_ISSUES_DAILY_COUNTS_SQL = """
+    SELECT days.day,
+           issues.project_id,
+           issues.severity_id,
+           issues.priority_id,
+           COUNT(CASE WHEN issues.created_date AT TIME ZONE 'UTC' >= days.day THEN 1 END),
+           COUNT(CASE WHEN issues.finished_date AT TIME ZONE 'UTC' >= days.day
+                       AND issues.finished_date AT TIME ZONE 'UTC' < days.day + interval '1 day'
+                      THEN 1 END),
+           COUNT(CASE WHEN issues.finished_date IS NULL
+                        OR issues.finished_date AT TIME ZONE 'UTC' > days.day
+                      THEN 1 END)
+      FROM generate_series(%(first_day)s::timestamp, %(last_day)s::timestamp, interval '1 day') AS days(day)
+      JOIN {table} AS issues
+        ON issues.created_date AT TIME ZONE 'UTC' < days.day + interval '1 day'
+       AND (issues.finished_date IS NULL OR issues.finished_date AT TIME ZONE 'UTC' >= days.day)
+     {where}
+  GROUP BY days.day, issues.project_id, issues.severity_id, issues.priority_id
+"""
+
+
+def get_issues_daily_counts(first_day, last_day, project_ids=None):
+    """
+    Get the issues created, closed and opened per day between `first_day`
+    and `last_day` (both included) with only one query, as a dict
+    `{project_id: [(day, severity_id, priority_id, created, closed, opened), ...]}`.
+    """
+    issue_model = apps.get_model("issues", "Issue")
+    params = {"first_day": first_day, "last_day": last_day}
+
+    where = ""
+    if project_ids is not None:
+        where = "WHERE issues.project_id IN %(project_ids)s"
+        params["project_ids"] = tuple(project_ids) or (None,)
+
+    sql = _ISSUES_DAILY_COUNTS_SQL.format(table=issue_model._meta.db_table, where=where)
+
+    counts = defaultdict(list)
+    with closing(connection.cursor()) as cursor:
+        cursor.execute(sql, params)
+        for day, project_id, severity_id, priority_id, created, closed, opened in cursor.fetchall():
+            counts[project_id].append((day, severity_id, priority_id, created, closed, opened))
+    return counts
+
+
+def _get_last_four_weeks_days():
+    today = datetime.datetime.combine(datetime.date.today(), datetime.time(0, 0))
+    return [today - datetime.timedelta(days=x) for x in range(27, -1, -1)]
+
+
+def _get_issues_daily_counts_for_project(project, days):
+    """
+    Get the daily counts of the issues of a project, using the
+    precomputed buckets (if they are enabled and up to date)
+    for the past days and calculating the rest.
+    """
+    first_day = days[0]
+    stored_counts = []
+
+    if settings.ISSUES_STATS_DAILY_BUCKETS_ENABLED:
+        daily_stats_model = apps.get_model("projects", "ProjectIssuesDailyStats")
+        daily_stats = daily_stats_model.objects.filter(project=project).first()
+        yesterday = (days[-1] - datetime.timedelta(days=1)).date()
+        if daily_stats is not None and daily_stats.last_day == yesterday:
+            stored_counts = [row for row in daily_stats.get_counts() if row[0] >= first_day]
+            first_day = days[-1]
+
+    counts = get_issues_daily_counts(first_day, days[-1], project_ids=[project.id])
+    return stored_counts + counts.get(project.id, [])
+
 
 def get_stats_for_project_issues(project):
     project_issues_stats = {
         'total_issues': 0,
         'opened_issues': 0,
         'closed_issues': 0,
-        'issues_per_type': {},
-        'issues_per_status': {},
-        'issues_per_priority': {},
-        'issues_per_severity': {},
-        'issues_per_owner': {},
-        'issues_per_assigned_to': {},
+        'issues_per_type': _get_issues_counts_by_attribute(project, "type"),
+        'issues_per_status': _get_issues_counts_by_attribute(project, "status"),
+        'issues_per_priority': _get_issues_counts_by_attribute(project, "priority"),
+        'issues_per_severity': _get_issues_counts_by_attribute(project, "severity"),
+        'issues_per_owner': _get_issues_counts_by_user(project, "owner"),
+        'issues_per_assigned_to': _get_issues_counts_by_user(project, "assigned_to"),
         'last_four_weeks_days': {
             'by_open_closed': {'open': [], 'closed': []},
             'by_severity': {},
@@ -146,21 +246,13 @@ def get_stats_for_project_issues(project):
 
     }
 
-    issues = project.issues.all().select_related(
-        'status', 'priority', 'type', 'severity', 'owner', 'assigned_to'
-    )
-    for issue in issues:
-        project_issues_stats['total_issues'] += 1
-        if issue.status.is_closed:
-            project_issues_stats['closed_issues'] += 1
+    rows = project.issues.values("status__is_closed").annotate(count=Count("id")).order_by()
+    for row in rows:
+        project_issues_stats['total_issues'] += row['count']
+        if row['status__is_closed']:
+            project_issues_stats['closed_issues'] += row['count']
         else:
-            project_issues_stats['opened_issues'] += 1
-        _count_status_object(issue.type, project_issues_stats['issues_per_type'])
-        _count_status_object(issue.status, project_issues_stats['issues_per_status'])
-        _count_status_object(issue.priority, project_issues_stats['issues_per_priority'])
-        _count_status_object(issue.severity, project_issues_stats['issues_per_severity'])
-        _count_owned_object(issue.owner, project_issues_stats['issues_per_owner'])
-        _count_owned_object(issue.assigned_to, project_issues_stats['issues_per_assigned_to'])
+            project_issues_stats['opened_issues'] += row['count']
 
     for severity in project_issues_stats['issues_per_severity'].values():
         project_issues_stats['last_four_weeks_days']['by_severity'][severity['id']] = copy.copy(severity)
@@ -172,44 +264,73 @@ def get_stats_for_project_issues(project):
         del(project_issues_stats['last_four_weeks_days']['by_priority'][priority['id']]['count'])
         project_issues_stats['last_four_weeks_days']['by_priority'][priority['id']]['data'] = []
 
-    for x in range(27, -1, -1):
-        day = datetime.datetime.combine(datetime.date.today(), datetime.time(0, 0)) - datetime.timedelta(days=x)
-        next_day = day + datetime.timedelta(days=1)
-
-        open_this_day = filter(lambda x: x.created_date.replace(tzinfo=None) >= day, issues)
-        open_this_day = filter(lambda x: x.created_date.replace(tzinfo=None) < next_day, open_this_day)
-        open_this_day = len(list(open_this_day))
-        project_issues_stats['last_four_weeks_days']['by_open_closed']['open'].append(open_this_day)
+    days = _get_last_four_weeks_days()
+    open_per_day = defaultdict(int)
+    closed_per_day = defaultdict(int)
+    opened_per_severity = defaultdict(int)
+    opened_per_priority = defaultdict(int)
 
-        closed_this_day = filter(lambda x: x.finished_date, issues)
-        closed_this_day = filter(lambda x: x.finished_date.replace(tzinfo=None) >= day, closed_this_day)
-        closed_this_day = filter(lambda x: x.finished_date.replace(tzinfo=None) < next_day, closed_this_day)
-        closed_this_day = len(list(closed_this_day))
-        project_issues_stats['last_four_weeks_days']['by_open_closed']['closed'].append(closed_this_day)
+    for day, severity_id, priority_id, created, closed, opened in _get_issues_daily_counts_for_project(project, days):
+        open_per_day[day] += created
+        closed_per_day[day] += closed
+        opened_per_severity[(day, severity_id)] += opened
+        opened_per_priority[(day, priority_id)] += opened
 
-        opened_this_day = filter(lambda x: x.created_date.replace(tzinfo=None) < next_day, issues)
-        opened_this_day = list(filter(lambda x: x.finished_date is None or x.finished_date.replace(tzinfo=None) > day, opened_this_day))
+    for day in days:
+        project_issues_stats['last_four_weeks_days']['by_open_closed']['open'].append(open_per_day[day])
+        project_issues_stats['last_four_weeks_days']['by_open_closed']['closed'].append(closed_per_day[day])
 
-        for severity in project_issues_stats['last_four_weeks_days']['by_severity']:
-            by_severity = filter(lambda x: x.severity_id == severity, opened_this_day)
-            by_severity = len(list(by_severity))
-            project_issues_stats['last_four_weeks_days']['by_severity'][severity]['data'].append(by_severity)
+        for severity, severity_stats in project_issues_stats['last_four_weeks_days']['by_severity'].items():
+            severity_stats['data'].append(opened_per_severity[(day, severity)])
 
-        for priority in project_issues_stats['last_four_weeks_days']['by_priority']:
-            by_priority = filter(lambda x: x.priority_id == priority, opened_this_day)
-            by_priority = len(list(by_priority))
-            project_issues_stats['last_four_weeks_days']['by_priority'][priority]['data'].append(by_priority)
+        for priority, priority_stats in project_issues_stats['last_four_weeks_days']['by_priority'].items():
+            priority_stats['data'].append(opened_per_priority[(day, priority)])
 
     return project_issues_stats
 
 
-def get_stats_for_project(project):
-    project = apps.get_model("projects", "Project").objects.\
-        prefetch_related("milestones",
-                                     "user_stories").\
-        get(id=project.id)
+@app.task
+def update_issues_daily_stats(day=None):
+    """
+    Precompute incrementally the daily buckets of the issues stats
+    of all the projects for the last four weeks until `day` (by
+    default, yesterday). It should be run once a day (by celery beat).
+    """
+    if not settings.ISSUES_STATS_DAILY_BUCKETS_ENABLED:
+        return
+
+    if day is None:
+        day = datetime.date.today() - datetime.timedelta(days=1)
+
+    last_day = datetime.datetime.combine(day, datetime.time(0, 0))
+    first_day = last_day - datetime.timedelta(days=26)
+
+    daily_stats_model = apps.get_model("projects", "ProjectIssuesDailyStats")
+    project_model = apps.get_model("projects", "Project")
+
+    # Only the new day is calculated for the projects with buckets up
+    # to the previous day, the rest need the whole series.
+    updated_stats = {stats.project_id: stats for stats in
+                     daily_stats_model.objects.filter(last_day=day - datetime.timedelta(days=1))}
+    outdated_project_ids = set(project_model.objects.values_list("id", flat=True)) - set(updated_stats)
+    new_counts = get_issues_daily_counts(last_day, last_day, project_ids=updated_stats.keys())
+    full_counts = get_issues_daily_counts(first_day, last_day, project_ids=outdated_project_ids)
 
-    points = project.calculated_points
+    with transaction.atomic():
+        for project_id, stats in updated_stats.items():
+            counts = [row for row in stats.get_counts() if row[0] >= first_day]
+            stats.set_counts(day, counts + new_counts.get(project_id, []))
+            stats.save()
+
+        for project_id in outdated_project_ids:
+            daily_stats_model.objects.update_or_create(project_id=project_id, defaults={
+                "last_day": day,
+                "buckets": daily_stats_model.dump_counts(full_counts.get(project_id, [])),
+            })
+
+
+def get_stats_for_project(project):
+    points = get_project_points_rollup(project)
     closed_points = sum(points["closed"].values())
     closed_milestones = project.milestones.filter(closed=True).count()
     speed = 0
@@ -226,7 +347,7 @@ def get_stats_for_project(project):
         'defined_points_per_role': points["defined"],
         'assigned_points': sum(points["assigned"].values()),
         'assigned_points_per_role': points["assigned"],
-        'milestones': _get_milestones_stats_for_backlog(project),
+        'milestones': _get_milestones_stats_for_backlog(project, points),
         'speed': speed,
     }
     return project_stats
@@ -46,6 +46,8 @@ def update_project_tags_colors_handler(instance):
     if not isinstance(instance.project.tags_colors, list):
         instance.project.tags_colors = []
 
+    tags_colors = list(instance.project.tags_colors)
+
     for tag in instance.tags:
         defined_tags = map(lambda x: x[0], instance.project.tags_colors)
         if tag not in defined_tags:
@@ -53,8 +55,9 @@ def update_project_tags_colors_handler(instance):
             new_color = _get_new_color(tag, settings.TAGS_PREDEFINED_COLORS,
                                        exclude=used_colors)
             instance.project.tags_colors.append([tag, new_color])
-        
+
     remove_unused_tags(instance.project)
 
-    if not isinstance(instance, Project):
+    # The project is saved only if its tags have changed
+    if not isinstance(instance, Project) and instance.project.tags_colors != tags_colors:
         instance.project.save()
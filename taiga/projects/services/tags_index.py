@@ -0,0 +1,140 @@
+# Copyright (C) 2014 Andrey Antukh <niwi@niwi.be>
+# Copyright (C) 2014 Jesús Espino <jespinog@gmail.com>
+# Copyright (C) 2014 David Barragán <bameda@dbarragan.com>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from contextlib import closing
+
+from django.apps import apps
+from django.db import connection
+
+
+TAGGED_MODELS = ["userstories.UserStory", "tasks.Task", "issues.Issue"]
+
+_ADD_TAGS_SQL = """
+INSERT INTO {table} (project_id, tag, content_type, count)
+     SELECT %s, tag, %s, 1
+       FROM unnest(%s::text[]) AS tag
+ON CONFLICT (project_id, tag, content_type)
+  DO UPDATE SET count = {table}.count + 1
+"""
+
+_REMOVE_TAGS_SQL = """
+UPDATE {table}
+   SET count = count - 1
+ WHERE project_id = %s
+   AND content_type = %s
+   AND tag = ANY(%s::text[])
+"""
+
+_DELETE_UNUSED_TAGS_SQL = """
+DELETE FROM {table}
+ WHERE project_id = %s
+   AND content_type = %s
+   AND tag = ANY(%s::text[])
+   AND count <= 0
+"""
+
+_INDEX_TAGS_SQL = """
+INSERT INTO {table} (project_id, tag, content_type, count)
+     SELECT project_id, tag, %s, COUNT(DISTINCT id)
+       FROM {tagged_table}, unnest(tags) AS tag
+      WHERE {where}
+   GROUP BY project_id, tag
+"""
+
+
+def _get_table() -> str:
+    return apps.get_model("projects", "ProjectTag")._meta.db_table
+
+
+def get_content_type(model) -> str:
+    return "{}.{}".format(model._meta.app_label, model._meta.model_name)
+
+
+def update_tags_index(project_id:int, content_type:str, added_tags=(), removed_tags=()):
+    """
+    Update the usage count of the tags of a project for
+    one object of type `content_type` that starts using
+    `added_tags` and stops using `removed_tags`.
+    """
+    added_tags = list(set(added_tags or []))
+    removed_tags = list(set(removed_tags or []))
+    table = _get_table()
+
+    with closing(connection.cursor()) as cursor:
+        if added_tags:
+            cursor.execute(_ADD_TAGS_SQL.format(table=table), [project_id, content_type, added_tags])
+        if removed_tags:
+            params = [project_id, content_type, removed_tags]
+            cursor.execute(_REMOVE_TAGS_SQL.format(table=table), params)
+            cursor.execute(_DELETE_UNUSED_TAGS_SQL.format(table=table), params)
+
+
+def update_tags_index_for_instance(instance, prev_project_id:int=None, prev_tags:list=None):
+    """
+    Update the tags index with the changes between the previous
+    tags of a user story, task or issue and the current ones.
+    """
+    content_type = get_content_type(instance)
+    tags = set(instance.tags or [])
+    prev_tags = set(prev_tags or [])
+
+    if prev_project_id is not None and prev_project_id != instance.project_id:
+        update_tags_index(prev_project_id, content_type, removed_tags=prev_tags)
+        prev_tags = set()
+
+    update_tags_index(instance.project_id, content_type,
+                      added_tags=tags - prev_tags,
+                      removed_tags=prev_tags - tags)
+
+
+def get_indexed_tags(project, content_type:str=None) -> list:
+    """
+    Get the (tag, count) pairs of the indexed tags of a project,
+    sorted by tag, of one type of objects or all of them.
+    """
+    ProjectTag = apps.get_model("projects", "ProjectTag")
+    queryset = ProjectTag.objects.filter(project_id=project.id)
+    if content_type is not None:
+        queryset = queryset.filter(content_type=content_type)
+
+    tags = {}
+    for tag, count in queryset.values_list("tag", "count"):
+        tags[tag] = tags.get(tag, 0) + count
+    return sorted(tags.items())
+
+
+def rebuild_tags_index(project=None) -> int:
+    """
+    Index again the tags of the user stories, tasks and issues
+    of a project (or of all of them). Return the number of
+    indexed tags.
+    """
+    ProjectTag = apps.get_model("projects", "ProjectTag")
+    queryset = ProjectTag.objects.all()
+    where, params = "project_id IS NOT NULL", []
+    if project is not None:
+        queryset = queryset.filter(project_id=project.id)
+        where, params = "project_id = %s", [project.id]
+    queryset.delete()
+
+    count = 0
+    with closing(connection.cursor()) as cursor:
+        for model_name in TAGGED_MODELS:
+            model = apps.get_model(model_name)
+            sql = _INDEX_TAGS_SQL.format(table=_get_table(), tagged_table=model._meta.db_table, where=where)
+            cursor.execute(sql, [get_content_type(model)] + params)
+            count += cursor.rowcount
+    return count
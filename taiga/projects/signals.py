@@ -18,7 +18,10 @@ from django.apps import apps
 from django.conf import settings
 
 from taiga.projects.services.tags_colors import update_project_tags_colors_handler, remove_unused_tags
+from taiga.projects.services.tags_index import update_tags_index, update_tags_index_for_instance, get_content_type
 from taiga.projects.notifications.services import create_notify_policy_if_not_exists
+from taiga.projects.services.points import invalidate_project_points_rollup
+from taiga.projects.services.filters import invalidate_issues_filters_data
 
 
 ####################################
@@ -32,13 +35,31 @@ def tags_normalization(sender, instance, **kwargs):
         instance.tags = list(map(str.lower, instance.tags))
 
 
+def cached_prev_tags(sender, instance, **kwargs):
+    instance._prev_tags = (None, [])
+    if instance.id:
+        prev = sender.objects.filter(id=instance.id).values_list("project_id", "tags").first()
+        if prev is not None:
+            instance._prev_tags = prev
+
+
 def update_project_tags_when_create_or_edit_taggable_item(sender, instance, **kwargs):
+    if not isinstance(instance, apps.get_model("projects", "Project")):
+        prev_project_id, prev_tags = getattr(instance, "_prev_tags", (None, []))
+        update_tags_index_for_instance(instance, prev_project_id, prev_tags)
+        if prev_project_id == instance.project_id and set(prev_tags or []) == set(instance.tags or []):
+            return
+
     update_project_tags_colors_handler(instance)
 
 
 def update_project_tags_when_delete_taggable_item(sender, instance, **kwargs):
+    update_tags_index(instance.project_id, get_content_type(instance), removed_tags=instance.tags)
+
+    tags_colors = list(instance.project.tags_colors)
     remove_unused_tags(instance.project)
-    instance.project.save()
+    if instance.project.tags_colors != tags_colors:
+        instance.project.save()
 
 def membership_post_delete(sender, instance, using, **kwargs):
     instance.project.update_role_points()
@@ -90,3 +111,40 @@ def project_post_save(sender, instance, created, **kwargs):
         Membership = apps.get_model("projects", "Membership")
         Membership.objects.create(user=instance.owner, project=instance, role=owner_role,
                                   is_owner=True, email=instance.owner.email)
+
+
+## POINTS ROLLUP
+
+def invalidate_points_rollup(sender, instance, **kwargs):
+    # Used for user stories, milestones and points
+    invalidate_project_points_rollup(instance.project_id)
+
+
+def invalidate_points_rollup_for_role_points(sender, instance, **kwargs):
+    UserStory = apps.get_model("userstories", "UserStory")
+    # The user story could be deleted yet (in cascade)
+    project_ids = UserStory.objects.filter(id=instance.user_story_id).values_list("project_id", flat=True)
+    for project_id in project_ids:
+        invalidate_project_points_rollup(project_id)
+
+
+## ISSUES FILTERS DATA
+
+def invalidate_issues_filters_data_handler(sender, instance, **kwargs):
+    # Used for issues, issue choices and memberships
+    invalidate_issues_filters_data(instance.project_id)
+
+
+## PERMISSIONS
+
+def invalidate_memberships_for_membership(sender, instance, **kwargs):
+    from taiga.permissions.service import invalidate_user_memberships
+    if instance.user_id:
+        invalidate_user_memberships([instance.user_id])
+
+
+def invalidate_memberships_for_role(sender, instance, **kwargs):
+    from taiga.permissions.service import invalidate_user_memberships
+    Membership = apps.get_model("projects", "Membership")
+    user_ids = Membership.objects.filter(role_id=instance.id).exclude(user=None).values_list("user_id", flat=True)
+    invalidate_user_memberships(list(user_ids))
@@ -112,10 +112,10 @@ class TaskViewSet(OCCResourceMixin, HistoryResourceMixin, WatchedResourceMixin,
         project = get_object_or_404(Project, pk=data["project_id"])
 
         self.check_permissions(request, "bulk_update_order", project)
-        services.update_tasks_order_in_bulk(data["bulk_tasks"],
-                                            project=project,
-                                            field=order_field)
-        services.snapshot_tasks_in_bulk(data["bulk_tasks"], request.user)
+        changed_ids = services.update_tasks_order_in_bulk(data["bulk_tasks"],
+                                                          project=project,
+                                                          field=order_field)
+        services.snapshot_tasks_in_bulk(changed_ids, request.user)
 
         return response.NoContent()
 
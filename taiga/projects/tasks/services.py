@@ -18,7 +18,7 @@ import io
 import csv
 
 from taiga.base.utils import db, text
-from taiga.projects.history.services import take_snapshot
+from taiga.projects.history.services import take_snapshots_in_bulk
 from taiga.events import events
 
 from . import models
@@ -56,6 +56,8 @@ def update_tasks_order_in_bulk(bulk_data:list, field:str, project:object):
     `bulk_data` should be a list of tuples with the following format:
 
     [(<task id>, {<field>: <value>, ...}), ...]
+
+    Return the ids of the tasks whose order has changed.
     """
     task_ids = []
     new_order_values = []
@@ -63,21 +65,19 @@ def update_tasks_order_in_bulk(bulk_data:list, field:str, project:object):
         task_ids.append(task_data["task_id"])
         new_order_values.append({field: task_data["order"]})
 
-    events.emit_event_for_ids(ids=task_ids,
-                              content_type="tasks.task",
-                              projectid=project.pk)
-
-    db.update_in_bulk_with_ids(task_ids, new_order_values, model=models.Task)
+    changed_ids = db.update_in_bulk_with_ids(task_ids, new_order_values, model=models.Task,
+                                             only_changed=True, filters={"project": project.pk})
+    if changed_ids:
+        events.emit_event_for_ids(ids=changed_ids,
+                                  content_type="tasks.task",
+                                  projectid=project.pk)
+    return changed_ids
 
 
-def snapshot_tasks_in_bulk(bulk_data, user):
-    task_ids = []
-    for task_data in bulk_data:
-        try:
-            task = models.Task.objects.get(pk=task_data['task_id'])
-            take_snapshot(task, user=user)
-        except models.UserStory.DoesNotExist:
-            pass
+def snapshot_tasks_in_bulk(task_ids, user):
+    tasks = models.Task.objects.select_related("project").in_bulk(task_ids)
+    tasks = [tasks[task_id] for task_id in task_ids if task_id in tasks]
+    take_snapshots_in_bulk(tasks, user=user)
 
 
 def tasks_to_csv(project, queryset):
@@ -144,10 +144,10 @@ class UserStoryViewSet(OCCResourceMixin, HistoryResourceMixin, WatchedResourceMi
         project = get_object_or_404(Project, pk=data["project_id"])
 
         self.check_permissions(request, "bulk_update_order", project)
-        services.update_userstories_order_in_bulk(data["bulk_stories"],
-                                                  project=project,
-                                                  field=order_field)
-        services.snapshot_userstories_in_bulk(data["bulk_stories"], request.user)
+        changed_ids = services.update_userstories_order_in_bulk(data["bulk_stories"],
+                                                                project=project,
+                                                                field=order_field)
+        services.snapshot_userstories_in_bulk(changed_ids, request.user)
 
         return response.NoContent()
 
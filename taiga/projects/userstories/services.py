@@ -20,7 +20,8 @@ import io
 from django.utils import timezone
 
 from taiga.base.utils import db, text
-from taiga.projects.history.services import take_snapshot
+from taiga.projects.history.services import take_snapshots_in_bulk
+from taiga.projects.milestones.services import update_milestone_burndown_closed_points
 from taiga.events import events
 
 from . import models
@@ -58,6 +59,8 @@ def update_userstories_order_in_bulk(bulk_data:list, field:str, project:object):
     `bulk_data` should be a list of tuples with the following format:
 
     [(<user story id>, {<field>: <value>, ...}), ...]
+
+    Return the ids of the user stories whose order has changed.
     """
     user_story_ids = []
     new_order_values = []
@@ -65,21 +68,19 @@ def update_userstories_order_in_bulk(bulk_data:list, field:str, project:object):
         user_story_ids.append(us_data["us_id"])
         new_order_values.append({field: us_data["order"]})
 
-    events.emit_event_for_ids(ids=user_story_ids,
-                              content_type="userstories.userstory",
-                              projectid=project.pk)
-
-    db.update_in_bulk_with_ids(user_story_ids, new_order_values, model=models.UserStory)
+    changed_ids = db.update_in_bulk_with_ids(user_story_ids, new_order_values, model=models.UserStory,
+                                             only_changed=True, filters={"project": project.pk})
+    if changed_ids:
+        events.emit_event_for_ids(ids=changed_ids,
+                                  content_type="userstories.userstory",
+                                  projectid=project.pk)
+    return changed_ids
 
 
-def snapshot_userstories_in_bulk(bulk_data, user):
-    user_story_ids = []
-    for us_data in bulk_data:
-        try:
-            us = models.UserStory.objects.get(pk=us_data['us_id'])
-            take_snapshot(us, user=user)
-        except models.UserStory.DoesNotExist:
-            pass
+def snapshot_userstories_in_bulk(user_story_ids, user):
+    user_stories = models.UserStory.objects.select_related("project").in_bulk(user_story_ids)
+    user_stories = [user_stories[us_id] for us_id in user_story_ids if us_id in user_stories]
+    take_snapshots_in_bulk(user_stories, user=user)
 
 
 def calculate_userstory_is_closed(user_story):
@@ -100,13 +101,17 @@ def close_userstory(us):
         us.is_closed = True
         us.finish_date = timezone.now()
         us.save(update_fields=["is_closed", "finish_date"])
+        update_milestone_burndown_closed_points(us, us.finish_date.date(), closed=True)
 
 
 def open_userstory(us):
     if us.is_closed:
+        finish_date = us.finish_date
         us.is_closed = False
         us.finish_date = None
         us.save(update_fields=["is_closed", "finish_date"])
+        if finish_date is not None:
+            update_milestone_burndown_closed_points(us, finish_date.date(), closed=False)
 
 
 def userstories_to_csv(project,queryset):
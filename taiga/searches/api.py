@@ -30,21 +30,35 @@ from . import services
 
 
 class SearchViewSet(viewsets.ViewSet):
+    serializers = {
+        "userstories": UserStorySerializer,
+        "tasks": TaskSerializer,
+        "issues": IssueSerializer,
+        "wikipages": WikiPageSerializer,
+    }
+
+    permissions = {
+        "userstories": "view_us",
+        "tasks": "view_tasks",
+        "issues": "view_issues",
+        "wikipages": "view_wiki_pages",
+    }
+
     def list(self, request, **kwargs):
         text = request.QUERY_PARAMS.get('text', "")
         project_id = request.QUERY_PARAMS.get('project', None)
 
         project = self._get_project(project_id)
 
-        result = {}
-        if user_has_perm(request.user, "view_us", project):
-            result["userstories"] = self._search_user_stories(project, text)
-        if user_has_perm(request.user, "view_tasks", project):
-            result["tasks"] = self._search_tasks(project, text)
-        if user_has_perm(request.user, "view_issues", project):
-            result["issues"] = self._search_issues(project, text)
-        if user_has_perm(request.user, "view_wiki_pages", project):
-            result["wikipages"] = self._search_wiki_pages(project, text)
+        types = [type for type, _ in services.SEARCH_MODELS
+                 if user_has_perm(request.user, self.permissions[type], project)]
+
+        result = {type: [] for type in types}
+        for type, obj in services.search(project, text, types):
+            result[type].append(obj)
+
+        for type in types:
+            result[type] = self.serializers[type](result[type], many=True).data
 
         result["count"] = sum(map(lambda x: len(x), result.values()))
         return response.Ok(result)
@@ -52,23 +66,3 @@ class SearchViewSet(viewsets.ViewSet):
     def _get_project(self, project_id):
         project_model = apps.get_model("projects", "Project")
         return get_object_or_404(project_model, pk=project_id)
-
-    def _search_user_stories(self, project, text):
-        queryset = services.search_user_stories(project, text)
-        serializer = UserStorySerializer(queryset, many=True)
-        return serializer.data
-
-    def _search_tasks(self, project, text):
-        queryset = services.search_tasks(project, text)
-        serializer = TaskSerializer(queryset, many=True)
-        return serializer.data
-
-    def _search_issues(self, project, text):
-        queryset = services.search_issues(project, text)
-        serializer = IssueSerializer(queryset, many=True)
-        return serializer.data
-
-    def _search_wiki_pages(self, project, text):
-        queryset = services.search_wiki_pages(project, text)
-        serializer = WikiPageSerializer(queryset, many=True)
-        return serializer.data
@@ -0,0 +1,39 @@
+# Copyright (C) 2014 Andrey Antukh <niwi@niwi.be>
+# Copyright (C) 2014 Jesús Espino <jespinog@gmail.com>
+# Copyright (C) 2014 David Barragán <bameda@dbarragan.com>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from taiga.searches import services
+
+
+class Command(BaseCommand):
+    args = '<type type ...>'
+    help = 'Rebuild the search index of user stories, tasks, issues and wiki pages'
+
+    def handle(self, *args, **options):
+        valid_types = [type for type, _ in services.SEARCH_MODELS]
+        types = args or valid_types
+
+        for type in types:
+            if type not in valid_types:
+                raise CommandError('Invalid type "{}", valid ones are: {}'.format(type, ", ".join(valid_types)))
+
+        for type in types:
+            with transaction.atomic():
+                count = services.rebuild_search_index(type)
+            self.stdout.write("{}: {} objects indexed".format(type, count))
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+# Table -> ((column, weight), ...) of the documents indexed for searches
+SEARCH_DOCUMENTS = (
+    ("userstories_userstory", (("subject", "A"), ("ref", "A"), ("description", "B"))),
+    ("tasks_task", (("subject", "A"), ("ref", "A"), ("description", "B"))),
+    ("issues_issue", (("subject", "A"), ("ref", "A"), ("description", "B"))),
+    ("wiki_wikipage", (("slug", "A"), ("content", "B"))),
+)
+
+
+def _search_vector_operations(table, columns):
+    vector = " || ".join("setweight(to_tsvector(coalesce(NEW.{}::text, '')), '{}')".format(column, weight)
+                         for column, weight in columns)
+    # Django writes every column on save, so the changes are compared
+    changed = " OR ".join("OLD.{0} IS DISTINCT FROM NEW.{0}".format(column) for column, weight in columns)
+
+    return [
+        # Column and index: the search document of every row
+        migrations.RunSQL(
+            """
+            ALTER TABLE "{table}" ADD COLUMN "search_vector" tsvector;
+            CREATE INDEX "{table}_search_vector_idx" ON "{table}" USING gin("search_vector");
+            """.format(table=table),
+            reverse_sql="""ALTER TABLE "{table}" DROP COLUMN IF EXISTS "search_vector";""".format(table=table)
+        ),
+
+        # Function and triggers: calculate the search document of the new rows, and
+        # update it only when the indexed columns change (or it's reset to NULL)
+        migrations.RunSQL(
+            """
+            CREATE OR REPLACE FUNCTION "{table}_search_vector"()
+                               RETURNS trigger
+                                    AS $search_vector$
+                                 BEGIN
+                                       NEW.search_vector := {vector};
+                                       RETURN NEW;
+                                   END; $search_vector$
+                              LANGUAGE plpgsql;
+
+            CREATE TRIGGER "{table}_search_vector_insert"
+                    BEFORE INSERT
+                        ON "{table}"
+                  FOR EACH ROW
+                   EXECUTE PROCEDURE "{table}_search_vector"();
+
+            CREATE TRIGGER "{table}_search_vector_update"
+                    BEFORE UPDATE
+                        ON "{table}"
+                  FOR EACH ROW
+                      WHEN ({changed} OR NEW.search_vector IS NULL)
+                   EXECUTE PROCEDURE "{table}_search_vector"();
+
+            UPDATE "{table}" SET search_vector = NULL;
+            """.format(table=table, vector=vector, changed=changed),
+            reverse_sql="""DROP FUNCTION IF EXISTS "{table}_search_vector"() CASCADE;""".format(table=table)
+        ),
+    ]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('userstories', '0009_remove_userstory_is_archived'),
+        ('tasks', '0005_auto_20150114_0954'),
+        ('issues', '0004_auto_20150114_0954'),
+        ('wiki', '0001_initial'),
+    ]
+
+    operations = [operation for table, columns in SEARCH_DOCUMENTS
+                           for operation in _search_vector_operations(table, columns)]
@@ -14,59 +14,121 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+
+import re
+from contextlib import closing
+
 from django.apps import apps
 from django.conf import settings
+from django.db import connection
 
 
 MAX_RESULTS = getattr(settings, "SEARCHES_MAX_RESULTS", 150)
 
+# Search result type -> model of the searchable objects. The objects have a
+# `search_vector` (tsvector) column, maintained by a trigger and indexed with
+# GIN, with the subject (or slug) weighted over the description (or content).
+SEARCH_MODELS = (
+    ("userstories", ("userstories", "UserStory")),
+    ("tasks", ("tasks", "Task")),
+    ("issues", ("issues", "Issue")),
+    ("wikipages", ("wiki", "WikiPage")),
+)
 
-def search_user_stories(project, text):
-    model_cls = apps.get_model("userstories", "UserStory")
-    where_clause = ("to_tsvector(coalesce(userstories_userstory.subject) || ' ' || "
-                    "coalesce(userstories_userstory.ref) || ' ' || "
-                    "coalesce(userstories_userstory.description)) @@ plainto_tsquery(%s)")
+_words_regex = re.compile(r"\w+", re.UNICODE)
 
-    if text:
-        return (model_cls.objects.extra(where=[where_clause], params=[text])
-                                 .filter(project_id=project.pk)[:MAX_RESULTS])
 
-    return model_cls.objects.filter(project_id=project.pk)[:MAX_RESULTS]
+def to_tsquery(text:str) -> str:
+    """
+    Build a prefix matching tsquery (`word:* & word:*`) for the text.
+    Only the words are kept so the query is always valid.
+    """
+    return " & ".join("{}:*".format(word) for word in _words_regex.findall(text))
 
 
-def search_tasks(project, text):
-    model_cls = apps.get_model("tasks", "Task")
-    where_clause = ("to_tsvector(coalesce(tasks_task.subject, '') || ' ' || "
-                    "coalesce(tasks_task.ref) || ' ' || "
-                    "coalesce(tasks_task.description, '')) @@ plainto_tsquery(%s)")
+def _get_search_model(type:str):
+    return apps.get_model(*dict(SEARCH_MODELS)[type])
 
-    if text:
-        return (model_cls.objects.extra(where=[where_clause], params=[text])
-                                 .filter(project_id=project.pk)[:MAX_RESULTS])
 
-    return model_cls.objects.filter(project_id=project.pk)[:MAX_RESULTS]
+def _search_sql(model_cls, query:str, limit:int) -> tuple:
+    table = model_cls._meta.db_table
+    if query:
+        sql = """(SELECT %s AS type, id, ts_rank(search_vector, to_tsquery(%s)) AS rank
+                    FROM {table}
+                   WHERE project_id = %s AND search_vector @@ to_tsquery(%s)
+                ORDER BY rank DESC, id DESC
+                   LIMIT %s)""".format(table=table)
+        return sql, [query]
 
+    sql = """(SELECT %s AS type, id, 0 AS rank
+                FROM {table}
+               WHERE project_id = %s
+            ORDER BY id DESC
+               LIMIT %s)""".format(table=table)
+    return sql, []
 
-def search_issues(project, text):
-    model_cls = apps.get_model("issues", "Issue")
-    where_clause = ("to_tsvector(coalesce(issues_issue.subject) || ' ' || "
-                    "coalesce(issues_issue.ref) || ' ' || "
-                    "coalesce(issues_issue.description)) @@ plainto_tsquery(%s)")
 
-    if text:
-        return (model_cls.objects.extra(where=[where_clause], params=[text])
-                                 .filter(project_id=project.pk)[:MAX_RESULTS])
+def search(project, text:str, types:list, limit:int=MAX_RESULTS) -> list:
+    """
+    Search the objects of the given types of a project with a single
+    query, returning a list of (type, object) ranked by relevance. At
+    most `limit` objects of every type are returned. With an empty
+    text, the last objects are returned.
+    """
+    query = to_tsquery(text)
+    if text and not query:
+        return []
 
-    return model_cls.objects.filter(project_id=project.pk)[:MAX_RESULTS]
+    sqls = []
+    params = []
+    for type in types:
+        sql, query_params = _search_sql(_get_search_model(type), query, limit)
+        sqls.append(sql)
+        params += [type] + query_params + [project.pk] + query_params + [limit]
 
+    if not sqls:
+        return []
 
-def search_wiki_pages(project, text):
-    model_cls = apps.get_model("wiki", "WikiPage")
-    where_clause = ("to_tsvector(coalesce(wiki_wikipage.slug) || ' ' || coalesce(wiki_wikipage.content)) "
-                    "@@ plainto_tsquery(%s)")
+    sql = "{} ORDER BY rank DESC".format(" UNION ALL ".join(sqls))
+    with closing(connection.cursor()) as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    objects = {}
+    for type in types:
+        ids = [id for row_type, id, rank in rows if row_type == type]
+        objects[type] = _get_search_model(type).objects.in_bulk(ids)
+
+    return [(type, objects[type][id]) for type, id, rank in rows if id in objects[type]]
+
+
+def _search_objects(type:str, project, text:str) -> list:
+    return [obj for _, obj in search(project, text, [type])]
 
-    if text:
-        return (model_cls.objects.extra(where=[where_clause], params=[text])
-                                 .filter(project_id=project.pk)[:MAX_RESULTS])
 
-    return model_cls.objects.filter(project_id=project.pk)[:MAX_RESULTS]
+def search_user_stories(project, text):
+    return _search_objects("userstories", project, text)
+
+
+def search_tasks(project, text):
+    return _search_objects("tasks", project, text)
+
+
+def search_issues(project, text):
+    return _search_objects("issues", project, text)
+
+
+def search_wiki_pages(project, text):
+    return _search_objects("wikipages", project, text)
+
+
+def rebuild_search_index(type:str) -> int:
+    """
+    Recalculate the search vectors of all the objects of a type (the
+    trigger fills them again), for example after changing the text
+    search configuration. Return the number of objects.
+    """
+    table = _get_search_model(type)._meta.db_table
+    with closing(connection.cursor()) as cursor:
+        cursor.execute("UPDATE {} SET search_vector = NULL".format(table))
+        return cursor.rowcount
@@ -15,8 +15,11 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from django.contrib.contenttypes.models import ContentType
+from django.utils.translation import ugettext as _
 
+from taiga.base import exceptions as exc
 from taiga.base import response
+from taiga.base.api.templatetags.api import replace_query_param
 from taiga.base.api.utils import get_object_or_404
 from taiga.base.api import ReadOnlyListViewSet
 
@@ -42,8 +45,38 @@ class TimelineViewSet(ReadOnlyListViewSet):
         filtered_qs = self.filter_queryset(qs)
         return filtered_qs
 
+    def paginate_timeline(self, timeline):
+        """
+        Keyset pagination using a `created,id` cursor, used only for
+        the requests with a `cursor` param (empty for the first page).
+        The rest use the page number style pagination.
+        """
+        page_size = self.get_paginate_by()
+        if not page_size or "cursor" not in self.request.QUERY_PARAMS:
+            return None
+
+        cursor = self.request.QUERY_PARAMS["cursor"] or None
+        try:
+            entries, next_cursor = service.get_timeline_page(timeline, page_size, cursor=cursor)
+        except ValueError:
+            raise exc.WrongArguments(_("Invalid cursor"))
+
+        self.headers["x-paginated"] = "true"
+        self.headers["x-paginated-by"] = page_size
+        if next_cursor is not None:
+            url = self.request.build_absolute_uri()
+            url = replace_query_param(url, "cursor", next_cursor)
+            self.headers["X-Pagination-Next"] = url
+
+        return entries
+
     def response_for_queryset(self, queryset):
-        # Switch between paginated or standard style responses
+        # Switch between keyset, paginated or standard style responses
+        entries = self.paginate_timeline(queryset)
+        if entries is not None:
+            serializer = self.get_serializer(entries, many=True)
+            return response.Ok(serializer.data)
+
         page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = self.get_pagination_serializer(page)
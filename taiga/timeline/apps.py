@@ -32,3 +32,14 @@ class TimelineAppConfig(AppConfig):
                                                  sender=apps.get_model("projects", "Membership"))
         signals.post_delete.connect(handlers.delete_membership_push_to_timeline,
                                                 sender=apps.get_model("projects", "Membership"))
+
+        # Cache of the visible projects of every user
+        signals.post_save.connect(handlers.invalidate_visible_projects_for_membership,
+                                  sender=apps.get_model("projects", "Membership"),
+                                  dispatch_uid="timeline_visible_projects_membership_save")
+        signals.post_delete.connect(handlers.invalidate_visible_projects_for_membership,
+                                    sender=apps.get_model("projects", "Membership"),
+                                    dispatch_uid="timeline_visible_projects_membership_delete")
+        signals.post_save.connect(handlers.invalidate_visible_projects_for_role,
+                                  sender=apps.get_model("users", "Role"),
+                                  dispatch_uid="timeline_visible_projects_role_save")
@@ -20,10 +20,8 @@
 # python manage.py rebuild_timeline --settings=settings.local_timeline --initial_date 2014-10-02
 
 from django.conf import settings
-from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ObjectDoesNotExist
 from django.core.management.base import BaseCommand
-from django.db.models import Model
 from django.db import reset_queries
 
 from taiga.projects.models import Project
@@ -31,8 +29,7 @@ from taiga.projects.history import services as history_services
 from taiga.projects.history.choices import HistoryType
 from taiga.projects.history.models import HistoryEntry
 from taiga.timeline.models import Timeline
-from taiga.timeline.service import (_add_to_object_timeline, _get_impl_key_from_model,
-    _timeline_impl_map, extract_user_info)
+from taiga.timeline.service import extract_user_info
 from taiga.timeline.signals import on_new_history_entry, _push_to_timelines
 from taiga.users.models import User
 
@@ -57,21 +54,10 @@ class BulkCreator(object):
 bulk_creator = BulkCreator()
 
 
-def custom_add_to_object_timeline(obj:object, instance:object, event_type:str, namespace:str="default", extra_data:dict={}):
-    assert isinstance(obj, Model), "obj must be a instance of Model"
-    assert isinstance(instance, Model), "instance must be a instance of Model"
-    event_type_key = _get_impl_key_from_model(instance.__class__, event_type)
-    impl = _timeline_impl_map.get(event_type_key, None)
-
-    bulk_creator.createElement(Timeline(
-        content_object=obj,
-        namespace=namespace,
-        event_type=event_type_key,
-        project=instance.project,
-        data=impl(instance, extra_data=extra_data),
-        data_content_type = ContentType.objects.get_for_model(instance.__class__),
-        created = bulk_creator.created,
-    ))
+def custom_save_timeline_entries(entries:list):
+    for entry in entries:
+        entry.created = bulk_creator.created
+        bulk_creator.createElement(entry)
 
 
 def generate_timeline(initial_date, final_date):
@@ -84,7 +70,7 @@ def generate_timeline(initial_date, final_date):
 
         timelines.delete()
 
-    with patch('taiga.timeline.service._add_to_object_timeline', new=custom_add_to_object_timeline):
+    with patch('taiga.timeline.service._save_timeline_entries', new=custom_save_timeline_entries):
         # Projects api wasn't a HistoryResourceMixin so we can't interate on the HistoryEntries in this case
         projects = Project.objects.order_by("created_date")
         history_entries = HistoryEntry.objects.order_by("created_at")
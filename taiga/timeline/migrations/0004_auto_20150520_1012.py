@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timeline', '0003_auto_20150410_0829'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='timeline',
+            index_together=set([('content_type', 'object_id', 'namespace'), ('content_type', 'object_id', 'namespace', 'created', 'id')]),
+        ),
+    ]
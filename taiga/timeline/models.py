@@ -37,7 +37,8 @@ class Timeline(models.Model):
     created = models.DateTimeField(default=timezone.now)
 
     class Meta:
-        index_together = [('content_type', 'object_id', 'namespace'), ]
+        index_together = [('content_type', 'object_id', 'namespace'),
+                          ('content_type', 'object_id', 'namespace', 'created', 'id'), ]
 
 
 # Register all implementations
@@ -15,10 +15,13 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from django.apps import apps
+from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
 from django.db.models import Model
 from django.db.models import Q
 from django.db.models.query import QuerySet
+from django.utils.dateparse import parse_datetime
 
 from functools import partial, wraps
 
@@ -50,26 +53,45 @@ def build_project_namespace(project:object):
     return "{0}:{1}".format("project", project.id)
 
 
-def _add_to_object_timeline(obj:object, instance:object, event_type:str, namespace:str="default", extra_data:dict={}):
-    assert isinstance(obj, Model), "obj must be a instance of Model"
+def _build_timeline_entries(targets, instance:object, event_type:str, extra_data:dict={}):
+    """
+    Render the timeline data of `instance` only once and build (without saving)
+    one Timeline entry for every `(content_type, object_id, namespace)` in targets.
+    """
     assert isinstance(instance, Model), "instance must be a instance of Model"
     from .models import Timeline
     event_type_key = _get_impl_key_from_model(instance.__class__, event_type)
     impl = _timeline_impl_map.get(event_type_key, None)
 
-    Timeline.objects.create(
-        content_object=obj,
-        namespace=namespace,
-        event_type=event_type_key,
-        project=instance.project,
-        data=impl(instance, extra_data=extra_data),
-        data_content_type = ContentType.objects.get_for_model(instance.__class__),
-    )
+    data = impl(instance, extra_data=extra_data)
+    data_content_type = ContentType.objects.get_for_model(instance.__class__)
+    project = instance.project
+
+    return [Timeline(content_type=content_type,
+                     object_id=object_id,
+                     namespace=namespace,
+                     event_type=event_type_key,
+                     project=project,
+                     data=data,
+                     data_content_type=data_content_type)
+            for content_type, object_id, namespace in targets]
+
+
+def _save_timeline_entries(entries:list):
+    from .models import Timeline
+    if entries:
+        Timeline.objects.bulk_create(entries)
+
+
+def _add_to_object_timeline(obj:object, instance:object, event_type:str, namespace:str="default", extra_data:dict={}):
+    assert isinstance(obj, Model), "obj must be a instance of Model"
+    _add_to_objects_timeline([obj], instance, event_type, namespace, extra_data)
 
 
 def _add_to_objects_timeline(objects, instance:object, event_type:str, namespace:str="default", extra_data:dict={}):
-    for obj in objects:
-        _add_to_object_timeline(obj, instance, event_type, namespace, extra_data)
+    targets = [(ContentType.objects.get_for_model(obj.__class__), obj.pk, namespace) for obj in objects]
+    entries = _build_timeline_entries(targets, instance, event_type, extra_data)
+    _save_timeline_entries(entries)
 
 
 @app.task
@@ -82,6 +104,48 @@ def push_to_timeline(objects, instance:object, event_type:str, namespace:str="de
         raise Exception("Invalid objects parameter")
 
 
+def get_related_people_ids(project:object, user:object, obj:object):
+    """
+    Get, in only one query, the ids of the people related with an
+    event over `obj`: the assigned user, the watchers and the project
+    team. The user who has done the action is always excluded.
+    """
+    user_model = apps.get_model("users", "User")
+    membership_model = apps.get_model("projects", "Membership")
+
+    team_ids = membership_model.objects.filter(project=project, user__isnull=False).values("user_id")
+    related_filter = Q(id__in=team_ids)
+
+    assigned_to_id = getattr(obj, "assigned_to_id", None)
+    if assigned_to_id:
+        related_filter |= Q(id=assigned_to_id)
+
+    if hasattr(obj, "watchers"):
+        related_filter |= Q(id__in=obj.watchers.values("id"))
+
+    related_people = user_model.objects.filter(related_filter).exclude(id=user.id)
+    return list(related_people.values_list("id", flat=True).distinct())
+
+
+@app.task
+def push_to_timelines(project:object, user:object, obj:object, event_type:str, extra_data:dict={}):
+    """
+    Fan out an event to the project timeline, the user timeline and the
+    timelines of the related people with a single bulk insert.
+    """
+    project_content_type = ContentType.objects.get_for_model(project.__class__)
+    user_content_type = ContentType.objects.get_for_model(user.__class__)
+    user_namespace = build_user_namespace(user)
+
+    targets = [(project_content_type, project.id, build_project_namespace(project)),
+               (user_content_type, user.id, user_namespace)]
+    targets += [(user_content_type, user_id, user_namespace)
+                for user_id in get_related_people_ids(project, user, obj)]
+
+    entries = _build_timeline_entries(targets, obj, event_type, extra_data)
+    _save_timeline_entries(entries)
+
+
 def get_timeline(obj, namespace=None):
     assert isinstance(obj, Model), "obj must be a instance of Model"
     from .models import Timeline
@@ -91,43 +155,121 @@ def get_timeline(obj, namespace=None):
     if namespace is not None:
         timeline = timeline.filter(namespace=namespace)
 
-    timeline = timeline.order_by("-created")
+    timeline = timeline.order_by("-created", "-id")
     return timeline
 
 
+_timeline_content_types = {
+    "view_project": ("projects", "project"),
+    "view_milestones": ("milestones", "milestone"),
+    "view_us": ("userstories", "userstory"),
+    "view_tasks": ("tasks", "task"),
+    "view_issues": ("issues", "issue"),
+    "view_wiki_pages": ("wiki", "wikipage"),
+    "view_wiki_links": ("wiki", "wikilink"),
+}
+
+
+def _get_timeline_content_types():
+    # get_by_natural_key uses the ContentType cache so this only hits
+    # the database the first time.
+    return {permission: ContentType.objects.get_by_natural_key(app_label, model)
+            for permission, (app_label, model) in _timeline_content_types.items()}
+
+
+def _build_visible_projects_cache_key(user_id:int):
+    return "timeline-visible-projects:{0}".format(user_id)
+
+
+def get_visible_projects_by_content_type(user):
+    """
+    Get a dict `{content_type_id: [project_id, ...]}` with the private
+    projects where `user` is member and can see that content type.
+
+    It's calculated with only one query and cached until some membership
+    or role of the user changes.
+    """
+    key = _build_visible_projects_cache_key(user.id)
+    visible = cache.get(key)
+    if visible is not None:
+        return visible
+
+    content_types = _get_timeline_content_types()
+    membership_model = apps.get_model("projects", "Membership")
+    memberships = (membership_model.objects.filter(user=user)
+                                           .values_list("project_id", "is_owner", "role__permissions"))
+
+    visible = {}
+    for project_id, is_owner, permissions in memberships:
+        for permission, content_type in content_types.items():
+            if is_owner or permission in (permissions or []):
+                visible.setdefault(content_type.id, []).append(project_id)
+
+    cache.set(key, visible, timeout=settings.TIMELINE_VISIBLE_PROJECTS_CACHE_TIMEOUT)
+    return visible
+
+
+def invalidate_visible_projects_by_content_type(user_ids):
+    cache.delete_many([_build_visible_projects_cache_key(user_id) for user_id in user_ids])
+
+
 def filter_timeline_for_user(timeline, user):
     # Filtering public projects
     tl_filter = Q(project__is_private=False)
 
     # Filtering private project with some public parts
-    content_types = {
-        "view_project": ContentType.objects.get(app_label="projects", model="project"),
-        "view_milestones": ContentType.objects.get(app_label="milestones", model="milestone"),
-        "view_us": ContentType.objects.get(app_label="userstories", model="userstory"),
-        "view_tasks": ContentType.objects.get(app_label="tasks", model="task"),
-        "view_issues": ContentType.objects.get(app_label="issues", model="issue"),
-        "view_wiki_pages": ContentType.objects.get(app_label="wiki", model="wikipage"),
-        "view_wiki_links": ContentType.objects.get(app_label="wiki", model="wikilink"),
-    }
-
-    for content_type_key, content_type in content_types.items():
+    for content_type_key, content_type in _get_timeline_content_types().items():
         tl_filter |= Q(project__is_private=True,
-                                            project__anon_permissions__contains=[content_type_key],
-                                            data_content_type=content_type)
+                       project__anon_permissions__contains=[content_type_key],
+                       data_content_type=content_type)
 
-    # Filtering private projects where user is member
+    # Filtering private projects where user is member, with only one
+    # clause for content type instead of one for membership and content type.
     if not user.is_anonymous():
-        membership_model = apps.get_model('projects', 'Membership')
-        memberships_qs = membership_model.objects.filter(user=user)
-        for membership in memberships_qs:
-            for content_type_key, content_type in content_types.items():
-                if content_type_key in membership.role.permissions or membership.is_owner:
-                    tl_filter |= Q(project=membership.project, data_content_type=content_type)
+        visible = get_visible_projects_by_content_type(user)
+        for content_type_id, project_ids in visible.items():
+            tl_filter |= Q(data_content_type_id=content_type_id, project_id__in=project_ids)
 
     timeline = timeline.filter(tl_filter)
     return timeline
 
 
+def encode_timeline_cursor(entry):
+    return "{0},{1}".format(entry.created.isoformat(), entry.id)
+
+
+def decode_timeline_cursor(cursor:str):
+    """
+    Get the `(created, id)` pair from a cursor generated by
+    `encode_timeline_cursor`. Raise `ValueError` if it isn't valid.
+    """
+    created, sep, id = cursor.rpartition(",")
+    created = parse_datetime(created)
+    if not sep or created is None:
+        raise ValueError("Invalid timeline cursor")
+    return created, int(id)
+
+
+def get_timeline_page(timeline, page_size:int, cursor:str=None):
+    """
+    Keyset pagination over a timeline: return the `page_size` entries
+    that come after `cursor` and the cursor of the next page (or None
+    if it's the last one). The cost does not depend on the depth.
+    """
+    timeline = timeline.order_by("-created", "-id")
+    if cursor is not None:
+        created, id = decode_timeline_cursor(cursor)
+        timeline = timeline.filter(Q(created__lt=created) | Q(created=created, id__lt=id))
+
+    entries = list(timeline[:page_size + 1])
+    next_cursor = None
+    if len(entries) > page_size:
+        entries = entries[:page_size]
+        next_cursor = encode_timeline_cursor(entries[-1])
+
+    return entries, next_cursor
+
+
 def get_profile_timeline(user, accessing_user=None):
     timeline = get_timeline(user)
     if accessing_user is not None:
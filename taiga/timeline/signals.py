@@ -20,54 +20,19 @@ from taiga.projects.history import services as history_services
 from taiga.projects.models import Project
 from taiga.users.models import User
 from taiga.projects.history.choices import HistoryType
-from taiga.timeline.service import (push_to_timeline, build_user_namespace,
-    build_project_namespace, extract_user_info)
+from taiga.timeline.service import (push_to_timelines, extract_user_info,
+    invalidate_visible_projects_by_content_type)
 
 # TODO: Add events to followers timeline when followers are implemented.
 # TODO: Add events to project watchers timeline when project watchers are implemented.
 
-def _push_to_timeline(*args, **kwargs):
+def _push_to_timelines(project, user, obj, event_type, extra_data={}):
+    # Only one task per event, the fan out to the project timeline, the user
+    # timeline and the related people timelines is done inside of it.
     if settings.CELERY_ENABLED:
-        push_to_timeline.delay(*args, **kwargs)
+        push_to_timelines.delay(project, user, obj, event_type, extra_data=extra_data)
     else:
-        push_to_timeline(*args, **kwargs)
-
-
-def _push_to_timelines(project, user, obj, event_type, extra_data={}):
-    # Project timeline
-    _push_to_timeline(project, obj, event_type,
-        namespace=build_project_namespace(project),
-        extra_data=extra_data)
-
-    # User timeline
-    _push_to_timeline(user, obj, event_type,
-        namespace=build_user_namespace(user),
-        extra_data=extra_data)
-
-    # Calculating related people
-    related_people = User.objects.none()
-
-    # Assigned to
-    if hasattr(obj, "assigned_to") and obj.assigned_to and user != obj.assigned_to:
-        related_people |= User.objects.filter(id=obj.assigned_to.id)
-
-    # Watchers
-    watchers = hasattr(obj, "watchers") and obj.watchers.exclude(id=user.id) or User.objects.none()
-    if watchers:
-        related_people |= watchers
-
-    # Team
-    team_members_ids = project.memberships.filter(user__isnull=False).values_list("id", flat=True)
-    team = User.objects.filter(id__in=team_members_ids)
-    related_people |= team
-
-    related_people = related_people.distinct()
-
-    _push_to_timeline(related_people, obj, event_type,
-        namespace=build_user_namespace(user),
-        extra_data=extra_data)
-
-    #Related people: team members
+        push_to_timelines(project, user, obj, event_type, extra_data=extra_data)
 
 
 def on_new_history_entry(sender, instance, created, **kwargs):
@@ -120,3 +85,13 @@ def create_membership_push_to_timeline(sender, instance, **kwargs):
 def delete_membership_push_to_timeline(sender, instance, **kwargs):
     if instance.user:
         _push_to_timelines(instance.project, instance.user, instance, "delete")
+
+
+def invalidate_visible_projects_for_membership(sender, instance, **kwargs):
+    if instance.user_id:
+        invalidate_visible_projects_by_content_type([instance.user_id])
+
+
+def invalidate_visible_projects_for_role(sender, instance, **kwargs):
+    user_ids = instance.memberships.filter(user__isnull=False).values_list("user_id", flat=True)
+    invalidate_visible_projects_by_content_type(list(user_ids))
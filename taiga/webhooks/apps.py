@@ -15,6 +15,7 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from django.apps import AppConfig
+from django.apps import apps
 from django.db.models import signals
 
 from . import signal_handlers as handlers
@@ -35,3 +36,10 @@ class WebhooksAppConfig(AppConfig):
 
     def ready(self):
         connect_webhooks_signals()
+
+        # Cached webhooks of the projects
+        Webhook = apps.get_model("webhooks", "Webhook")
+        signals.post_save.connect(handlers.invalidate_project_webhooks, sender=Webhook,
+                                  dispatch_uid="invalidate_project_webhooks_on_save")
+        signals.post_delete.connect(handlers.invalidate_project_webhooks, sender=Webhook,
+                                    dispatch_uid="invalidate_project_webhooks_on_delete")
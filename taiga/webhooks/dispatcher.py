@@ -0,0 +1,128 @@
+# Copyright (C) 2014 Andrey Antukh <niwi@niwi.be>
+# Copyright (C) 2014 Jesús Espino <jespinog@gmail.com>
+# Copyright (C) 2014 David Barragán <bameda@dbarragan.com>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import logging
+import os
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.exceptions import RequestException
+
+from django.conf import settings
+from django.db import connection
+
+log = logging.getLogger("taiga.webhooks")
+
+_lock = threading.Lock()
+_pid = None
+_sessions = {}
+_executor = None
+
+
+def _check_process():
+    """
+    The sessions and the thread pool of the parent process can't be
+    shared after a fork, so they are created again in the child.
+    """
+    global _pid, _sessions, _executor
+
+    if _pid != os.getpid():
+        _pid = os.getpid()
+        _sessions = {}
+        _executor = None
+
+
+def get_session(url:str) -> requests.Session:
+    """
+    Get the session (with its pool of connections) of the host of `url`.
+    """
+    parse_result = urlparse(url)
+    host = (parse_result.scheme, parse_result.netloc)
+
+    with _lock:
+        _check_process()
+
+        session = _sessions.get(host, None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.WEBHOOKS_DISPATCHER_THREADS or 1)
+            session.mount("{}://".format(parse_result.scheme), adapter)
+            _sessions[host] = session
+
+    return session
+
+
+def send(prepared_request:requests.PreparedRequest) -> requests.Response:
+    """
+    Send a request with the configured timeout, retrying the connection
+    errors and the server errors (5XX) with an exponential backoff.
+    The last response is returned (or the last exception is raised).
+    """
+    session = get_session(prepared_request.url)
+    retries = settings.WEBHOOKS_MAX_RETRIES
+
+    for retry in range(retries + 1):
+        if retry:
+            time.sleep(settings.WEBHOOKS_RETRY_BACKOFF * (2 ** (retry - 1)))
+
+        try:
+            response = session.send(prepared_request, timeout=settings.WEBHOOKS_TIMEOUT)
+        except RequestException:
+            if retry == retries:
+                raise
+            continue
+
+        if response.status_code < 500 or retry == retries:
+            return response
+
+
+def _run(func, args):
+    try:
+        func(*args)
+    except Exception:
+        log.error("Unhandled exception sending a webhook", exc_info=True)
+    finally:
+        # Every thread of the pool uses its own database connection
+        connection.close()
+
+
+def dispatch(func, *args):
+    """
+    Run `func(*args)` in the thread pool of the webhooks once the current
+    transaction (if any) is committed. If WEBHOOKS_DISPATCHER_THREADS is
+    0 it is run right now.
+    """
+    if not settings.WEBHOOKS_DISPATCHER_THREADS:
+        return func(*args)
+
+    def submit():
+        global _executor
+
+        with _lock:
+            _check_process()
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=settings.WEBHOOKS_DISPATCHER_THREADS)
+            executor = _executor
+
+        executor.submit(_run, func, args)
+
+    connection.on_commit(submit)
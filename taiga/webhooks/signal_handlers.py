@@ -15,24 +15,34 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from django.conf import settings
+from django.core.cache import cache
 
 from taiga.projects.history import services as history_service
 from taiga.projects.history.choices import HistoryType
+from taiga.projects.models import Project
 
 from . import tasks
+from . import dispatcher
+from .models import Webhook
 
 
-def _get_project_webhooks(project):
-    webhooks = []
-    for webhook in project.webhooks.all():
-        webhooks.append({
-            "id": webhook.pk,
-            "url": webhook.url,
-            "key": webhook.key,
-        })
+def _get_project_webhooks_cache_key(project_id):
+    return "project-webhooks:{}".format(project_id)
+
+
+def _get_project_webhooks(project_id):
+    key = _get_project_webhooks_cache_key(project_id)
+    webhooks = cache.get(key)
+    if webhooks is None:
+        webhooks = list(Webhook.objects.filter(project_id=project_id).values("id", "url", "key"))
+        cache.set(key, webhooks, settings.PROJECT_WEBHOOKS_CACHE_TIMEOUT)
     return webhooks
 
 
+def invalidate_project_webhooks(sender, instance, **kwargs):
+    cache.delete(_get_project_webhooks_cache_key(instance.project_id))
+
+
 def on_new_history_entry(sender, instance, created, **kwargs):
     if not settings.WEBHOOKS_ENABLED:
         return None
@@ -42,24 +52,37 @@ def on_new_history_entry(sender, instance, created, **kwargs):
 
     model = history_service.get_model_from_key(instance.key)
     pk = history_service.get_pk_from_key(instance.key)
+
     obj = model.objects.get(pk=pk)
 
-    webhooks = _get_project_webhooks(obj.project)
+    # The history of a project is about the project itself
+    project_id = obj.id if isinstance(obj, Project) else obj.project_id
+    webhooks = _get_project_webhooks(project_id)
+    if not webhooks:
+        return None
 
     if instance.type == HistoryType.create:
         task = tasks.create_webhook
-        extra_args = []
+        payload = tasks.render_payload("create", obj)
     elif instance.type == HistoryType.change:
         task = tasks.change_webhook
-        extra_args = [instance]
+        payload = tasks.render_payload("change", obj, instance)
     elif instance.type == HistoryType.delete:
         task = tasks.delete_webhook
-        extra_args = []
+        payload = tasks.render_payload("delete", obj)
 
+    # The payload is rendered once and only signed for every webhook
     for webhook in webhooks:
-        args = [webhook["id"], webhook["url"], webhook["key"], obj] + extra_args
+        args = [webhook["id"], webhook["url"], tasks.sign_payload(payload, webhook["key"]), payload]
 
         if settings.CELERY_ENABLED:
             task.delay(*args)
         else:
-            task(*args)
+            dispatcher.dispatch(task, *args)
+
+    # The old logs of all the webhooks are pruned once per event
+    webhook_ids = [webhook["id"] for webhook in webhooks]
+    if settings.CELERY_ENABLED:
+        tasks.prune_webhook_logs.delay(webhook_ids)
+    else:
+        dispatcher.dispatch(tasks.prune_webhook_logs, webhook_ids)
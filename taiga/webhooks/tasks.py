@@ -18,8 +18,12 @@ import hmac
 import hashlib
 import requests
 from requests.exceptions import RequestException
+from contextlib import closing
+
+from django.db import connection
 
 from taiga.base.api.renderers import UnicodeJSONRenderer
+from taiga.base.utils import json
 from taiga.base.utils.db import get_typename_for_model_instance
 from taiga.celery import app
 
@@ -27,6 +31,19 @@ from .serializers import (UserStorySerializer, IssueSerializer, TaskSerializer,
                           WikiPageSerializer, MilestoneSerializer,
                           HistoryEntrySerializer)
 from .models import WebhookLog
+from . import dispatcher
+
+# Number of logs kept for every webhook
+WEBHOOK_LOGS_LIMIT = 10
+
+_PRUNE_WEBHOOK_LOGS_SQL = """
+    DELETE FROM {table}
+     WHERE id IN (SELECT id
+                    FROM (SELECT id, ROW_NUMBER() OVER (PARTITION BY webhook_id ORDER BY id DESC) AS position
+                            FROM {table}
+                           WHERE webhook_id = ANY(%s)) AS logs
+                   WHERE position > %s)
+"""
 
 
 def _serialize(obj):
@@ -56,9 +73,37 @@ def _generate_signature(data, key):
     return mac.hexdigest()
 
 
+def render_payload(action:str, obj, change=None) -> bytes:
+    """
+    Render the payload of a webhook event (once for all the webhooks
+    of the project).
+    """
+    data = {}
+    data['data'] = _serialize(obj)
+    data['action'] = action
+    data['type'] = _get_type(obj)
+    if change is not None:
+        data['change'] = _serialize(change)
+
+    return UnicodeJSONRenderer().render(data)
+
+
+def sign_payload(payload:bytes, key:str) -> str:
+    return _generate_signature(payload, key)
+
+
 def _send_request(webhook_id, url, key, data):
     serialized_data = UnicodeJSONRenderer().render(data)
     signature = _generate_signature(serialized_data, key)
+    webhook_log = _send_payload(webhook_id, url, serialized_data, signature, data=data)
+    prune_webhook_logs([webhook_id])
+    return webhook_log
+
+
+def _send_payload(webhook_id, url, serialized_data, signature, data=None):
+    if data is None:
+        data = json.loads(serialized_data)
+
     headers = {
         "X-TAIGA-WEBHOOK-SIGNATURE": signature,
         "Content-Type": "application/json"
@@ -66,9 +111,8 @@ def _send_request(webhook_id, url, key, data):
     request = requests.Request('POST', url, data=serialized_data, headers=headers)
     prepared_request = request.prepare()
 
-    session = requests.Session()
     try:
-        response = session.send(prepared_request)
+        response = dispatcher.send(prepared_request)
         webhook_log = WebhookLog.objects.create(webhook_id=webhook_id, url=url,
                                                 status=response.status_code,
                                                 request_data=data,
@@ -83,42 +127,34 @@ def _send_request(webhook_id, url, key, data):
                                                 response_data="error-in-request: {}".format(str(e)),
                                                 response_headers={},
                                                 duration=0)
-    session.close()
 
-    ids = [log.id for log in WebhookLog.objects.filter(webhook_id=webhook_id).order_by("-id")[10:]]
-    WebhookLog.objects.filter(id__in=ids).delete()
     return webhook_log
 
 
 @app.task
-def change_webhook(webhook_id, url, key, obj, change):
-    data = {}
-    data['data'] = _serialize(obj)
-    data['action'] = "change"
-    data['type'] = _get_type(obj)
-    data['change'] = _serialize(change)
-
-    return _send_request(webhook_id, url, key, data)
+def prune_webhook_logs(webhook_ids:list):
+    """
+    Remove (with one statement) the old logs of some webhooks. It's run
+    once for all the webhooks of an event, not after every delivery.
+    """
+    sql = _PRUNE_WEBHOOK_LOGS_SQL.format(table=WebhookLog._meta.db_table)
+    with closing(connection.cursor()) as cursor:
+        cursor.execute(sql, [list(webhook_ids), WEBHOOK_LOGS_LIMIT])
 
 
 @app.task
-def create_webhook(webhook_id, url, key, obj):
-    data = {}
-    data['data'] = _serialize(obj)
-    data['action'] = "create"
-    data['type'] = _get_type(obj)
-
-    return _send_request(webhook_id, url, key, data)
+def change_webhook(webhook_id, url, signature, payload):
+    return _send_payload(webhook_id, url, payload, signature)
 
 
 @app.task
-def delete_webhook(webhook_id, url, key, obj):
-    data = {}
-    data['data'] = _serialize(obj)
-    data['action'] = "delete"
-    data['type'] = _get_type(obj)
+def create_webhook(webhook_id, url, signature, payload):
+    return _send_payload(webhook_id, url, payload, signature)
 
-    return _send_request(webhook_id, url, key, data)
+
+@app.task
+def delete_webhook(webhook_id, url, signature, payload):
+    return _send_payload(webhook_id, url, payload, signature)
 
 
 @app.task
@@ -23,7 +23,7 @@ from .. import factories as f
 
 from taiga.base.utils import json
 from taiga.projects.history import services
-from taiga.projects.history.models import HistoryEntry
+from taiga.projects.history.models import HistoryEntry, HistorySnapshot
 from taiga.projects.history.choices import HistoryType
 from taiga.projects.history.services import make_key_from_model_object
 
@@ -139,6 +139,44 @@ def test_real_snapshot_frequency(settings):
     assert qs_partials.count() == 2
 
 
+def test_current_snapshot_matches_diffs_replay(settings):
+    settings.MAX_PARTIAL_DIFFS = 2
+
+    issue = f.IssueFactory.create()
+    key = make_key_from_model_object(issue)
+
+    for i in range(5):
+        issue.subject = "subject{}".format(i)
+        issue.save()
+        services.take_snapshot(issue, user=issue.owner)
+
+    stored = services.get_last_snapshot_for_key(key)
+    replayed = services.get_last_snapshot_for_key_from_diffs(key)
+
+    assert HistorySnapshot.objects.filter(key=key).count() == 1
+    assert stored == replayed
+    assert stored[0].snapshot["subject"] == "subject4"
+
+
+def test_freeze_model_instances_in_bulk():
+    project = f.ProjectFactory.create()
+    user_stories = [f.UserStoryFactory.create(project=project) for i in range(3)]
+    user_stories[0].watchers.add(project.owner)
+
+    frozen = services.freeze_model_instances(user_stories)
+    assert frozen == [services.freeze_model_instance(us) for us in user_stories]
+
+
+def test_take_snapshots_in_bulk():
+    project = f.ProjectFactory.create()
+    user_stories = [f.UserStoryFactory.create(project=project) for i in range(3)]
+
+    entries = services.take_snapshots_in_bulk(user_stories, user=project.owner)
+
+    assert len(entries) == 3
+    assert HistoryEntry.objects.filter(type=HistoryType.create).count() == 3
+
+
 def test_issue_resource_history_test(client):
     user = f.UserFactory.create()
     project = f.ProjectFactory.create(owner=user)
@@ -178,6 +216,28 @@ def test_issue_resource_history_test(client):
     assert qs_deleted.count() == 1
 
 
+def test_userstory_points_change_history(client):
+    user = f.UserFactory.create()
+    project = f.ProjectFactory.create(owner=user)
+    role = f.RoleFactory.create(project=project)
+    f.MembershipFactory.create(project=project, user=user, role=role, is_owner=True)
+    f.PointsFactory.create(project=project, value=None)
+    points = f.PointsFactory.create(project=project, value=2)
+    us = f.UserStoryFactory.create(project=project, owner=user)
+    services.take_snapshot(us, user=user)
+
+    url = reverse("userstories-detail", args=[us.pk])
+    client.login(user)
+
+    data = {"version": us.version, "points": {str(role.pk): points.pk}}
+    response = client.json.patch(url, json.dumps(data))
+    assert response.status_code == 200
+
+    entry = HistoryEntry.objects.filter(key=make_key_from_model_object(us),
+                                        type=HistoryType.change).get()
+    assert entry.diff["points"][1] == {str(role.pk): points.pk}
+
+
 def test_take_hidden_snapshot():
     task = f.TaskFactory.create()
 
@@ -25,6 +25,8 @@ from .. import factories as f
 from django.apps import apps
 
 from taiga.base.utils import json
+from taiga.export_import import service
+from taiga.projects.history.choices import HistoryType
 from taiga.projects.models import Project, Membership
 from taiga.projects.issues.models import Issue
 from taiga.projects.userstories.models import UserStory
@@ -972,6 +974,23 @@ def test_valid_dump_import_with_celery_enabled(client, settings):
     assert "import_id" in response_data
 
 
+def test_invalid_dump_import_with_celery_enabled(client, settings):
+    settings.CELERY_ENABLED = True
+
+    user = f.UserFactory.create()
+    client.login(user)
+
+    url = reverse("importer-load-dump")
+
+    data = ContentFile(b"test")
+    data.name = "test"
+
+    response = client.post(url, {'dump': data})
+    assert response.status_code == 400
+    response_data = json.loads(response.content.decode("utf-8"))
+    assert response_data["_error_message"] == "Invalid dump format"
+
+
 def test_dump_import_duplicated_project(client):
     user = f.UserFactory.create()
     project = f.ProjectFactory.create(owner=user)
@@ -1013,3 +1032,33 @@ def test_dump_import_throttling(client, settings):
     assert response.status_code == 201
     response = client.post(url, {'dump': data})
     assert response.status_code == 429
+
+
+def test_bulk_import_scope():
+    user = f.UserFactory.create()
+    project = f.ProjectFactory.create(owner=user)
+    project.default_issue_type = f.IssueTypeFactory.create(project=project)
+    project.default_issue_status = f.IssueStatusFactory.create(project=project)
+    project.default_severity = f.SeverityFactory.create(project=project)
+    project.default_priority = f.PriorityFactory.create(project=project)
+    project.save()
+
+    history_model = apps.get_model("history", "HistoryEntry")
+    history = [{"user": [user.email, user.get_full_name()], "type": HistoryType.change,
+                "comment": "Imported comment"}]
+
+    with service.bulk_import_scope(batch_size=2):
+        issues = [service.store_issue(project, {"subject": "Imported issue", "ref": 10 + i,
+                                                "history": history}).object
+                  for i in range(3)]
+        keys = ["issues.issue:{}".format(issue.id) for issue in issues]
+
+        # The last history entry is waiting for the next batch
+        assert history_model.objects.filter(key__in=keys).count() == 2
+
+    assert not service.get_errors()
+    assert history_model.objects.filter(key__in=keys).count() == 3
+    assert history_model.objects.get(key=keys[0]).user["pk"] == user.pk
+
+    issue = service.store_issue(project, {"subject": "New issue"}).object
+    assert issue.ref > 12
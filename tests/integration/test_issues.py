@@ -43,7 +43,7 @@ def test_update_issues_order_in_bulk():
     with mock.patch("taiga.projects.issues.services.db") as db:
         services.update_issues_order_in_bulk(data)
         db.update_in_bulk_with_ids.assert_called_once_with([1, 2], [{"order": 1}, {"order": 2}],
-                                                           model=models.Issue)
+                                                           model=models.Issue, only_changed=True)
 
 
 def test_api_create_issues_in_bulk(client):
@@ -198,3 +198,41 @@ def test_custom_fields_csv_generation():
     assert row[16] == attr.name
     row = next(reader)
     assert row[16] == "val1"
+
+
+def test_api_issues_filters_data(client):
+    project = f.ProjectFactory.create()
+    user = project.owner
+    f.MembershipFactory.create(project=project, user=user, is_owner=True)
+    status1 = f.IssueStatusFactory.create(project=project)
+    status2 = f.IssueStatusFactory.create(project=project)
+    f.create_issue(project=project, owner=user, status=status1, tags=["a", "b"])
+    f.create_issue(project=project, owner=user, status=status1, tags=["a"])
+    f.create_issue(project=project, owner=user, status=status2, tags=["b"])
+
+    url = reverse("projects-issue-filters-data", kwargs={"pk": project.pk})
+    client.login(user)
+
+    response = client.get(url + "?tags=a")
+    assert response.status_code == 200
+    statuses = dict(response.data["statuses"])
+    assert statuses[status1.id] == 2
+    assert statuses[status2.id] == 0
+    # The tags are counted without their own filter
+    assert dict(response.data["tags"]) == {"a": 2, "b": 2}
+    assert dict(response.data["owners"])[user.id] == 2
+
+    response = client.get(url + "?status={}".format(status2.id))
+    statuses = dict(response.data["statuses"])
+    assert statuses[status1.id] == 2
+    assert statuses[status2.id] == 1
+    # Like the other facets, the tags that no issue matches are listed too
+    assert dict(response.data["tags"]) == {"a": 0, "b": 1}
+
+    # The cached data is invalidated when an issue changes
+    f.create_issue(project=project, owner=user, status=status2, tags=["c"])
+    response = client.get(url + "?status={}".format(status2.id))
+    assert dict(response.data["tags"]) == {"a": 0, "b": 1, "c": 1}
+    assigned_to = dict(response.data["assigned_to"])
+    assert assigned_to[None] == 2
+    assert assigned_to[user.id] == 0
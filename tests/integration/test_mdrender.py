@@ -17,9 +17,13 @@
 
 import pytest
 
+from django.core.cache import cache
+
+from taiga.mdrender import service
 from taiga.mdrender.service import render, render_and_extract
+from taiga.projects.references.services import get_references_data
 
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 from .. import factories
 
@@ -30,6 +34,13 @@ dummy_project.id = 1
 dummy_project.slug = "test"
 
 
+@pytest.fixture(autouse=True)
+def clear_render_cache():
+    # The renders are cached by text and project
+    cache.clear()
+    service._local_cache.clear()
+
+
 def test_proccessor_valid_user_mention():
     factories.UserFactory(username="user1", full_name="test name")
     result = render(dummy_project, "**@user1**")
@@ -47,7 +58,55 @@ def test_render_and_extract_mentions():
     (_, extracted) = render_and_extract(dummy_project, "**@user1**")
     assert extracted['mentions'] == [user]
 
+
+def test_render_and_extract_mentions_of_new_users():
+    (_, extracted) = render_and_extract(dummy_project, "**@user2**")
+    assert extracted['mentions'] == []
+
+    user = factories.UserFactory(username="user2")
+    (_, extracted) = render_and_extract(dummy_project, "**@user2**")
+    assert extracted['mentions'] == [user]
+
 def test_proccessor_valid_email():
     result = render(dummy_project, "**beta.tester@taiga.io**")
     expected_result = "<p><strong><a href=\"mailto:beta.tester@taiga.io\" target=\"_blank\">beta.tester@taiga.io</a></strong></p>"
     assert result == expected_result
+
+
+def test_references_data_is_invalidated_when_the_object_changes():
+    us = factories.UserStoryFactory.create(subject="First subject")
+    assert get_references_data(us.project_id, [us.ref]) == {us.ref: ("userstory", "First subject")}
+
+    us.subject = "Second subject"
+    us.save()
+    assert get_references_data(us.project_id, [us.ref]) == {us.ref: ("userstory", "Second subject")}
+
+    assert get_references_data(us.project_id, [us.ref + 1]) == {us.ref + 1: ()}
+
+
+def test_render_is_invalidated_when_the_referenced_object_changes():
+    us = factories.UserStoryFactory.create(subject="First subject")
+    text = "**#{}**".format(us.ref)
+    assert "First subject" in render(us.project, text)
+
+    us.subject = "Second subject"
+    us.save()
+    result = render(us.project, text)
+    assert "Second subject" in result
+    assert "First subject" not in result
+
+
+def test_render_is_kept_when_other_objects_of_the_project_change():
+    us1 = factories.UserStoryFactory.create(subject="First subject")
+    us2 = factories.UserStoryFactory.create(project=us1.project, subject="Other subject")
+    text = "**#{}**".format(us1.ref)
+    render(us1.project, text)
+    render(us1.project, "No references")
+
+    us2.subject = "Changed subject"
+    us2.save()
+
+    with patch("taiga.mdrender.service._get_markdown") as get_markdown_mock:
+        assert "First subject" in render(us1.project, text)
+        render(us1.project, "No references")
+        assert not get_markdown_mock.called
@@ -17,10 +17,16 @@
 
 import pytest
 
+import datetime
+
 from django.core.urlresolvers import reverse
+from django.utils import timezone
 
 from taiga.base.utils import json
 from taiga.projects.userstories.serializers import UserStorySerializer
+from taiga.projects.userstories.models import UserStory
+from taiga.projects.milestones.models import Milestone
+from taiga.projects.milestones import services
 
 from .. import factories as f
 
@@ -47,3 +53,42 @@ def test_update_milestone_with_userstories_list(client):
     client.login(user)
     response = client.json.patch(url, json.dumps(form_data))
     assert response.status_code == 200
+
+
+def test_milestone_burndown_days():
+    today = timezone.now().date()
+    sprint = f.MilestoneFactory.create(estimated_start=today - datetime.timedelta(days=2),
+                                       estimated_finish=today + datetime.timedelta(days=2))
+    us1 = f.RolePointsFactory.create(user_story__project=sprint.project, user_story__milestone=sprint,
+                                     points__value=3).user_story
+    us2 = f.RolePointsFactory.create(user_story__project=sprint.project, user_story__milestone=sprint,
+                                     points__value=5).user_story
+    UserStory.objects.filter(id=us1.id).update(is_closed=True,
+                                               finish_date=timezone.now() - datetime.timedelta(days=1))
+
+    days = services.get_milestone_burndown_days(sprint)
+    assert [day["open_points"] for day in days] == [8, 5, 5, 5, 5]
+    assert days[0]["optimal_points"] == 8
+    assert days[-1]["optimal_points"] == 0
+
+    # Open sprints are updated incrementally when a user story is closed
+    us2.finish_date = timezone.now()
+    services.update_milestone_burndown_closed_points(us2, us2.finish_date.date())
+    days = services.get_milestone_burndown_days(sprint)
+    assert [day["open_points"] for day in days] == [8, 5, 0, 0, 0]
+
+
+def test_closed_milestone_burndown_is_frozen():
+    sprint = f.MilestoneFactory.create()
+    us = f.RolePointsFactory.create(user_story__project=sprint.project, user_story__milestone=sprint,
+                                    points__value=3).user_story
+    Milestone.objects.filter(id=sprint.id).update(closed=True)
+    sprint = Milestone.objects.get(id=sprint.id)
+
+    burndown = services.get_milestone_burndown(sprint)
+    assert burndown.frozen
+    assert burndown.total_points == 3
+
+    services.invalidate_milestone_burndown(sprint.id)
+    services.update_milestone_burndown_closed_points(us, timezone.now().date())
+    assert services.get_milestone_burndown(sprint).closed_points == {}
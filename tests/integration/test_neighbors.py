@@ -77,6 +77,20 @@ class TestUserStories:
         assert neighbors.left is None
         assert neighbors.right == us2
 
+    def test_not_in_results_set(self):
+        project = f.ProjectFactory.create()
+        milestone = f.MilestoneFactory.create(project=project)
+
+        us1 = f.UserStoryFactory.create(project=project)
+        f.UserStoryFactory.create(project=project, milestone=milestone)
+
+        milestone_user_stories = UserStory.objects.filter(milestone=milestone)
+
+        neighbors = n.get_neighbors(us1, results_set=milestone_user_stories)
+
+        assert neighbors.left is None
+        assert neighbors.right is None
+
 
 @pytest.mark.django_db
 class TestIssues:
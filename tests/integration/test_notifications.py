@@ -75,6 +75,20 @@ def test_create_retrieve_notify_policy():
     assert policy.notify_level == NotifyLevel.notwatch
 
 
+def test_get_notify_levels_creates_missing_policies():
+    project = f.ProjectFactory.create()
+    user1 = f.UserFactory.create()
+    user2 = f.UserFactory.create()
+
+    policy_model_cls = apps.get_model("notifications", "NotifyPolicy")
+    services.create_notify_policy(project, user1, level=NotifyLevel.watch)
+
+    levels = services.get_notify_levels(project, [user1, user2])
+
+    assert levels == {user1.id: NotifyLevel.watch, user2.id: NotifyLevel.notwatch}
+    assert policy_model_cls.objects.filter(project=project).count() == 2
+
+
 def test_notify_policy_existence():
     project = f.ProjectFactory.create()
     assert not services.notify_policy_exists(project, project.owner)
@@ -261,6 +275,76 @@ def test_send_notifications_using_services_method(settings, mail):
     assert len(mail.outbox) == 12
 
 
+def test_process_sync_notifications_in_chunks(settings, mail):
+    settings.CHANGE_NOTIFICATIONS_MIN_INTERVAL = 1
+
+    project = f.ProjectFactory.create()
+    role = f.RoleFactory.create(project=project, permissions=["view_issues"])
+    member1 = f.MembershipFactory.create(project=project, role=role)
+    member2 = f.MembershipFactory.create(project=project, role=role)
+
+    history = MagicMock()
+    history.user = {"pk": member1.user.pk}
+    history.comment = ""
+    history.type = HistoryType.change
+    history.is_hidden = False
+
+    for issue in f.IssueFactory.create_batch(3, project=project, owner=member2.user):
+        take_snapshot(issue, user=issue.owner)
+        services.send_notifications(issue, history=history)
+
+    assert models.HistoryChangeNotification.objects.count() == 3
+
+    # Too recent notifications are not sent yet
+    services.process_sync_notifications(chunk_size=2)
+    assert len(mail.outbox) == 0
+
+    time.sleep(1)
+    services.process_sync_notifications(chunk_size=2)
+    assert len(mail.outbox) == 3
+    assert models.HistoryChangeNotification.objects.count() == 0
+
+
+def test_process_sync_notifications_skips_failed_ones(settings, mail):
+    settings.CHANGE_NOTIFICATIONS_MIN_INTERVAL = 1
+
+    project = f.ProjectFactory.create()
+    role = f.RoleFactory.create(project=project, permissions=["view_issues"])
+    member1 = f.MembershipFactory.create(project=project, role=role)
+    member2 = f.MembershipFactory.create(project=project, role=role)
+
+    history = MagicMock()
+    history.user = {"pk": member1.user.pk}
+    history.comment = ""
+    history.type = HistoryType.change
+    history.is_hidden = False
+
+    for issue in f.IssueFactory.create_batch(3, project=project, owner=member2.user):
+        take_snapshot(issue, user=issue.owner)
+        services.send_notifications(issue, history=history)
+
+    time.sleep(1)
+    failing_id = models.HistoryChangeNotification.objects.order_by("id")[0].id
+    send_notification = services._send_notification
+
+    def _send_notification(notification, **kwargs):
+        if notification.id == failing_id:
+            raise Exception("SMTP error")
+        send_notification(notification, **kwargs)
+
+    with patch("taiga.projects.notifications.services._send_notification", _send_notification):
+        services.process_sync_notifications(chunk_size=1)
+
+    assert len(mail.outbox) == 2
+    assert list(models.HistoryChangeNotification.objects.values_list("id", flat=True)) == [failing_id]
+
+
+def test_template_mail_is_cached():
+    email1 = services._make_template_mail("issues/issue-change")
+    email2 = services._make_template_mail("issues/issue-change")
+    assert email1 is email2
+
+
 def test_resource_notification_test(client, settings, mail):
     settings.CHANGE_NOTIFICATIONS_MIN_INTERVAL = 1
 
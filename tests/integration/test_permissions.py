@@ -1,3 +1,5 @@
+from unittest import mock
+
 import pytest
 
 from taiga.permissions import service, permissions
@@ -113,3 +115,32 @@ def test_authenticated_user_has_perm_on_project_related_object():
 def test_authenticated_user_has_perm_on_invalid_object():
     user1 = factories.UserFactory()
     assert service.user_has_perm(user1, "test", user1) is False
+
+
+def test_memberships_scope_loads_memberships_once():
+    user1 = factories.UserFactory()
+    project1 = factories.ProjectFactory()
+    project2 = factories.ProjectFactory()
+    role = factories.RoleFactory(permissions=["view_us"])
+    factories.MembershipFactory(user=user1, project=project1, role=role)
+
+    with service.memberships_scope():
+        assert service.user_has_perm(user1, "view_us", project1)
+        assert not service.user_has_perm(user1, "view_us", project2)
+
+        # New memberships invalidate the loaded ones
+        factories.MembershipFactory(user=user1, project=project2, role=role)
+        assert service.user_has_perm(user1, "view_us", project2)
+
+
+def test_get_user_project_membership_outside_a_scope_loads_only_the_project_one(settings):
+    settings.PERMISSIONS_CACHE_ENABLED = False
+    user1 = factories.UserFactory()
+    project1 = factories.ProjectFactory()
+    project2 = factories.ProjectFactory()
+    membership = factories.MembershipFactory(user=user1, project=project1)
+    factories.MembershipFactory(user=user1, project=project2)
+
+    with mock.patch("taiga.permissions.service._load_user_memberships") as load_user_memberships:
+        assert service._get_user_project_membership(user1, project1) == membership
+        assert not load_user_memberships.called
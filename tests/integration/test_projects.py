@@ -1,6 +1,7 @@
 from django.core.urlresolvers import reverse
 from taiga.base.utils import json
 from taiga.projects.services import stats as stats_services
+from taiga.projects.services import tags_index
 from taiga.projects.history.services import take_snapshot
 from taiga.permissions.permissions import ANON_PERMISSIONS
 from taiga.projects.models import Project
@@ -350,3 +351,23 @@ def test_projects_user_order(client):
     response_content = json.loads(response.content.decode("utf-8"))
     assert response.status_code == 200
     assert(response_content[0]["id"] == project_2.id)
+
+
+def test_tags_index(client):
+    project = f.ProjectFactory.create()
+    us = f.UserStoryFactory.create(project=project, tags=["a", "b"])
+    issue = f.create_issue(project=project, tags=["a"])
+
+    assert tags_index.get_indexed_tags(project) == [("a", 2), ("b", 1)]
+    assert tags_index.get_indexed_tags(project, "issues.issue") == [("a", 1)]
+
+    issue.tags = ["c"]
+    issue.save()
+    us.delete()
+
+    assert tags_index.get_indexed_tags(project) == [("c", 1)]
+    project = Project.objects.get(id=project.id)
+    assert [tag for tag, color in project.tags_colors] == ["c"]
+
+    tags_index.rebuild_tags_index(project)
+    assert tags_index.get_indexed_tags(project) == [("c", 1)]
@@ -22,6 +22,7 @@ from django.core.urlresolvers import reverse
 from .. import factories as f
 
 from taiga.permissions.permissions import MEMBERS_PERMISSIONS
+from taiga.searches import services
 from tests.utils import disconnect_signals, reconnect_signals
 
 
@@ -122,15 +123,51 @@ def test_search_text_query_in_my_project(client, searches_initial_data):
     assert len(response.data["issues"]) == 0
     assert len(response.data["wikipages"]) == 1
 
+    # Prefix matching: "back" matches "Backend" too
     response = client.get(reverse("search-list"), {"project": data.project1.id, "text": "back"})
     assert response.status_code == 200
-    assert response.data["count"] == 2
+    assert response.data["count"] == 3
     assert len(response.data["userstories"]) == 1
     assert len(response.data["tasks"]) == 1
-    assert len(response.data["issues"]) == 0
+    assert len(response.data["issues"]) == 1
     assert len(response.data["wikipages"]) == 0
 
 
+def test_search_results_ranking(searches_initial_data):
+    data = searches_initial_data
+
+    results = services.search(data.project1, "future", ["userstories", "tasks", "issues", "wikipages"])
+
+    # The subject matches are ranked before the description ones
+    assert len(results) == 3
+    assert results[0] == ("tasks", data.tsk3)
+    assert set(results[1:]) == {("userstories", data.us2), ("wikipages", data.wiki2)}
+
+
+def test_search_vector_is_updated_when_the_indexed_columns_change(searches_initial_data):
+    data = searches_initial_data
+
+    data.iss3.status = f.IssueStatusFactory.create(project=data.project1)
+    data.iss3.save()
+    assert services.search(data.project1, "spaceship", ["issues"]) == []
+
+    data.iss3.subject = "The spaceship"
+    data.iss3.save()
+    assert services.search(data.project1, "spaceship", ["issues"]) == [("issues", data.iss3)]
+
+    assert services.rebuild_search_index("issues") == 3
+    assert services.search(data.project1, "spaceship", ["issues"]) == [("issues", data.iss3)]
+
+def test_search_text_query_without_words(client, searches_initial_data):
+    data = searches_initial_data
+
+    client.login(data.member1.user)
+
+    response = client.get(reverse("search-list"), {"project": data.project1.id, "text": "&!:*"})
+    assert response.status_code == 200
+    assert response.data["count"] == 0
+
+
 def test_search_text_query_with_an_invalid_project_id(client, searches_initial_data):
     data = searches_initial_data
 
@@ -1,6 +1,10 @@
 import pytest
 
+from django.utils import timezone
+
 from .. import factories as f
+from taiga.projects.services.stats import get_stats_for_project_issues
+from taiga.projects.services.points import calculate_project_points_rollup
 from tests.utils import disconnect_signals, reconnect_signals
 
 pytestmark = pytest.mark.django_db
@@ -104,3 +108,48 @@ def test_project_assigned_points(client, data):
     data.user_story4.milestone = data.milestone
     data.user_story4.save()
     assert data.project.assigned_points == {data.role1.pk: 14, data.role2.pk: 1}
+
+
+def test_project_points_rollup(client, data):
+    data.user_story1.milestone = data.milestone
+    data.user_story1.is_closed = True
+    data.user_story1.save()
+    data.user_story2.milestone = data.milestone
+    data.user_story2.save()
+
+    rollup = calculate_project_points_rollup(data.project.id)
+    milestone_points = rollup["milestones"][data.milestone.id]
+
+    assert rollup["defined"] == {data.role1.pk: 15}
+    assert rollup["closed"] == {data.role1.pk: 1}
+    assert rollup["assigned"] == {data.role1.pk: 3}
+    assert milestone_points["total"] == data.milestone.total_points
+    assert milestone_points["closed"] == data.milestone.closed_points
+    assert milestone_points["increments"]["team"] == data.milestone.team_increment_points
+    assert milestone_points["increments"]["client"] == data.milestone.client_increment_points
+
+
+def test_project_issues_stats(client, data):
+    open_status = f.IssueStatusFactory(project=data.project, is_closed=False)
+    closed_status = f.IssueStatusFactory(project=data.project, is_closed=True)
+    issue1 = f.IssueFactory(project=data.project, status=open_status, owner=data.user)
+    issue2 = f.IssueFactory(project=data.project, status=open_status, owner=data.user,
+                            severity=issue1.severity, priority=issue1.priority)
+    issue3 = f.IssueFactory(project=data.project, status=closed_status, owner=data.user,
+                            severity=issue1.severity, priority=issue1.priority,
+                            finished_date=timezone.now())
+
+    stats = get_stats_for_project_issues(data.project)
+
+    assert stats["total_issues"] == 3
+    assert stats["opened_issues"] == 2
+    assert stats["closed_issues"] == 1
+    assert stats["issues_per_status"][open_status.id]["count"] == 2
+    assert stats["issues_per_status"][closed_status.id]["count"] == 1
+    assert stats["issues_per_owner"][data.user.id]["count"] == 3
+    assert stats["issues_per_assigned_to"][0]["count"] == 3
+    assert stats["last_four_weeks_days"]["by_open_closed"]["open"][-1] == 3
+    assert stats["last_four_weeks_days"]["by_open_closed"]["closed"][-1] == 1
+    assert len(stats["last_four_weeks_days"]["by_open_closed"]["open"]) == 28
+    assert stats["last_four_weeks_days"]["by_severity"][issue1.severity.id]["data"][-1] == 2
+    assert stats["last_four_weeks_days"]["by_priority"][issue1.priority.id]["data"][-1] == 2
@@ -17,6 +17,8 @@
 
 import pytest
 
+from django.core.urlresolvers import reverse
+
 from .. import factories
 
 from taiga.projects.history import services as history_services
@@ -128,6 +130,49 @@ def test_filter_timeline_private_project_member_permissions():
     assert timeline.count() == 1
 
 
+def test_filter_timeline_private_project_member_permissions_cache_invalidation():
+    Timeline.objects.all().delete()
+    user1 = factories.UserFactory()
+    user2 = factories.UserFactory()
+    project = factories.ProjectFactory.create(is_private=True)
+    membership = factories.MembershipFactory.create(user=user2, project=project)
+    membership.role.permissions = []
+    membership.role.save()
+    task = factories.TaskFactory.create(project=project)
+
+    service.register_timeline_implementation("tasks.task", "test", lambda x, extra_data=None: str(id(x)))
+    service._add_to_object_timeline(user1, task, "test")
+    assert service.filter_timeline_for_user(Timeline.objects.all(), user2).count() == 0
+
+    membership.role.permissions = ["view_tasks"]
+    membership.role.save()
+    assert service.filter_timeline_for_user(Timeline.objects.all(), user2).count() == 1
+
+
+def test_get_timeline_page():
+    Timeline.objects.all().delete()
+    user1 = factories.UserFactory()
+    task = factories.TaskFactory()
+
+    service.register_timeline_implementation("tasks.task", "test", lambda x, extra_data=None: str(id(x)))
+    for i in range(5):
+        service._add_to_object_timeline(user1, task, "test")
+
+    timeline = service.get_timeline(user1)
+    expected_ids = list(timeline.values_list("id", flat=True))
+
+    entries, cursor = service.get_timeline_page(timeline, 2)
+    assert [entry.id for entry in entries] == expected_ids[0:2]
+    entries, cursor = service.get_timeline_page(timeline, 2, cursor=cursor)
+    assert [entry.id for entry in entries] == expected_ids[2:4]
+    entries, cursor = service.get_timeline_page(timeline, 2, cursor=cursor)
+    assert [entry.id for entry in entries] == expected_ids[4:5]
+    assert cursor is None
+
+    with pytest.raises(ValueError):
+        service.get_timeline_page(timeline, 2, cursor="invalid")
+
+
 def test_create_project_timeline():
     project = factories.ProjectFactory.create(name="test project timeline")
     history_services.take_snapshot(project, user=project.owner)
@@ -173,6 +218,45 @@ def test_create_task_timeline():
     assert project_timeline[0].data["user"]["id"] == task.owner.id
 
 
+def test_api_timeline_pagination(client):
+    Timeline.objects.all().delete()
+    project = factories.ProjectFactory.create(is_private=False)
+    factories.MembershipFactory.create(project=project, user=project.owner, is_owner=True)
+    task = factories.TaskFactory(project=project)
+
+    service.register_timeline_implementation("tasks.task", "test", lambda x, extra_data=None: str(id(x)))
+    for i in range(5):
+        service._add_to_object_timeline(project, task, "test", service.build_project_namespace(project))
+
+    url = reverse("project-timeline-detail", kwargs={"pk": project.pk})
+    client.login(project.owner)
+
+    # Page number pagination by default
+    response = client.get(url + "?page_size=2")
+    assert response.status_code == 200
+    assert len(response.data) == 2
+    assert response["x-pagination-count"] == "5"
+    assert response["x-pagination-current"] == "1"
+
+    # Keyset pagination with a cursor
+    response = client.get(url + "?page_size=2&cursor=")
+    assert response.status_code == 200
+    assert len(response.data) == 2
+    assert not response.has_header("x-pagination-count")
+    ids = [entry["id"] for entry in response.data]
+
+    while response.has_header("X-Pagination-Next"):
+        response = client.get(response["X-Pagination-Next"])
+        assert response.status_code == 200
+        ids += [entry["id"] for entry in response.data]
+
+    timeline = service.get_project_timeline(project).order_by("-created", "-id")
+    assert ids == list(timeline.values_list("id", flat=True))
+
+    response = client.get(url + "?page_size=2&cursor=invalid")
+    assert response.status_code == 400
+
+
 def test_create_wiki_page_timeline():
     page = factories.WikiPageFactory.create(slug="test wiki page timeline")
     history_services.take_snapshot(page, user=page.owner)
@@ -391,3 +475,24 @@ def test_watchers_to_user_story_timeline():
     user_timeline = service.get_profile_timeline(membership.user)
     assert user_timeline[0].event_type == "userstories.userstory.create"
     assert user_timeline[0].data["userstory"]["subject"] == "test us timeline"
+
+
+def test_push_to_timelines_fan_out():
+    Timeline.objects.all().delete()
+    project = factories.ProjectFactory.create()
+    factories.MembershipFactory.create(project=project, user=project.owner)
+    assigned_membership = factories.MembershipFactory.create(project=project)
+    member_membership = factories.MembershipFactory.create(project=project)
+    watcher = factories.UserFactory.create()
+    user_story = factories.UserStoryFactory.create(project=project, owner=project.owner,
+                                                   assigned_to=assigned_membership.user)
+    user_story.watchers.add(watcher)
+
+    service.push_to_timelines(project, project.owner, user_story, "create")
+
+    user_namespace = service.build_user_namespace(project.owner)
+    assert Timeline.objects.filter(namespace=service.build_project_namespace(project)).count() == 1
+    assert Timeline.objects.filter(namespace=user_namespace).count() == 4
+    related_ids = set(Timeline.objects.filter(namespace=user_namespace).values_list("object_id", flat=True))
+    assert related_ids == {project.owner.id, assigned_membership.user.id, member_membership.user.id, watcher.id}
+    assert len(set(Timeline.objects.values_list("event_type", flat=True))) == 1
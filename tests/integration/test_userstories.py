@@ -38,11 +38,32 @@ def test_update_userstories_order_in_bulk():
     project.pk = 1
 
     with mock.patch("taiga.projects.userstories.services.db") as db:
+        db.update_in_bulk_with_ids.return_value = [1, 2]
         services.update_userstories_order_in_bulk(data, "backlog_order", project)
         db.update_in_bulk_with_ids.assert_called_once_with([1, 2],
                                                            [{"backlog_order": 1},
                                                             {"backlog_order": 2}],
-                                                           model=models.UserStory)
+                                                           model=models.UserStory,
+                                                           only_changed=True,
+                                                           filters={"project": 1})
+
+
+def test_update_userstories_order_in_bulk_only_changed():
+    project = f.ProjectFactory.create()
+    us1 = f.UserStoryFactory.create(project=project, backlog_order=1)
+    us2 = f.UserStoryFactory.create(project=project, backlog_order=2)
+    us3 = f.UserStoryFactory.create(backlog_order=3)
+    data = [{"us_id": us1.id, "order": 1},
+            {"us_id": us2.id, "order": 10},
+            {"us_id": us3.id, "order": 10}]
+
+    changed_ids = services.update_userstories_order_in_bulk(data, "backlog_order", project)
+
+    assert changed_ids == [us2.id]
+    assert models.UserStory.objects.get(id=us1.id).backlog_order == 1
+    assert models.UserStory.objects.get(id=us2.id).backlog_order == 10
+    # Only the user stories of the project are updated
+    assert models.UserStory.objects.get(id=us3.id).backlog_order == 3
 
 
 def test_api_delete_userstory(client):
@@ -16,11 +16,18 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import pytest
+import threading
+from http.server import HTTPServer, BaseHTTPRequestHandler
 from unittest.mock import patch
 
+from django.core.urlresolvers import reverse
+
+from taiga.base.utils import json
+
 from .. import factories as f
 
 from taiga.projects.history import services
+from taiga.webhooks import tasks
 
 pytestmark = pytest.mark.django_db
 
@@ -90,3 +97,116 @@ def test_new_object_with_two_webhook(settings):
         with patch('taiga.webhooks.tasks.delete_webhook') as delete_webhook_mock:
             services.take_snapshot(obj, user=obj.owner, comment="test", delete=True)
             assert delete_webhook_mock.call_count == 2
+
+
+def test_project_change_with_webhooks(client, settings):
+    settings.WEBHOOKS_ENABLED = True
+    project = f.ProjectFactory()
+    f.MembershipFactory.create(project=project, user=project.owner, is_owner=True)
+    f.WebhookFactory.create(project=project)
+
+    with patch('taiga.webhooks.tasks.create_webhook') as create_webhook_mock:
+        services.take_snapshot(project, user=project.owner, comment="test")
+        assert create_webhook_mock.call_count == 1
+
+    project.name = "Changed name"
+    project.save()
+    with patch('taiga.webhooks.tasks.change_webhook') as change_webhook_mock:
+        services.take_snapshot(project, user=project.owner, comment="test")
+        assert change_webhook_mock.call_count == 1
+
+    client.login(project.owner)
+    url = reverse("projects-detail", kwargs={"pk": project.pk})
+    with patch('taiga.webhooks.tasks.change_webhook') as change_webhook_mock:
+        response = client.json.patch(url, json.dumps({"name": "Edited name"}))
+        assert response.status_code == 200
+        assert change_webhook_mock.call_count == 1
+
+def test_payload_is_rendered_once_for_all_webhooks(settings):
+    settings.WEBHOOKS_ENABLED = True
+    project = f.ProjectFactory()
+    f.WebhookFactory.create(project=project, key="key1")
+    f.WebhookFactory.create(project=project, key="key2")
+    issue = f.IssueFactory.create(project=project)
+
+    with patch('taiga.webhooks.tasks.create_webhook') as create_webhook_mock:
+        with patch('taiga.webhooks.tasks.render_payload', return_value=b"{}") as render_payload_mock:
+            services.take_snapshot(issue, user=issue.owner, comment="test")
+
+    assert render_payload_mock.call_count == 1
+    assert create_webhook_mock.call_count == 2
+    signatures = set(call[0][2] for call in create_webhook_mock.call_args_list)
+    assert signatures == {tasks.sign_payload(b"{}", "key1"), tasks.sign_payload(b"{}", "key2")}
+
+
+
+def test_webhook_logs_are_pruned_once_per_event(settings):
+    settings.WEBHOOKS_ENABLED = True
+    project = f.ProjectFactory()
+    webhook1 = f.WebhookFactory.create(project=project)
+    webhook2 = f.WebhookFactory.create(project=project)
+    issue = f.IssueFactory.create(project=project)
+
+    with patch('taiga.webhooks.tasks.create_webhook') as create_webhook_mock:
+        with patch('taiga.webhooks.tasks.prune_webhook_logs') as prune_webhook_logs_mock:
+            services.take_snapshot(issue, user=issue.owner, comment="test")
+
+    assert create_webhook_mock.call_count == 2
+    assert prune_webhook_logs_mock.call_count == 1
+    (webhook_ids,), _ = prune_webhook_logs_mock.call_args
+    assert sorted(webhook_ids) == sorted([webhook1.id, webhook2.id])
+
+class WebhookRequestHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.received.append((dict(self.headers), body))
+
+        status = self.server.statuses.pop(0) if self.server.statuses else 200
+        self.send_response(status)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def webhook_server(request):
+    server = HTTPServer(("127.0.0.1", 0), WebhookRequestHandler)
+    server.received = []
+    server.statuses = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def fin():
+        server.shutdown()
+        server.server_close()
+    request.addfinalizer(fin)
+
+    server.url = "http://127.0.0.1:{}/webhook".format(server.server_port)
+    return server
+
+
+def test_send_request_to_webhook_server(settings, webhook_server):
+    settings.WEBHOOKS_RETRY_BACKOFF = 0
+    webhook = f.WebhookFactory.create(url=webhook_server.url)
+
+    # Server errors are retried
+    webhook_server.statuses = [500, 200]
+    webhook_log = tasks.test_webhook(webhook.id, webhook.url, webhook.key)
+
+    assert webhook_log.status == 200
+    assert len(webhook_server.received) == 2
+
+    headers, body = webhook_server.received[-1]
+    assert headers["X-TAIGA-WEBHOOK-SIGNATURE"] == tasks._generate_signature(body, webhook.key)
+
+
+def test_webhook_logs_are_pruned(settings, webhook_server):
+    webhook = f.WebhookFactory.create(url=webhook_server.url)
+
+    for i in range(tasks.WEBHOOK_LOGS_LIMIT + 2):
+        last_log = tasks.test_webhook(webhook.id, webhook.url, webhook.key)
+
+    assert webhook.logs.count() == tasks.WEBHOOK_LOGS_LIMIT
+    assert webhook.logs.filter(id=last_log.id).exists()
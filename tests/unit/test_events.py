@@ -0,0 +1,119 @@
+# Copyright (C) 2014 Andrey Antukh <niwi@niwi.be>
+# Copyright (C) 2014 Jesús Espino <jespinog@gmail.com>
+# Copyright (C) 2014 David Barragán <bameda@dbarragan.com>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from unittest import mock
+
+from taiga.base.utils import json
+from taiga.events import events
+
+
+def test_transaction_events_are_merged_by_routing_key():
+    transaction_events = events.TransactionEvents()
+    transaction_events.add_changes([1], "userstories.userstory", 1, type="change", channel="events", sessionid="s")
+    transaction_events.add_changes([2, 1], "userstories.userstory", 1, type="change", channel="events", sessionid="s")
+    transaction_events.add_changes([3], "userstories.userstory", 1, type="create", channel="events", sessionid="s")
+
+    backend = mock.MagicMock()
+    with mock.patch("taiga.events.backends.get_events_backend", return_value=backend):
+        transaction_events.flush()
+
+    (emitted_events,), _ = backend.emit_events.call_args
+    assert len(emitted_events) == 2
+
+    message, routing_key, channel = emitted_events[0]
+    assert routing_key == "changes.project.1.userstories"
+    assert json.loads(message) == {"session_id": "s",
+                                   "data": {"type": "change", "matches": "userstories.userstory", "pk": [1, 2]}}
+
+    message, routing_key, channel = emitted_events[1]
+    assert json.loads(message)["data"]["pk"] == 3
+
+    assert transaction_events.changes == {}
+
+
+def _make_rabbitmq_backend(**kwargs):
+    from taiga.events.backends import rabbitmq
+    return rabbitmq.EventsPushBackend("//guest:guest@127.0.0.1/", **kwargs)
+
+
+def _published_messages(connection):
+    return [call[0][0].body for call in connection.channel.return_value.basic_publish.call_args_list]
+
+
+def test_rabbitmq_backend_reuses_the_connection_and_the_declared_exchanges():
+    backend = _make_rabbitmq_backend()
+    connection = mock.MagicMock()
+
+    with mock.patch("taiga.events.backends.rabbitmq._make_rabbitmq_connection",
+                    return_value=connection) as make_connection:
+        backend.emit_events([("m1", "k1", "events"), ("m2", "k2", "events")])
+        backend.emit_event("m3", routing_key="k3", channel="other")
+
+    assert make_connection.call_count == 1
+    assert _published_messages(connection) == ["m1", "m2", "m3"]
+
+    rchannel = connection.channel.return_value
+    declared = [kwargs["exchange"] for _, kwargs in rchannel.exchange_declare.call_args_list]
+    assert declared == ["events", "other"]
+
+
+def test_rabbitmq_backend_reconnects_after_a_fork():
+    backend = _make_rabbitmq_backend()
+    parent_connection, child_connection = mock.MagicMock(), mock.MagicMock()
+
+    with mock.patch("taiga.events.backends.rabbitmq._make_rabbitmq_connection",
+                    side_effect=[parent_connection, child_connection]):
+        backend.emit_event("m1", routing_key="k1")
+        with mock.patch("taiga.events.backends.rabbitmq.os.getpid", return_value=-1):
+            backend.emit_event("m2", routing_key="k2")
+
+    assert _published_messages(parent_connection) == ["m1"]
+    assert _published_messages(child_connection) == ["m2"]
+    # The connection of the parent process is not closed by the child
+    assert not parent_connection.close.called
+    assert child_connection.channel.return_value.exchange_declare.called
+
+
+def test_rabbitmq_backend_retries_only_the_events_not_published():
+    backend = _make_rabbitmq_backend(confirm_publish=True)
+    broken_connection, connection = mock.MagicMock(), mock.MagicMock()
+    broken_connection.channel.return_value.basic_publish.side_effect = [None, IOError("closed")]
+
+    with mock.patch("taiga.events.backends.rabbitmq._make_rabbitmq_connection",
+                    side_effect=[broken_connection, connection]) as make_connection:
+        backend.emit_events([("m1", "k1", "events"), ("m2", "k2", "events"), ("m3", "k3", "events")])
+
+    assert make_connection.call_args_list == [mock.call(backend.url, True), mock.call(backend.url, True)]
+    assert broken_connection.close.called
+    assert _published_messages(broken_connection) == ["m1", "m2"]
+    assert _published_messages(connection) == ["m2", "m3"]
+    # The exchanges are declared again in the new connection
+    assert connection.channel.return_value.exchange_declare.called
+
+
+def test_rabbitmq_backend_gives_up_after_a_second_failure():
+    backend = _make_rabbitmq_backend()
+    connection = mock.MagicMock()
+    connection.channel.return_value.basic_publish.side_effect = IOError("closed")
+
+    with mock.patch("taiga.events.backends.rabbitmq._make_rabbitmq_connection",
+                    return_value=connection) as make_connection:
+        backend.emit_event("m1", routing_key="k1")
+        assert make_connection.call_count == 2
+
+        connection.channel.return_value.basic_publish.side_effect = None
+        backend.emit_event("m2", routing_key="k2")
+        assert make_connection.call_count == 3
@@ -14,11 +14,22 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import gzip
+import io
+import json
+
 import pytest
 
+from django.core.files.storage import default_storage
+
 from .. import factories as f
 
+from taiga.export_import.dump_reader import StreamedDump, DumpFormatError, is_dump_file
+from taiga.export_import.dump_service import load_dump_file
+from taiga.export_import.renderers import ExportRenderer
 from taiga.export_import.service import project_to_dict
+from taiga.export_import.service import write_project_dump
+from taiga.export_import.service import store_project_dump
 
 pytestmark = pytest.mark.django_db
 
@@ -33,3 +44,105 @@ def test_export_user_story_finish_date(client):
     user_story = f.UserStoryFactory.create(finish_date="2014-10-22")
     finish_date = project_to_dict(user_story.project)["user_stories"][0]["finish_date"]
     assert finish_date == "2014-10-22T00:00:00+0000"
+
+
+def _normalize_dump(data):
+    for key, value in data.items():
+        if isinstance(value, list):
+            data[key] = sorted(value, key=lambda x: json.dumps(x, sort_keys=True))
+    return data
+
+
+@pytest.mark.parametrize("indent", [None, 4])
+def test_write_project_dump(indent):
+    project = f.ProjectFactory.create()
+    f.IssueFactory.create_batch(3, project=project)
+    f.UserStoryFactory.create_batch(2, project=project)
+
+    fileobj = io.BytesIO()
+    write_project_dump(project, fileobj, indent=indent, chunk_size=2)
+
+    expected = json.loads(ExportRenderer().render(project_to_dict(project)).decode("utf-8"))
+    data = json.loads(fileobj.getvalue().decode("utf-8"))
+    assert len(data["issues"]) == 3
+    assert len(data["user_stories"]) == 2
+    assert _normalize_dump(data) == _normalize_dump(expected)
+
+
+def test_store_gzipped_project_dump(settings):
+    settings.EXPORTS_GZIP = True
+    issue = f.IssueFactory.create()
+
+    path = store_project_dump(issue.project, "test")
+    assert path.endswith(".json.gz")
+
+    with default_storage.open(path) as dump:
+        data = json.loads(gzip.decompress(dump.read()).decode("utf-8"))
+    default_storage.delete(path)
+
+    assert data["issues"][0]["ref"] == issue.ref
+
+
+def test_load_gzipped_project_dump(settings):
+    settings.EXPORTS_GZIP = True
+    issue = f.IssueFactory.create()
+    project = issue.project
+
+    path = store_project_dump(project, "test")
+    try:
+        with default_storage.open(path) as dump:
+            assert is_dump_file(dump)
+            imported_project = load_dump_file(dump, project.owner.email)
+    finally:
+        default_storage.delete(path)
+
+    assert imported_project.id != project.id
+    assert imported_project.name == project.name
+    assert list(imported_project.issues.values_list("subject", flat=True)) == [issue.subject]
+
+
+@pytest.mark.parametrize("indent", [None, 4])
+@pytest.mark.parametrize("chunk_size", list(range(1, 21)) + [4096])
+def test_streamed_dump(chunk_size, indent):
+    data = {
+        "name": "Project ☃",
+        "total_story_points": 45.5,
+        "total_milestones": 12345,
+        "ratio": 1e-3,
+        "issues": [{"ref": i, "subject": "Issue {}".format(i)} for i in range(10)],
+        "tasks": [],
+        "tags_colors": [["tag", "#fff"]],
+    }
+    dump = StreamedDump(io.BytesIO(json.dumps(data, indent=indent).encode("utf-8")), chunk_size=chunk_size)
+
+    with dump:
+        assert dump["name"] == data["name"]
+        assert dump["total_story_points"] == data["total_story_points"]
+        assert dump["total_milestones"] == data["total_milestones"]
+        assert dump["ratio"] == data["ratio"]
+        assert dump["tags_colors"] == data["tags_colors"]
+        assert dump["tasks"] == []
+        assert not isinstance(dump["issues"], list)
+        assert list(dump["issues"]) == data["issues"]
+
+
+@pytest.mark.parametrize("content", [b"test", b"", b"[]", b'{"name": "test"', b'{"issues": [{}, {}',
+                                     b"\x1f\x8bnot gzipped", gzip.compress(b"test")])
+def test_streamed_dump_invalid_format(content):
+    with pytest.raises(DumpFormatError):
+        StreamedDump(io.BytesIO(content))
+
+
+@pytest.mark.parametrize("content, expected", [
+    (b'{"name": "test"}', True),
+    (b'\xef\xbb\xbf\n  {"name": ', True),
+    (gzip.compress(b'{"name": "test"}'), True),
+    (b"\x1f\x8bnot gzipped", False),
+    (b"test", False),
+    (b"", False),
+    (b"[]", False),
+])
+def test_is_dump_file(content, expected):
+    fileobj = io.BytesIO(content)
+    assert is_dump_file(fileobj) is expected
+    assert fileobj.tell() == 0
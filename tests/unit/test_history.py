@@ -0,0 +1,53 @@
+# Copyright (C) 2014 Andrey Antukh <niwi@niwi.be>
+# Copyright (C) 2014 Jesús Espino <jespinog@gmail.com>
+# Copyright (C) 2014 David Barragán <bameda@dbarragan.com>
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from unittest.mock import MagicMock
+
+from taiga.projects.history import freeze_impl
+
+
+def test_values_resolver_memoizes_values():
+    loader = MagicMock(return_value={"1": "one", "2": "two"})
+    resolver = freeze_impl.ValuesResolver()
+
+    assert resolver.resolve("test", loader, [1, 2, None]) == {"1": "one", "2": "two"}
+    assert resolver.resolve("test", loader, [2]) == {"2": "two"}
+    assert loader.call_count == 1
+
+
+def test_values_resolver_collecting_resolves_in_one_call():
+    loader = MagicMock(return_value={"1": "one", "2": "two", "3": "three"})
+    resolver = freeze_impl.ValuesResolver()
+
+    with resolver.collecting():
+        assert resolver.resolve("test", loader, [1]) == {}
+        assert resolver.resolve("test", loader, [2, 3]) == {}
+
+    assert loader.call_count == 0
+    assert resolver.resolve("test", loader, [1]) == {"1": "one"}
+    assert resolver.resolve("test", loader, [2, 3]) == {"2": "two", "3": "three"}
+    assert loader.call_count == 1
+    assert set(loader.call_args[0][0]) == {"1", "2", "3"}
+
+
+def test_values_resolver_scope():
+    with freeze_impl.values_resolver_scope() as resolver:
+        assert freeze_impl.get_values_resolver() is resolver
+        with freeze_impl.values_resolver_scope() as inner_resolver:
+            assert inner_resolver is resolver
+
+    assert freeze_impl.get_values_resolver() is not resolver
@@ -15,9 +15,14 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import pytest
+
 from unittest.mock import patch, MagicMock
 
+from django.core.cache import cache
+
 from taiga.mdrender.extensions import emojify
+from taiga.mdrender import service
 from taiga.mdrender.service import render, cache_by_sha, get_diff_of_htmls, render_and_extract
 
 from datetime import datetime
@@ -27,6 +32,13 @@ dummy_project.id = 1
 dummy_project.slug = "test"
 
 
+@pytest.fixture(autouse=True)
+def clear_render_cache():
+    # The renders are cached by text and project
+    cache.clear()
+    service._local_cache.clear()
+
+
 def test_proccessor_valid_emoji():
     result = emojify.EmojifyPreprocessor().run(["**:smile:**"])
     assert result == ["**![smile](http://localhost:8000/static/img/emojis/smile.png)**"]
@@ -38,47 +50,39 @@ def test_proccessor_invalid_emoji():
 
 
 def test_proccessor_valid_us_reference():
-    with patch("taiga.mdrender.extensions.references.get_instance_by_ref") as mock:
-        instance = mock.return_value
-        instance.content_type.model = "userstory"
-        instance.content_object.subject = "test"
+    with patch("taiga.mdrender.extensions.references.get_references_data") as mock:
+        mock.return_value = {1: ("userstory", "test")}
         result = render(dummy_project, "**#1**")
         expected_result = '<p><strong><a class="reference user-story" href="http://localhost:9001/project/test/us/1" title="#1 test">#1</a></strong></p>'
         assert result == expected_result
 
 
 def test_proccessor_valid_issue_reference():
-    with patch("taiga.mdrender.extensions.references.get_instance_by_ref") as mock:
-        instance = mock.return_value
-        instance.content_type.model = "issue"
-        instance.content_object.subject = "test"
+    with patch("taiga.mdrender.extensions.references.get_references_data") as mock:
+        mock.return_value = {2: ("issue", "test")}
         result = render(dummy_project, "**#2**")
         expected_result = '<p><strong><a class="reference issue" href="http://localhost:9001/project/test/issue/2" title="#2 test">#2</a></strong></p>'
         assert result == expected_result
 
 
 def test_proccessor_valid_task_reference():
-    with patch("taiga.mdrender.extensions.references.get_instance_by_ref") as mock:
-        instance = mock.return_value
-        instance.content_type.model = "task"
-        instance.content_object.subject = "test"
+    with patch("taiga.mdrender.extensions.references.get_references_data") as mock:
+        mock.return_value = {3: ("task", "test")}
         result = render(dummy_project, "**#3**")
         expected_result = '<p><strong><a class="reference task" href="http://localhost:9001/project/test/task/3" title="#3 test">#3</a></strong></p>'
         assert result == expected_result
 
 
 def test_proccessor_invalid_type_reference():
-    with patch("taiga.mdrender.extensions.references.get_instance_by_ref") as mock:
-        instance = mock.return_value
-        instance.content_type.model = "other"
-        instance.content_object.subject = "test"
+    with patch("taiga.mdrender.extensions.references.get_references_data") as mock:
+        mock.return_value = {4: ("other", "test")}
         result = render(dummy_project, "**#4**")
         assert result == "<p><strong>#4</strong></p>"
 
 
 def test_proccessor_invalid_reference():
-    with patch("taiga.mdrender.extensions.references.get_instance_by_ref") as mock:
-        mock.return_value = None
+    with patch("taiga.mdrender.extensions.references.get_references_data") as mock:
+        mock.return_value = {5: ()}
         result = render(dummy_project, "**#5**")
         assert result == "<p><strong>#5</strong></p>"
 
@@ -202,9 +206,58 @@ def test_get_diff_of_htmls_modifications():
 
 
 def test_render_and_extract_references():
-    with patch("taiga.mdrender.extensions.references.get_instance_by_ref") as mock:
-        instance = mock.return_value
-        instance.content_type.model = "issue"
-        instance.content_object.subject = "test"
+    issue = MagicMock()
+    with patch("taiga.mdrender.extensions.references.get_references_data") as mock, \
+            patch("taiga.mdrender.service.get_referenced_objects") as objects_mock:
+        mock.return_value = {1: ("issue", "test")}
+        objects_mock.return_value = {1: issue}
         (_, extracted) = render_and_extract(dummy_project, "**#1**")
-        assert extracted['references'] == [instance.content_object]
+        assert extracted['references'] == [issue]
+
+
+def test_references_are_resolved_at_once():
+    with patch("taiga.mdrender.extensions.references.get_references_data") as mock:
+        mock.return_value = {7: ("issue", "test"), 8: ("task", "test")}
+        result = render(dummy_project, "#7 and #8, again #7")
+        # Once for the cache key and once for the render
+        assert mock.call_count == 2
+        assert all(args == (dummy_project.id, {7, 8}) for args, _ in mock.call_args_list)
+        assert result.count("<a ") == 3
+
+
+def test_render_without_references_doesnt_look_them_up():
+    with patch("taiga.mdrender.extensions.references.get_references_data") as mock:
+        render(dummy_project, "No references, only a # sign")
+        assert not mock.called
+
+
+def test_markdown_instances_are_reused():
+    md1 = service._get_markdown(dummy_project)
+    md2 = service._get_markdown(dummy_project)
+    assert md1 is md2
+
+
+def test_reused_markdown_instances_forget_abbreviations():
+    assert "<abbr" in render(dummy_project, "Some TLA\n\n*[TLA]: Three Letter Acronym")
+    assert render(dummy_project, "Other TLA") == "<p>Other TLA</p>"
+
+
+def test_lru_cache():
+    lru = service.LRUCache(2)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    assert lru.get("a") == 1
+    lru.set("c", 3)
+    assert lru.get("b") is None
+    assert lru.get("a") == 1
+    assert lru.get("c") == 3
+
+
+def test_lru_cache_timeout():
+    lru = service.LRUCache(2, timeout=10)
+    with patch("taiga.mdrender.service.time.monotonic") as monotonic:
+        monotonic.return_value = 100
+        lru.set("a", 1)
+        assert lru.get("a") == 1
+        monotonic.return_value = 110
+        assert lru.get("a") is None
@@ -28,33 +28,33 @@ import pytest
 
 
 def test_push_to_timeline_many_objects():
-    with patch("taiga.timeline.service._add_to_object_timeline") as mock:
+    with patch("taiga.timeline.service._add_to_objects_timeline") as mock:
         users = [User(), User(), User()]
         project = Project()
         service.push_to_timeline(users, project, "test")
-        assert mock.call_count == 3
+        assert mock.call_count == 1
         assert mock.mock_calls == [
-            call(users[0], project, "test", "default", {}),
-            call(users[1], project, "test", "default", {}),
-            call(users[2], project, "test", "default", {}),
+            call(users, project, "test", "default", {}),
         ]
         with pytest.raises(Exception):
             service.push_to_timeline(None, project, "test")
 
 
 def test_add_to_objects_timeline():
-    with patch("taiga.timeline.service._add_to_object_timeline") as mock:
-        users = [User(), User(), User()]
+    with patch("taiga.timeline.service.ContentType") as content_type_mock, \
+            patch("taiga.timeline.service._build_timeline_entries") as build_mock, \
+            patch("taiga.timeline.service._save_timeline_entries") as save_mock:
+        content_type_mock.objects.get_for_model.return_value = "user-ct"
+        users = [User(id=1), User(id=2), User(id=3)]
         project = Project()
         service._add_to_objects_timeline(users, project, "test")
-        assert mock.call_count == 3
-        assert mock.mock_calls == [
-            call(users[0], project, "test", "default", {}),
-            call(users[1], project, "test", "default", {}),
-            call(users[2], project, "test", "default", {}),
+        assert build_mock.call_count == 1
+        assert build_mock.mock_calls == [
+            call([("user-ct", 1, "default"), ("user-ct", 2, "default"), ("user-ct", 3, "default")],
+                 project, "test", {}),
         ]
-        with pytest.raises(Exception):
-            service.push_to_timeline(None, project, "test")
+        assert save_mock.call_count == 1
+        assert save_mock.mock_calls == [call(build_mock.return_value)]
 
 
 def test_get_impl_key_from_model():
@@ -20,6 +20,7 @@ import django_sites as sites
 
 from taiga.base.utils.urls import get_absolute_url, is_absolute_url, build_url
 from taiga.base.utils.db import save_in_bulk, update_in_bulk, update_in_bulk_with_ids
+from taiga.base.utils.cache import get_cache_version, bump_cache_version
 
 
 def test_is_absolute_url():
@@ -81,11 +82,22 @@ def test_update_in_bulk_with_ids():
     new_values = [{"field1": 1}, {"field2": 2}]
     model = mock.Mock()
 
-    update_in_bulk_with_ids(ids, new_values, model)
+    with mock.patch("taiga.base.utils.db.update_values_in_bulk") as update_values_in_bulk:
+        update_values_in_bulk.side_effect = lambda model, values, **kwargs: [id for id, _ in values]
+        assert update_in_bulk_with_ids(ids, new_values, model) == [1, 2]
 
+    # One statement for each group of rows with the same fields
     expected_calls = [
-        mock.call(id=1), mock.call().update(field1=1),
-        mock.call(id=2), mock.call().update(field2=2)
+        mock.call(model, [(1, {"field1": 1})], only_changed=False, filters=None),
+        mock.call(model, [(2, {"field2": 2})], only_changed=False, filters=None),
     ]
 
-    model.objects.filter.assert_has_calls(expected_calls)
+    update_values_in_bulk.assert_has_calls(expected_calls)
+
+
+def test_cache_versions():
+    version = get_cache_version("test-version")
+    assert get_cache_version("test-version") == version
+
+    bump_cache_version("test-version")
+    assert get_cache_version("test-version") != version